@@ -9,8 +9,8 @@
 
 
 #modules to install
-#pip install owlready2
-#pip install pygithub
+#pip install pygithub   (source_mode = 'github' only)
+#pip install owlready2  (validate_with_owlready2 only)
 
 
 # In[2]:
@@ -22,6 +22,28 @@ _script_version = '1.1' # script version - update after edit
 token = "" # insert your github token
 out_path = '/home/spc93/ontology'
 tmp_file_path = '/home/spc93/tmp'
+source_mode = 'github' # 'github': one download per file, 'archive': single tarball of the newest tag, 'local': local_path
+local_path = '/home/spc93/definitions' # local directory or git checkout of nexusformat/definitions (source_mode = 'local')
+cache_archives = False # also keep the tarballs of source_mode 'archive' in tmp_file_path/nxdl_archives, per tag and commit
+output_formats = ['owl', 'ttl', 'nt'] # files written to out_path: RDF/XML (.owl), Turtle (.ttl), N-Triples (.nt)
+write_closures = True # also write out_path/<onto_name>.closure: transitive closures of extends and citesGroup (see onto_closure)
+closure_triples = False # also write the closures as triples, out_path/<onto_name>-closure.<format> for output_formats
+write_validation_plans = True # also write out_path/<onto_name>.plans: application definitions compiled for hdf5_validate (see nxdl_plans)
+write_sqlite_store = True # also write out_path/<onto_name>.sqlite, for read-only queries without parsing (see onto_store)
+save_model = True # also save the merged classes, applications and types to out_path/<onto_name>.nxmodel (see nxdl_model)
+write_modules = False # also write the ontology split per class, with an import catalog, to out_path/<onto_name>-modules (see onto_modules)
+module_format = 'owl' # format of the modules: 'owl' or 'nt' (both can be read by onto_modules.ModuleLoader)
+write_lookup_index = True # also write out_path/<onto_name>.index, resolving field names and labels to IRIs (see onto_index)
+write_build_report = True # write out_path/<onto_name>.build.json: time and counts of each stage of the build (see build_report)
+profile_build = False # also profile the build and write out_path/<onto_name>.prof (for pstats or snakeviz)
+previous_ontology = '' # previously published ontology (.nt or .owl); if set, also write the changes from it (see onto_patch)
+changeset_formats = ['sparql', 'nt'] # changes written: SPARQL Update (<onto_name>.changes.ru), N-Triples (.removed.nt, .added.nt)
+build_all_versions = False # also write out_path/<onto_name>-<tag>.<format> for every NeXus version tag (see nxdl_versions)
+version_tags = [] # tags built with build_all_versions, e.g. ['v2022.07', 'v2020.10']; [] for all tags
+test_individuals = True # also write the test individuals (dataset1 and dataset2, with one measurement each) to the ontology
+validate_with_owlready2 = False # load the written ontology with owlready2 and check it
+watch_definitions = False # finally watch local_path and serve the ontology, rebuilt on every change, over HTTP (see onto_watch)
+watch_port = 8000 # port of the local HTTP server (watch_definitions)
 #################################################################
 
 
@@ -39,11 +61,8 @@ _publication = 'https://doi.org/10.5281/zenodo.4806026'
 
 onto_iri = base_iri + onto_name
 
-# pickle files used to avoid uneccesary parsing of NeXus files, mainly for development
-defn_pickle_file = tmp_file_path + '/defn.p'
-baseclass_pickle_file = tmp_file_path + '/baseclass.p'
-types_pickle_file = tmp_file_path + '/types.p'
-tags_pickle_file = tmp_file_path + '/tags.p'
+# per-file cache of parsed NeXus files, keyed by content: only new or changed files are downloaded and parsed
+parse_cache_path = tmp_file_path + '/nxdl_cache'
 
 base_class_web_page_prefix = 'https://manual.nexusformat.org/classes/base_classes/'
 application_definition_web_page_prefix = 'https://manual.nexusformat.org/classes/applications/'
@@ -57,8 +76,11 @@ nexus_repository = 'https://github.com/nexusformat'
 
 default_units = 'NX_UNITLESS'   #use this if units not specified
 
+_maxTries = 10 # try to fetch each file this many times before giving up
+_fetchWorkers = 8 # number of nxdl files downloaded concurrently
+_parseWorkers = 4 # number of processes parsing nxdl files (1: parse in this process)
+
 import datetime
-import pickle
    
 # Ontology metadata comment
 onto_comment = '''
@@ -107,36 +129,47 @@ onto_comment = '''
     
 '''
 
-# To avoid re-parsing NeXus files after initial run, execute this
-# cell instead of the next three
-
-classDict = pickle.load( open(baseclass_pickle_file , "rb" ) )
-applicationDict = pickle.load( open(defn_pickle_file , "rb" ) )
-typesDict = pickle.load( open(types_pickle_file , "rb" ) )
-tagsDict = pickle.load( open(tags_pickle_file , "rb" ) )
 
 # In[4]:
 
 
 # Create a dictionary of NeXus simple types (unit categories)
 
-from github import Github
-import xml.dom.minidom
-import urllib
-import pickle
-
-types_dom = xml.dom.minidom.parse(urllib.request.urlopen(types_url))
-
-typesDict = {}
-for nxtype in types_dom.getElementsByTagName('xs:simpleType'):
-    name = nxtype.getAttribute('name')
-    doc = nxtype.getElementsByTagName('xs:documentation')
-    docstr = doc[0].firstChild.nodeValue
-    docstr = docstr.replace('\n','').replace('\t','')
-    typesDict[name] = {'doc': docstr}
-
-
-pickle.dump(typesDict, open(types_pickle_file, "wb" ) )
+import collections
+from nexus_ontology import nxdl_fetch
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_cache
+from nexus_ontology import build_report
+
+# pooled, retrying downloader shared by the following cells
+fetcher = nxdl_fetch.Fetcher(workers=_fetchWorkers, max_tries=_maxTries)
+
+# source of the nxdl files used by the following cells
+if source_mode == 'archive':
+    # extracted in memory; with cache_archives the tarballs are also kept on disk, per tag
+    source = nxdl_source.ArchiveSource(nexus_repo, fetcher, cache=tmp_file_path + '/nxdl_archives' if cache_archives else None)
+elif source_mode == 'local':
+    source = nxdl_source.LocalSource(local_path) # no network or token needed
+else:
+    source = nxdl_source.GithubSource(nexus_repo, token, fetcher, types_url)
+
+# parsed files are cached per file; a new parser version starts a new cache
+parse_cache = nxdl_cache.ParseCache(parse_cache_path, nxdl_parse.parser_version)
+
+# time and counters of each stage of the build, written by cell 7
+report = build_report.BuildReport(profile=profile_build, script_version=_script_version, source_mode=source_mode,
+                                  parser_version=nxdl_parse.parser_version, parse_workers=_parseWorkers)
+merge_stats = collections.Counter() # fields added, duplicate and deprecated fields (nxdl_merge)
+onto_stats = collections.Counter()  # resources, restrictions and bytes written (onto_rdf)
+report.watch('fetch', fetcher, 'requests', 'bytes', 'retries')
+report.watch('cache', parse_cache, 'hits', 'misses', 'bytes_read', 'read_seconds', 'parse_seconds')
+report.watch('merge', merge_stats, 'fields_added', 'duplicate_fields', 'deprecated_fields')
+report.watch('ontology', onto_stats, 'files_written', 'bytes_written', 'resources', 'restrictions')
+
+with report.stage('types') as counts:
+    typesDict = parse_cache.parse(source.get_types(), nxdl_parse.parse_types)
+    counts['types'] = len(typesDict)
 
 
 # In[5]:
@@ -145,122 +178,23 @@ pickle.dump(typesDict, open(types_pickle_file, "wb" ) )
 # parse nexus base class files via url to python dictionary
 
 
-from github import Github
-import xml.dom.minidom
 import os
-import urllib
-import time
-import pickle
-import json
+from nexus_ontology import nxdl_merge
 
-g = Github(token)
-repo = g.get_repo(nexus_repo)
-
-with urllib.request.urlopen(repo.tags_url) as url:
-    tags = json.loads(url.read().decode())
+with report.stage('tags'):
+    tags = source.get_tags()
     tagsDict = tags[0]  # get version tags from master branch
 
 
-base_class_url = []
-for file in repo.get_contents("base_classes"):
-    if str(file).split('.')[-2] == 'nxdl':
-        base_class_url += [file.download_url]
-
-
-_maxTries = 10 # try to parse file this many times before giving up
-
-def addFieldToDict(classDict, field, defn_name): # make a function to be reused later
-    #defn_name is used to add application definition to field dict if the field is defined in an app deff.
-    field_name = field.getAttribute('name')
+with report.stage('base_classes') as counts:
+    # (url, parsed record) for each base class file; unchanged files come from the parse cache,
+    # the others are parsed by _parseWorkers processes
+    base_class_records = parse_cache.parse_files(source, 'base_classes', nxdl_parse.parse_base_class, _parseWorkers)
     
-    deprecationAttribute = field.getAttribute('deprecated')
-    if not deprecationAttribute == '':
-        print("=== Deprecation warning %s in %s: %s" % (field_name, className, deprecationAttribute))    
-
-    long_name = className + join_string + field_name
-    label = className + join_string_label + field_name
-
-    if not long_name in classDict[className]['fields'].keys():
-        #print('~~~ field did not exist: %s' % long_name)
-        classDict[className]['fields'][long_name] = {} # create dictionary for field if doesn't exist
-
-        
-        classDict[className]['fields'][long_name]['fieldName'] = field_name
-        classDict[className]['fields'][long_name]['units'] = field.getAttribute('units')
-        if classDict[className]['fields'][long_name]['units'] == '':
-            classDict[className]['fields'][long_name]['units'] = default_units
-                        
-        classDict[className]['fields'][long_name]['xml_file'] = file #xml file where field is defined
-        classDict[className]['fields'][long_name]['defn_name'] = defn_name # application defn name is passed in if field is defined in a defn, else None is used
-        classDict[className]['fields'][long_name]['label'] = label # compound name for label
-
-        _type = field.getAttribute('type')
-        if _type == '':
-            _type = 'NX_CHAR'   # default if not specified
-
-        classDict[className]['fields'][long_name]['type'] = _type
-
-        try:
-            field_doc = field.getElementsByTagName('doc')[0].firstChild.nodeValue.replace('\n','')
-        except:
-            field_doc = ''
-        classDict[className]['fields'][long_name]['fieldDoc'] = field_doc
-   
-
-classDict = {} # create empty classDict dictionary
-
-
-for file in base_class_url:
-    #print(file)
-
-    for i in range(_maxTries):
-        try:
-            dom1 = xml.dom.minidom.parse(urllib.request.urlopen(file))
-            break
-        except:
-            print('=== Problem parsing %s; try %i times then give up' % (file, _maxTries))
-            time.sleep(1)
-    
-    defn = dom1.getElementsByTagName('definition')[0]
-    
-    className = defn.getAttribute('name') #class name from name attribute in definition
-     
-    if not className in classDict.keys():
-        classDict[className] = {} # each class is a dictionary - create a new one if doesn't exist
-    
-    classDict[className]['xml_file'] = file
-
-    classDict[className]['extends'] = defn.getAttribute('extends')
-    
-    
-    docstr = ''
-    for docelement in dom1.getElementsByTagName('doc'):
-        if docelement.parentNode.tagName == 'definition':
-            docstr = docelement.firstChild.nodeValue.replace('\n','')
-            break
-    classDict[className]['classDoc'] = docstr
-    
-    
-    
-    if not 'fields' in classDict[className].keys():
-        classDict[className]['fields'] = {} # create fields dictionary for class if doesn't exist
-    
- 
-    # look for fields in group but not recursive
-    flds = (field for field in defn.getElementsByTagName('field') if field.parentNode == defn)        
-    
-    for field in flds:
-        addFieldToDict(classDict, field, None)
-        
-    classDict[className]['groups_cited'] = []
-    for group in defn.getElementsByTagName('group'):
-        groupName = group.getAttribute('type')
-        classDict[className]['groups_cited'] += [groupName]
-
-        
-pickle.dump(classDict, open(baseclass_pickle_file, "wb" ) )
-pickle.dump(tagsDict, open(tags_pickle_file, "wb" ) )
-
+    # merge in sorted file order, so that the result does not depend on the number of workers
+    classDict = nxdl_merge.merge_base_classes(base_class_records, join_string, join_string_label, default_units, merge_stats)
+    counts['files'] = len(base_class_records)
+    counts['classes'] = len(classDict)
 
 
 # In[6]:
@@ -269,65 +203,21 @@ pickle.dump(tagsDict, open(tags_pickle_file, "wb" ) )
 # parse nexus application definitions
 # extract extra base class fields and add to base class dictionary
 
-import xml.dom.minidom
 import os
 #import yaml
-import urllib
-import time
-import pickle
-
-
-#get a list of NeXus base application definition urls from github       
-application_url = []
-for file in repo.get_contents("applications"):
-    try:
-        if str(file).split('.')[-2] == 'nxdl':
-            application_url += [file.download_url]
-    except:
-        pass
-
 
-applicationDict = {}
 
-for file in application_url:
-
-
-    dom1 = xml.dom.minidom.parse(urllib.request.urlopen(file)) # pick one at random 
-
-    appdefn = dom1.getElementsByTagName('definition')[0]
-    defn_name = appdefn.getAttribute('name')
-
-    group = dom1.getElementsByTagName('group')
-    classList, classNameList = [], []
-    for defn in group:
-        className = defn.getAttribute('type')
-        classNameList += [className]
-    
-        # look for fields in group but not recursive
-        flds = (field for field in defn.getElementsByTagName('field') if field.parentNode == defn)           
-        for field in flds:
-            #print('=== Added field %s from class %s in application definition %s' % (field.getAttribute('name'), className, defn_name))
-            addFieldToDict(classDict, field, defn_name)
-
-            
-    docstr = ''        
-    for docelement in dom1.getElementsByTagName('doc'):
-        if docelement.parentNode.tagName == 'definition':
-            docstr = docelement.firstChild.nodeValue.replace('\n','')
-            break
-            
+with report.stage('applications') as counts:
+    #get NeXus application definitions (url, parsed record), from the parse cache if unchanged
+    application_records = parse_cache.parse_files(source, 'applications', nxdl_parse.parse_application, _parseWorkers)
     
-    # get information about application definition (name, xml_file, extends, doc) and add to dict
-    
-    applicationDict[defn_name] = {} # new entry with definition nae as key
-    applicationDict[defn_name]['extends'] = appdefn.getAttribute('extends')
-    applicationDict[defn_name]['doc'] = docstr
-    applicationDict[defn_name]['xml_file'] = file
-    applicationDict[defn_name]['groups_cited'] = classNameList     
+    # fields not already defined by a base class (or an earlier application definition) are added to classDict
+    applicationDict = nxdl_merge.merge_applications(classDict, application_records, join_string, join_string_label,
+                                                    default_units, merge_stats)
+    counts['files'] = len(application_records)
+    counts['application_definitions'] = len(applicationDict)
 
 
-pickle.dump(classDict, open(baseclass_pickle_file, "wb" ) ) # re-save class dict (now has new fields)
-pickle.dump(applicationDict, open(defn_pickle_file, "wb" ) )
 #pprint(applicationDict)
         
         
@@ -337,219 +227,207 @@ pickle.dump(applicationDict, open(defn_pickle_file, "wb" ) )
 # In[7]:
 
 
-# create owl ontology from previously created dicts using owlready2 module
+# create owl ontology from previously created dicts
+# the triples are written straight to the output files (RDF/XML, Turtle, N-Triples) without owlready2
 
-from owlready2 import *
-import types
+import os
 import datetime
+from nexus_ontology import onto_rdf
+from nexus_ontology import onto_index
+from nexus_ontology import onto_store
+from nexus_ontology import onto_patch
+from nexus_ontology import onto_closure
+from nexus_ontology import onto_modules
+from nexus_ontology import nxdl_model
+from nexus_ontology import nxdl_plans
+from nexus_ontology import nxdl_versions
+
+version = '%s-%s' % (tagsDict['name'], _script_version) # from NeXus tag and script version
+
+onto_settings = {
+    'base_iri': base_iri,
+    'onto_iri': onto_iri,
+    'version': version,
+    'created': datetime.date.today().strftime("%b-%d-%Y"),
+    'comment': onto_comment,
+    'creator': _creator,
+    'licence': _licence,
+    'see_also': [nexus_website, nexus_repository, _publication],
+    'base_class_web_page_prefix': base_class_web_page_prefix,
+    'application_web_page_prefix': application_definition_web_page_prefix,
+    'class_index_page': 'https://manual.nexusformat.org/classes/index.html',
+    'test_individuals': test_individuals}
+
+if previous_ontology: # read before the new files replace it
+    with report.stage('changeset'):
+        previous_triples = onto_patch.read(previous_ontology)
+
+with report.stage('ontology'):
+    ontology_files = onto_rdf.write_ontology(os.path.join(out_path, onto_name), output_formats,
+                                             classDict, applicationDict, typesDict, onto_settings, onto_stats)
+
+if previous_ontology:
+    with report.stage('changeset') as counts:
+        new_triples = onto_patch.triples(onto_rdf.describe(classDict, applicationDict, typesDict, onto_settings))
+        ontology_files += onto_patch.write_changeset(os.path.join(out_path, onto_name), previous_triples, new_triples,
+                                                     changeset_formats, counts)
+        print('=== Changes since %s: %i triples removed, %i added (%i classes added, %i removed, %i changed)' % (
+            previous_ontology, counts['triples_removed'], counts['triples_added'],
+            counts['classes_added'], counts['classes_removed'], counts['classes_changed']))
+
+if write_lookup_index:
+    with report.stage('lookup_index'):
+        ontology_files.append(onto_index.write_index(os.path.join(out_path, onto_name + '.index'), classDict, onto_settings))
+
+if write_modules:
+    with report.stage('modules') as counts:
+        module_files = onto_modules.write_modules(os.path.join(out_path, onto_name + '-modules'), module_format,
+                                                  classDict, applicationDict, typesDict, onto_settings, onto_name)
+        ontology_files += module_files
+        counts['files'] = len(module_files)
+
+if write_closures or closure_triples:
+    with report.stage('closures') as counts:
+        closures = onto_closure.build(classDict, applicationDict, version)
+        if write_closures:
+            onto_closure.save(os.path.join(out_path, onto_name + '.closure'), closures)
+            ontology_files.append(os.path.join(out_path, onto_name + '.closure'))
+        if closure_triples:
+            ontology_files += onto_closure.write_triples(os.path.join(out_path, onto_name + '-closure'), output_formats,
+                                                         closures, onto_settings)
+        counts['classes'] = len(closures.names)
+
+if write_validation_plans:
+    with report.stage('validation_plans') as counts:
+        # compiled application definitions are cached per file, as the parsed records, in a cache of their own
+        plan_cache = nxdl_cache.ParseCache(parse_cache_path, nxdl_plans.compiler_version)
+        plans = nxdl_plans.build(plan_cache.parse_files(source, 'applications', nxdl_plans.compile_application, _parseWorkers),
+                                 classDict, version, join_string)
+        nxdl_plans.save(os.path.join(out_path, onto_name + '.plans'), plans)
+        ontology_files.append(os.path.join(out_path, onto_name + '.plans'))
+        counts['application_definitions'] = len(plans.plans)
+
+if write_sqlite_store:
+    with report.stage('sqlite_store'):
+        ontology_files.append(onto_store.write_store(os.path.join(out_path, onto_name + '.sqlite'),
+                                                     classDict, applicationDict, typesDict, onto_settings, join_string))
+
+if save_model:
+    with report.stage('model'):
+        model_file = os.path.join(out_path, onto_name + '.nxmodel')
+        nxdl_model.save(model_file, classDict, applicationDict, typesDict, tagsDict)
+        ontology_files.append(model_file)
+
+if build_all_versions:
+    with report.stage('versions') as counts:
+        # files common to several versions are parsed once (parse_cache); each version is merged and written
+        for tag, *model in nxdl_versions.versions(source, parse_cache, version_tags or None, _parseWorkers,
+                                                  join_string, join_string_label, default_units):
+            ontology_files += onto_rdf.write_ontology(os.path.join(out_path, '%s-%s' % (onto_name, tag)), output_formats,
+                                                      *model[:3], dict(onto_settings, version='%s-%s' % (tag, _script_version)),
+                                                      onto_stats)
+            counts['versions'] += 1
+        print('=== Wrote %i versions of the ontology' % counts['versions'])
+
+if write_build_report:
+    report.info['version'] = version
+    report.info['files'] = [os.path.basename(f) for f in ontology_files]
+    ontology_files += report.write(os.path.join(out_path, onto_name + '.build.json'),
+                                   os.path.join(out_path, onto_name + '.prof'))
 
-onto_path.append(out_path)
-onto = get_ontology(onto_iri)
 
-# get properties from cdterms
-with get_ontology("http://purl.org/dc/terms/"):
-    class creator(AnnotationProperty): pass
-    class licence(AnnotationProperty): pass
-    class created(AnnotationProperty): pass
+# In[8]:
 
-with onto:
-   
-    #xxxx delete ###############################################
-    #try:
-    #    nexus_version = tagsDict['name']
-    #except:
-    #    nexus_version = 'Unknown'
-    #    print('=== Problem getting version from github name tag')
-    #    
-    #version = 'Creation date: %s\nNeXus version: %s' % (datetime.date.today().strftime("%b-%d-%Y"), nexus_version)
 
+# optional: load the written RDF/XML file with owlready2 and check it against the dicts
+
+if validate_with_owlready2:
     
-    version = '%s-%s' % (tagsDict['name'], _script_version) # from NeXus tag and script version
-    
-    
-    onto.metadata.versionInfo.append(version)
-    onto.metadata.creator = _creator
-    onto.metadata.licence = _licence
-    onto.metadata.seeAlso.append(nexus_website)
-    onto.metadata.seeAlso.append(nexus_repository)
-    onto.metadata.seeAlso.append(_publication)
-    onto.metadata.comment.append(onto_comment)
-    onto.metadata.created.append(datetime.date.today().strftime("%b-%d-%Y"))
-    
-    
-    class NeXus(Thing):
-        comment = 'NeXus concept'
-        
-    class dataset(Thing):
-        comment = 'Dummy data set'
-   
-    class NeXusField(ObjectProperty):
-        domain = [dataset]
-        comment = 'NeXus field (ObjectProperty). Unique names are created by prepending the NeXus class name to the NeXus field name'
-      
-    class NXobject(NeXus):
-        comment = classDict['NXobject']['classDoc'].replace('\t','') # NeXus documentation string
-        seeAlso = base_class_web_page_prefix + 'NXobject' + '.html'
-    NXobject.set_iri(NXobject, base_iri + 'NXobject')   #set iri using agree pattern for Nexus
-           
-    class NeXusBaseClass(NXobject):
-        comment = 'NeXus Base Class'
-        seeAlso = 'https://manual.nexusformat.org/classes/index.html'
-    
-    class NeXusApplicationDefinition(NXobject):
-        comment = 'NeXus Application Definition'
-        seeAlso = 'https://manual.nexusformat.org/classes/index.html'
-      
-    class citesGroup(NXobject >> NeXusBaseClass):
-        comment = 'NXobject cites base class relationship'
-           
-    class extends(AnnotationProperty):
-        pass
-    
-    class NeXusType(AnnotationProperty):
-        pass
-    
-    class unit(AnnotationProperty):
-        pass
-    
-    class NeXusClass(AnnotationProperty):
-        pass
+    from owlready2 import IRIS, Restriction, get_ontology, onto_path
     
-    class unitCategory(NeXus):
-        comment = 'NeXus unit category. Can be considered instances of a measure. Assign data properties '             'hasValue(any), hasMinValue(any), hasMaxValue(any), hasUnits(str)'
-        
-    class hasValue(DataProperty, FunctionalProperty):
-        domain = [unitCategory]
-        comment = 'NeXus field value'
-        
-    class hasMinValue(DataProperty, FunctionalProperty):
-        domain = [unitCategory]
-        comment = 'Minimum of NeXus field value'
-        
-    class hasMaxValue(DataProperty, FunctionalProperty):
-        domain = [unitCategory]
-        comment = 'Maximum of NeXus field value'    
+    onto_path.append(out_path)
+    onto = get_ontology(onto_iri).load()
     
-    class hasUnit(DataProperty, FunctionalProperty):
-        domain = [unitCategory]
-        range = [str]
-        comment = 'NeXus unit (string). Should be consistent with unit category.'
+    problems = []
     
+    for nxBaseClass in classDict.keys():
+        if IRIS[base_iri + nxBaseClass] is None:
+            problems += ['missing class %s' % nxBaseClass]
+        if nxBaseClass == 'NXobject':    # NXobject fields are not in the ontology
+            continue
+        for nxField in classDict[nxBaseClass]['fields'].keys():
+            _nx_field = IRIS[base_iri + nxField]
+            unit_iri = onto_iri + '#' + classDict[nxBaseClass]['fields'][nxField]['units']
+            if _nx_field is None:
+                problems += ['missing field %s' % nxField]
+            elif [r.iri for r in _nx_field.range] != [unit_iri]:
+                problems += ['wrong range for field %s' % nxField]
     
-    for unit in typesDict.keys():
-        if unit == 'anyUnitsAttr': # general description, not specific unit category
-            unitCategory.comment.append(typesDict[unit]['doc']) # use to document unitCategory class
-        elif unit == 'primitiveType': # do nothing with this entry
-            pass
-        else:
-            typesDict[unit]['class'] = types.new_class(unit, (unitCategory,)) # create new unit category subclass
-            typesDict[unit]['class'].comment.append(typesDict[unit]['doc'])   # document it
-
+    for application in applicationDict.keys():
+        if IRIS[base_iri + application] is None:
+            problems += ['missing application definition %s' % application]
     
+    if write_lookup_index:
+        for entry in onto_index.load(os.path.join(out_path, onto_name + '.index')):
+            _nx_field = IRIS[entry.iri]
+            if _nx_field is None or _nx_field.label != [entry.label] or [r.iri for r in _nx_field.range] != [entry.unit_iri]:
+                problems += ['index entry %s does not match the ontology' % entry.name]
     
-    for nxBaseClass in classDict.keys():
-        
-        if not nxBaseClass == 'NXobject':    # NXobject can't be subclass of NXobject
-            _nx_class = types.new_class(nxBaseClass, (NeXusBaseClass,))
-            _nx_class.set_iri(_nx_class, base_iri + nxBaseClass) # use agreed term iri
-            classDict[nxBaseClass]['onto_class'] =  _nx_class    # add class to dict 
-            _nx_class.comment.append(classDict[nxBaseClass]['classDoc'])
-            _nx_class.extends.append(classDict[nxBaseClass]['extends'])
-            web_page = base_class_web_page_prefix + nxBaseClass + '.html' 
-            
-            _nx_class.seeAlso.append(web_page) 
-                
-            for nxField in classDict[nxBaseClass]['fields'].keys():  #loop through each field in base class
-   
-                _nx_field = types.new_class(nxField, (NeXusField, ))
+    n_restrictions = sum(isinstance(c, Restriction) for cls in onto.classes() for c in cls.is_a)
+    expected = onto_rdf.restriction_count(onto_rdf.describe(classDict, applicationDict, typesDict, onto_settings))
+    if n_restrictions != expected:
+        problems += ['%i restrictions, expected %i' % (n_restrictions, expected)]
     
-                _nx_field.set_iri(base_iri + nxField) # use agreed term iri (seem to need only single parameter for properties)
-            
-                classDict[nxBaseClass]['fields'][nxField]['class'] = _nx_field
+    if write_sqlite_store:
+        with onto_store.load(os.path.join(out_path, onto_name + '.sqlite')) as store:
+            if len(store.restrictions()) != n_restrictions:
+                problems += ['%i restrictions in the SQLite store, %i in the ontology' % (len(store.restrictions()), n_restrictions)]
+            for row in store.classes():
+                if IRIS[row['iri']] is None:
+                    problems += ['SQLite store class %s not in the ontology' % row['name']]
     
-                
-                _nx_field.comment.append(classDict[nxBaseClass]['fields'][nxField]['fieldDoc'])
-                _nx_field.label.append(classDict[nxBaseClass]['fields'][nxField]['label'])
-      
-        
-                defn_name = classDict[nxBaseClass]['fields'][nxField]['defn_name']
-            
-                            
-                if defn_name != None:
-                    #Field is defined by an application definition; give app defn web page (no anchor - might add later)
-                    web_page = application_definition_web_page_prefix + defn_name + '.html'
-                    _nx_field.seeAlso.append(web_page)
-                else:
-                    #Field is defined by base class file; give base class web page with arhchor
-                    
-                    anchor = '#%s-%s-field' % (nxBaseClass.lower(), 
-                                               classDict[nxBaseClass]['fields'][nxField]['fieldName'].lower())
-                    anchor = anchor.replace('_', '-') # replace symbols for anchors
-                    
-                    web_page = base_class_web_page_prefix + nxBaseClass + '.html' + anchor
-                    _nx_field.seeAlso.append(web_page)
-                
-                
-                unit_string = classDict[nxBaseClass]['fields'][nxField]['units']
-                unit_class = typesDict[unit_string]['class']
-                _nx_class.is_a.append(_nx_field.some(unit_class))
-                     
-                _nx_field.NeXusClass.append(_nx_class)
-
-                _nx_field.range = [unit_class]
-                
-
-    # second loop required to ensure all classes defined before trying to cite them            
-    for nxBaseClass in classDict.keys():  
-        if not nxBaseClass == 'NXobject':    # NXobject can't be subclass of NXobject
-            for cited in classDict[nxBaseClass]['groups_cited']:
-                classDict[nxBaseClass]['onto_class'].is_a.append(citesGroup.some(classDict[cited]['onto_class']))
-                
-                
-    for application in applicationDict.keys():
-        _nx_app = types.new_class(application, (NeXusApplicationDefinition,))
-        _nx_app.set_iri(_nx_app, base_iri + application) # use agreed term iri
-        
-        _nx_app.comment.append(applicationDict[application]['doc'])
-        _nx_app.extends.append(applicationDict[application]['extends'])
-
-        web_page = application_definition_web_page_prefix + application + '.html'
-        _nx_app.seeAlso.append(web_page)
-        
-        for base_class in applicationDict[application]['groups_cited']:
-            _nx_app.is_a.append(citesGroup.some(classDict[base_class]['onto_class']))
+    for problem in problems:
+        print('=== Validation problem: %s' % problem)
+    print('=== Validated %s with owlready2: %i problems' % (onto.base_iri, len(problems)))
 
 
-onto.save()
+# In[9]:
 
 
+# create individuals - these are just for testing (needs owlready2, not saved)
+# with test_individuals they are already in the written ontology
 
 
-# In[8]:
+if validate_with_owlready2 and not test_individuals:
+    
+    with onto:
+        
+        sample_temp_1 = onto.NX_TEMPERATURE('sample_temp_1')
+        sample_temp_1.hasUnit = 'Kelvin'
+        sample_temp_1.hasValue = 10
+        
+        dataset_1 = onto.dataset('dataset1')
+        setattr(dataset_1,'NXsample%stemperature' % join_string, [sample_temp_1])
+        
+        
+        beam_energy_1 = onto.NX_ENERGY('beam_energy_1')
+        beam_energy_1.hasUnit = 'keV'
+        beam_energy_1.hasValue = 12.4
+        
+        dataset_2 = onto.dataset('dataset2')
+        setattr(dataset_2,'NXbeam%sfinal_energy' % join_string, [beam_energy_1]) 
 
 
-# create individuals - these are just for testing
+# In[10]:
 
 
-with onto:
-        
-    sample_temp_1 = typesDict['NX_TEMPERATURE']['class']('sample_temp_1')
-    sample_temp_1.hasUnit = 'Kelvin'
-    sample_temp_1.hasValue = 10
-    
-    dataset_1 = dataset('dataset1')
-    setattr(dataset_1,'NXsample%stemperature' % join_string, [sample_temp_1])
-    
-    
-    beam_energy_1 = typesDict['NX_ENERGY']['class']('beam_energy_1')
-    beam_energy_1.hasUnit = 'keV'
-    beam_energy_1.hasValue = 12.4
-    
-    dataset_2 = dataset('dataset2')
-    setattr(dataset_2,'NXbeam%sfinal_energy' % join_string, [beam_energy_1]) 
+# optional: watch local_path and serve the ontology and field lookups on http://127.0.0.1:<watch_port>/,
+# re-parsing only the nxdl files that change (runs until interrupted)
 
-        
-onto.save()
+if watch_definitions:
+    from nexus_ontology import onto_watch
+    onto_watch.serve(onto_watch.Watcher(local_path, onto_settings, parse_cache, join_string, join_string_label, default_units),
+                     port=watch_port)
 
 
 # In[ ]:
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# Benchmark of the HDF5 annotator (hdf5_annotate) on synthetic NeXus files
+#
+# usage: python bench_annotate.py <index file> [files] [fields per group] [workers]
+#
+# Writes files with NXentry / NXsample / NXinstrument / NXdetector / NXsource
+# / NXmonochromator / NXdata groups to a temporary directory. Each group has
+# fields of its class taken from the index (with units attributes), a few
+# fields that are not in the ontology, and NXdata links to the detector data.
+# The files are annotated with 1 worker and with the given number of workers,
+# and both outputs are compared.
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import hdf5_annotate
+from nexus_ontology import onto_index
+
+
+layout = [('/entry', 'NXentry'),
+          ('/entry/sample', 'NXsample'),
+          ('/entry/instrument', 'NXinstrument'),
+          ('/entry/instrument/detector', 'NXdetector'),
+          ('/entry/instrument/source', 'NXsource'),
+          ('/entry/instrument/monochromator', 'NXmonochromator'),
+          ('/entry/data', 'NXdata')]
+
+
+def write_files(index, path, n_files, n_fields):
+    for i in range(n_files):
+        with h5py.File(os.path.join(path, 'scan_%06i.nxs' % i), 'w') as f:
+            for group_path, nx_class in layout:
+                group = f.create_group(group_path)
+                group.attrs['NX_class'] = nx_class
+                entries = index.fields(nx_class)
+                for entry in entries[(i * 7) % max(1, len(entries)):][:n_fields]:
+                    dataset = group.create_dataset(entry.fieldName, data=numpy.float64(i))
+                    dataset.attrs['units'] = 'mm'
+                group.create_dataset('local_field_%i' % (i % 3), data=i)
+            f['/entry/instrument/detector'].create_dataset('frames', data=numpy.zeros((10, 64, 64), 'u2'))
+            f['/entry/data/frames'] = h5py.SoftLink('/entry/instrument/detector/frames')
+
+
+def main(index_file, n_files=1000, n_fields=20, workers=os.cpu_count() or 1):
+    index = onto_index.load(index_file)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_files(index, tmp, n_files, n_fields)
+        print('wrote %i files in %.1f s' % (n_files, time.perf_counter() - start))
+        files = hdf5_annotate.find_files([tmp])
+
+        print('%8s %10s %10s %10s %12s %12s' % ('workers', 'records', 'resolved', 'time (s)', 'files/s', 'records/s'))
+        outputs = []
+        for w in sorted(set([1, workers])):
+            out = io.StringIO()
+            start = time.perf_counter()
+            counts = hdf5_annotate.annotate(index_file, files, out, w)
+            elapsed = time.perf_counter() - start
+            outputs.append(out.getvalue())
+            print('%8i %10i %10i %10.2f %12.0f %12.0f' % (w, counts['records'], counts['resolved'], elapsed,
+                                                          counts['files'] / elapsed, counts['records'] / elapsed))
+        if len(set(outputs)) != 1:
+            raise SystemExit('=== Annotations differ between worker counts')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_annotate.py <index file> [files] [fields per group] [workers]')
+    main(sys.argv[1], *[int(a) for a in sys.argv[2:5]])
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# Benchmark of the stages of the ontology build on synthetic corpora
+#
+# usage: python bench_build.py [--scales 1 10 100] [--source local|http] [--workers N]
+#                              [--baselines FILE] [--save-baselines] [--tolerance 0.5] [--no-memory]
+#                              [--output results.json]
+#
+# For each scale a synthetic definitions corpus (nxdl_corpus) is written to a
+# temporary directory and read either from there (LocalSource) or through a
+# stand-in GitHub server on localhost (ArchiveSource). The build runs stage by
+# stage as in the ontology script, without the parse cache, and the wall time
+# and peak memory (tracemalloc, in a second run) of every stage are recorded.
+# Peak memory does not include worker processes (--workers > 1).
+#
+# Results are compared with the stored baselines (baselines.json next to this
+# file) and stages that take more time or memory than baseline * (1 + tolerance)
+# are reported; the exit status is 1 if there are any. Baselines depend on the
+# machine: save new ones (--save-baselines) before comparing on another machine.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import nxdl_corpus
+from nexus_ontology import nxdl_fetch
+from nexus_ontology import nxdl_merge
+from nexus_ontology import nxdl_model
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from nexus_ontology import onto_index
+from nexus_ontology import onto_rdf
+from nexus_ontology import onto_store
+
+
+default_baselines = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+base_iri = 'http://purl.org/nexusformat/definitions/'
+settings = {
+    'base_iri': base_iri,
+    'onto_iri': base_iri + 'NeXusOntology',
+    'created': 'Jan-01-2000',
+    'comment': 'synthetic benchmark ontology',
+    'creator': 'bench_build',
+    'licence': 'http://creativecommons.org/licenses/by/4.0/',
+    'see_also': ['https://www.nexusformat.org/'],
+    'base_class_web_page_prefix': 'https://manual.nexusformat.org/classes/base_classes/',
+    'application_web_page_prefix': 'https://manual.nexusformat.org/classes/applications/',
+    'class_index_page': 'https://manual.nexusformat.org/classes/index.html'}
+
+
+class Stages:
+    '''Records the wall time, or the peak traced memory, of named stages'''
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.results = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # deprecation warnings
+            yield
+        if self.memory:
+            self.results[name] = (tracemalloc.get_traced_memory()[1] - before) / 1e6
+        else:
+            self.results[name] = time.perf_counter() - start
+
+
+def build(source, out_path, workers, stage):
+    '''Run the stages of the ontology script for source, writing the outputs to out_path'''
+    with stage('tags'):
+        tagsDict = source.get_tags()[0]
+    with stage('fetch_types'):
+        types_content = source.get_types()
+    with stage('parse_types'):
+        typesDict = nxdl_parse.parse_types(types_content)
+    with stage('fetch_base_classes'):
+        files = source.get_files('base_classes')
+    with stage('parse_base_classes'):
+        records = list(zip([f for f, c in files], nxdl_parse.parse_all(nxdl_parse.parse_base_class, [c for f, c in files], workers)))
+    with stage('merge_base_classes'):
+        classDict = nxdl_merge.merge_base_classes(records)
+    with stage('fetch_applications'):
+        files = source.get_files('applications')
+    with stage('parse_applications'):
+        records = list(zip([f for f, c in files], nxdl_parse.parse_all(nxdl_parse.parse_application, [c for f, c in files], workers)))
+    with stage('merge_applications'):
+        applicationDict = nxdl_merge.merge_applications(classDict, records)
+    onto_settings = dict(settings, version=tagsDict['name'])
+    path = os.path.join(out_path, 'NeXusOntology')
+    for fmt in onto_rdf.writers:
+        with stage('write_' + fmt):
+            onto_rdf.write_ontology(path, [fmt], classDict, applicationDict, typesDict, onto_settings)
+    with stage('write_index'):
+        onto_index.write_index(path + '.index', classDict, onto_settings)
+    with stage('write_store'):
+        onto_store.write_store(path + '.sqlite', classDict, applicationDict, typesDict, onto_settings)
+    with stage('save_model'):
+        nxdl_model.save(path + '.nxmodel', classDict, applicationDict, typesDict, tagsDict)
+
+
+def run(scale, source_kind, workers, memory):
+    '''Return {stage: {'time': s, 'peak_mb': MB}} for a corpus of the given scale'''
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'definitions')
+        out_path = os.path.join(tmp, 'out')
+        os.mkdir(out_path)
+        n_files, size = nxdl_corpus.write_corpus(corpus, scale)
+        print('=== %ix corpus: %i files, %.1f MB' % (scale, n_files, size / 1e6))
+
+        server = None
+        def new_source():
+            if source_kind == 'local':
+                return nxdl_source.LocalSource(corpus)
+            return nxdl_source.ArchiveSource('nexusformat/definitions', nxdl_fetch.Fetcher(), api=api + 'repos/')
+        if source_kind == 'http':
+            server, api = nxdl_corpus.serve(corpus)
+        try:
+            times = Stages()
+            build(new_source(), out_path, workers, times)
+            peaks = Stages(memory=True)
+            if memory:
+                tracemalloc.start()
+                try:
+                    build(new_source(), out_path, workers, peaks)
+                finally:
+                    tracemalloc.stop()
+        finally:
+            if server is not None:
+                server.shutdown()
+        return {name: {'time': round(times.results[name], 4), 'peak_mb': round(peaks.results[name], 2) if memory else None}
+                for name in times.results}
+
+
+def compare(results, baseline, tolerance):
+    '''Print results against baseline; return the list of regressions'''
+    regressions = []
+    print('%-20s %10s %10s %10s %10s  %s' % ('stage', 'time (s)', 'baseline', 'peak (MB)', 'baseline', ''))
+    for name, result in results.items():
+        base = baseline.get(name, {})
+        flags = []
+        if base.get('time') is not None and result['time'] > base['time'] * (1 + tolerance) and result['time'] - base['time'] > 0.05:
+            flags.append('slower')
+        if base.get('peak_mb') is not None and result['peak_mb'] is not None and \
+                result['peak_mb'] > base['peak_mb'] * (1 + tolerance) and result['peak_mb'] - base['peak_mb'] > 1:
+            flags.append('more memory')
+        regressions += ['%s: %s' % (name, flag) for flag in flags]
+        fmt = lambda value, spec: '-' if value is None else spec % value
+        print('%-20s %10s %10s %10s %10s  %s' % (name, fmt(result['time'], '%.3f'), fmt(base.get('time'), '%.3f'),
+                                                 fmt(result['peak_mb'], '%.1f'), fmt(base.get('peak_mb'), '%.1f'),
+                                                 ', '.join(flags).upper()))
+    print('%-20s %10.3f %10s' % ('total', sum(r['time'] for r in results.values()),
+                                 '%.3f' % sum(b['time'] for b in baseline.values()) if baseline else '-'))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the stages of the ontology build on synthetic corpora')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10], help='corpus sizes, in multiples of the real corpus')
+    parser.add_argument('--source', choices=('local', 'http'), default='local', help='read the corpus from disk or a local HTTP server')
+    parser.add_argument('--workers', type=int, default=1, help='parse worker processes')
+    parser.add_argument('--baselines', default=default_baselines, help='baselines file')
+    parser.add_argument('--save-baselines', action='store_true', help='store the results as the new baselines')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative increase of time and memory')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory (one run per scale)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.isfile(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+
+    results, regressions = {}, []
+    for scale in args.scales:
+        key = '%ix-%s-%iw' % (scale, args.source, args.workers)
+        results[key] = run(scale, args.source, args.workers, not args.no_memory)
+        regressions += ['%s %s' % (key, r) for r in compare(results[key], baselines.get(key, {}), args.tolerance)]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.save_baselines:
+        baselines.update(results)
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print('=== Saved baselines for %s to %s' % (', '.join(results), args.baselines))
+    for regression in regressions:
+        print('=== Regression: %s' % regression)
+    return 1 if regressions and not args.save_baselines else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# Closure queries (onto_closure) against walking the definitions for every query
+#
+# usage: python bench_closure.py [scales...]
+#
+# For synthetic definitions (nxdl_corpus) at each scale, times building,
+# saving and loading the closures, and answering "which base classes can
+# appear anywhere under <class>" and "what extends <class>" for every class,
+# from the loaded closures and by a breadth-first walk of the definitions.
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_patch
+import nxdl_corpus
+from nexus_ontology import onto_closure
+
+
+def walk(graph, relation, name, inverse=False):
+    '''Classes reached from name (or reaching it) by a walk of the direct relation'''
+    if inverse:
+        return sorted(other for other in graph[relation] if name in walk(graph, relation, other))
+    seen, todo = set(), list(graph[relation].get(name, ()))
+    while todo:
+        node = todo.pop()
+        if node not in seen:
+            seen.add(node)
+            todo += graph[relation].get(node, ())
+    return sorted(seen)
+
+
+def main(scales=(1, 10)):
+    print('%-6s %8s %10s %10s %10s %12s %12s %12s' % ('scale', 'classes', 'build (s)', 'save (s)', 'load (s)',
+                                                    'cited (ms)', 'walk (ms)', 'inv. walk (ms)'))
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            nxdl_corpus.write_corpus(tmp, scale)
+            with contextlib.redirect_stdout(io.StringIO()):
+                classDict, applicationDict, typesDict = bench_patch.dicts(tmp)
+            start = time.perf_counter()
+            closures = onto_closure.build(classDict, applicationDict)
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            onto_closure.save(os.path.join(tmp, 'closure'), closures)
+            save = time.perf_counter() - start
+            start = time.perf_counter()
+            closures = onto_closure.load(os.path.join(tmp, 'closure'))
+            load = time.perf_counter() - start
+
+            names = closures.names
+            start = time.perf_counter()
+            for name in names:
+                closures.cited(name)
+                closures.descendants(name)
+            cited = time.perf_counter() - start
+            graph = onto_closure.edges(classDict, applicationDict)
+            start = time.perf_counter()
+            for name in names:
+                assert walk(graph, 'citesGroup', name) == closures.cited(name)
+            walked = time.perf_counter() - start
+            sample = names[:20] # the inverse walk visits every class per query
+            start = time.perf_counter()
+            for name in sample:
+                assert walk(graph, 'extends', name, inverse=True) == closures.descendants(name)
+            inverse = (time.perf_counter() - start) * len(names) / len(sample)
+            print('%-6s %8i %10.3f %10.3f %10.3f %12.1f %12.1f %12.1f' % ('%ix' % scale, len(names), build, save, load,
+                                                                        1000 * cited, 1000 * walked, 1000 * inverse))
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or (1, 10))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# Import time of the library interface (nexus_ontology) and of what a short-lived tool loads with it
+#
+# usage: python bench_import.py [repeats] [budget ms]
+#
+# Builds the ontology of a synthetic corpus (nxdl_corpus) with nexus_ontology
+# into a temporary directory, then times each consumer in a fresh python
+# process: importing the module, one lookup in the index, loading the model,
+# importing every helper module eagerly, and importing owlready2 if it is
+# installed. Times exclude the start of the interpreter. The module import,
+# the lookup and the model load must not import owlready2, PyGithub, the XML
+# libraries, numpy, h5py or the process pools, and the lookup must take less
+# than budget ms; otherwise the benchmark exits with an error.
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+
+script_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, script_dir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_build
+import nxdl_corpus
+import nexus_ontology
+
+# top-level modules that the lazy consumers must not import
+heavy = ('owlready2', 'github', 'xml', 'pyexpat', 'numpy', 'h5py', 'multiprocessing', 'concurrent', 'sqlite3', 'http')
+
+_consumer = '''
+import sys, time
+sys.path.insert(0, %(script_dir)r)
+start = time.perf_counter()
+%(code)s
+elapsed = time.perf_counter() - start
+print(elapsed, repr(answer), ' '.join(sorted(set(m.split('.')[0] for m in sys.modules) & set(%(heavy)r))))
+'''
+
+consumers = {
+    'import': ('import nexus_ontology\n'
+               'answer = None', True),
+    'lookup': ('import nexus_ontology\n'
+               'answer = nexus_ontology.lookup(%(name)r, %(index)r).iri', True),
+    'load model': ('import nexus_ontology\n'
+                   'answer = len(nexus_ontology.load(%(model)r)[0])', True),
+    'all helpers': ('import nexus_ontology\n'
+                    'answer = len([getattr(nexus_ontology, m) for m in nexus_ontology._modules])', False),
+    'owlready2': ('import owlready2\n'
+                  'answer = owlready2.VERSION', False)}
+
+
+def main(repeats=10, budget=50):
+    with tempfile.TemporaryDirectory() as tmp:
+        nxdl_corpus.write_corpus(os.path.join(tmp, 'definitions'), 1)
+        with contextlib.redirect_stdout(io.StringIO()): # deprecation warnings
+            model = nexus_ontology.build(os.path.join(tmp, 'definitions'))
+        nexus_ontology.write(tmp, model, ('owl',), dict(bench_build.settings, version='bench'))
+        index = os.path.join(tmp, nexus_ontology.onto_name + '.index')
+        args = {'index': index, 'model': os.path.join(tmp, nexus_ontology.onto_name + '.nxmodel'),
+                'name': next(iter(nexus_ontology.load_index(index))).label}
+
+        failures = []
+        print('%-12s %12s %12s   %s' % ('', 'best (ms)', 'median (ms)', 'heavy modules imported'))
+        for name, (code, lazy) in consumers.items():
+            times = []
+            for i in range(repeats):
+                result = subprocess.run([sys.executable, '-c', _consumer % {'script_dir': script_dir, 'heavy': heavy,
+                                                                            'code': code % args}],
+                                        capture_output=True, text=True)
+                if result.returncode != 0:
+                    print('%-12s %s' % (name, result.stderr.strip().splitlines()[-1]))
+                    break
+                elapsed, answer, *modules = result.stdout.split()
+                times.append(float(elapsed) * 1000)
+            else:
+                times.sort()
+                print('%-12s %12.1f %12.1f   %s' % (name, times[0], times[len(times) // 2], ' '.join(modules) or '-'))
+                if lazy and modules:
+                    failures.append('%s imports %s' % (name, ', '.join(modules)))
+                if name == 'lookup' and times[len(times) // 2] > budget:
+                    failures.append('lookup takes %.1f ms, more than %g ms' % (times[len(times) // 2], budget))
+        if failures:
+            raise SystemExit('=== ' + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main(*[float(a) if i else int(a) for i, a in enumerate(sys.argv[1:3])])
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# Benchmark of the field lookup index (onto_index): load time, and lookups
+# per second by long name, label, case-folded name and prefix. If owlready2 is
+# installed, the same resolutions are timed against the ontology loaded with
+# owlready2 (IRIS for long names, search_one for labels).
+#
+# usage: python bench_index.py <out_path of the script> [onto_name]
+#
+# The index and the .owl file must have been written by the script.
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import onto_index
+
+
+def rate(f, keys):
+    start = time.perf_counter()
+    for key in keys:
+        f(key)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def main(out_path, onto_name='NeXusOntology'):
+    index_file = os.path.join(out_path, onto_name + '.index')
+    start = time.perf_counter()
+    index = onto_index.load(index_file)
+    load_time = time.perf_counter() - start
+
+    entries = list(index)
+    keys = [random.choice(entries) for i in range(100000)]
+    names = [e.name for e in keys]
+    labels = [e.label for e in keys]
+    folded = [e.label.upper() for e in keys]
+    prefixes = [e.name[:len(e.className) + 3] for e in keys[:10000]]
+    for name, entry in zip(names, keys):
+        if index[name] != entry:
+            raise SystemExit('=== Index lookup of %s failed' % name)
+
+    print('%i fields, %.0f kB' % (len(index), os.path.getsize(index_file) / 1024))
+    print('%-28s %14s %14s' % ('', 'onto_index', 'owlready2'))
+    results = [('load (ms)', 1000 * load_time),
+               ('long name (lookups/s)', rate(index.__getitem__, names)),
+               ('label (lookups/s)', rate(index.__getitem__, labels)),
+               ('case-folded (lookups/s)', rate(lambda k: index.get(k, casefold=True), folded)),
+               ('prefix (queries/s)', rate(index.prefix, prefixes))]
+
+    try:
+        import owlready2
+    except ImportError:
+        owl = {}
+    else:
+        owlready2.onto_path.append(out_path)
+        start = time.perf_counter()
+        onto = owlready2.get_ontology('file://' + os.path.join(os.path.abspath(out_path), onto_name + '.owl')).load()
+        owl = {'load (ms)': 1000 * (time.perf_counter() - start),
+               'long name (lookups/s)': rate(owlready2.IRIS.__getitem__, [e.iri for e in keys]),
+               'label (lookups/s)': rate(lambda k: onto.search_one(label=k), labels[:1000])}
+
+    for name, value in results:
+        print('%-28s %14.1f %14s' % (name, value, '%.1f' % owl[name] if name in owl else '-'))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_index.py <out_path of the script> [onto_name]')
+    main(*sys.argv[1:3])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# Bulk ingestion of measurements (onto_individuals) against one owlready2 individual per value
+#
+# usage: python bench_ingest.py <out_path of the script> [rows] [batch size] [owlready2 rows]
+#
+# Random measurements of the fields in the lookup index (50 per dataset) are
+# added to a new measurement store in batches, and a smaller number of them
+# as owlready2 individuals of the loaded ontology, as in the test cell of the
+# script, then saved to a quadstore file. Rows per second are compared.
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import onto_index
+from nexus_ontology import onto_individuals
+from nexus_ontology import onto_units
+
+
+def batches(fields, rows, batch_size, seed=0):
+    rng = random.Random(seed)
+    for start in range(0, rows, batch_size):
+        n = min(batch_size, rows - start)
+        chosen = [rng.choice(fields) for i in range(n)]
+        yield {'dataset': ['http://example.org/dataset/%i' % ((start + i) // 50) for i in range(n)],
+               'field': [entry.iri for entry in chosen],
+               'value': [rng.random() * 100 for i in range(n)],
+               'min': [None] * n, 'max': [None] * n,
+               'unit': [onto_units.canonical_units.get(entry.units, 'K') for entry in chosen]}
+
+
+def owlready2_rows(out_path, fields, rows, tmp):
+    from owlready2 import World
+    world = World(filename=os.path.join(tmp, 'quadstore.sqlite3'))
+    onto = world.get_ontology('file://' + os.path.join(os.path.abspath(out_path), 'NeXusOntology.owl')).load()
+    start = time.perf_counter()
+    with onto:
+        for batch in batches(fields, rows, rows):
+            datasets = {}
+            for i, (dataset, iri, value) in enumerate(zip(batch['dataset'], batch['field'], batch['value'])):
+                if dataset not in datasets:
+                    datasets[dataset] = onto.dataset('dataset%i' % len(datasets))
+                entry = index_entries[iri]
+                measurement = world[entry.unit_iri]('m%i' % i)
+                measurement.hasUnit = 'K'
+                measurement.hasValue = value
+                getattr(datasets[dataset], world[iri].name).append(measurement)
+    world.save()
+    return time.perf_counter() - start
+
+
+def main(out_path, rows=1000000, batch_size=100000, owl_rows=10000):
+    global index_entries
+    index = onto_index.load(os.path.join(out_path, 'NeXusOntology.index'))
+    fields = list(index)
+    index_entries = {entry.iri: entry for entry in fields}
+    with tempfile.TemporaryDirectory() as tmp:
+        with onto_individuals.MeasurementStore(os.path.join(tmp, 'measurements.sqlite'), index) as store:
+            start = time.perf_counter()
+            counts = store.ingest(batches(fields, rows, batch_size))
+            seconds = time.perf_counter() - start
+        size = os.path.getsize(os.path.join(tmp, 'measurements.sqlite'))
+        print('%-12s %10s %10s %12s' % ('', 'rows', 'time (s)', 'rows/s'))
+        print('%-12s %10i %10.2f %12.0f   (%.1f MB)' % ('bulk', counts['added'], seconds, counts['added'] / seconds, size / 1e6))
+        try:
+            seconds = owlready2_rows(out_path, fields, owl_rows, tmp)
+        except ImportError:
+            print('%-12s not installed' % 'owlready2')
+        else:
+            print('%-12s %10i %10.2f %12.0f' % ('owlready2', owl_rows, seconds, owl_rows / seconds))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_ingest.py <out_path of the script> [rows] [batch size] [owlready2 rows]')
+    main(sys.argv[1], *[int(a) for a in sys.argv[2:5]])
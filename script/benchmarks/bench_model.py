@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# Benchmark of the slotted record model (nxdl_model) against the previous
+# nested dicts: memory held by classDict / applicationDict, memory held by a
+# second copy loaded next to the first (as for several definition versions,
+# which mostly share their strings), file size, and save / load time of
+# nxdl_model.save/load against pickling the dicts.
+#
+# usage: python bench_model.py <definitions checkout> [repeats]
+#
+# The loaded model is compared with the merged one before timing.
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import nxdl_merge
+from nexus_ontology import nxdl_model
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+
+
+def as_dicts(o):
+    # the previous representation: a fresh dict for every class, application and field
+    if isinstance(o, nxdl_model.Record):
+        return {k: as_dicts(o[k]) for k in o.keys()}
+    if isinstance(o, dict):
+        return {k: as_dicts(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return list(o)
+    return o
+
+
+def copy_strings(o):
+    # fresh copies of every string, as left by parsing without interning
+    if isinstance(o, str):
+        return (o + '.')[:-1]
+    if isinstance(o, dict):
+        return {copy_strings(k): copy_strings(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [copy_strings(v) for v in o]
+    return o
+
+
+def size(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return data, held
+
+
+def best_time(f, repeats):
+    best = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(path, repeats=5):
+    source = nxdl_source.LocalSource(path)
+    base = [(xml_file, nxdl_parse.parse_base_class(content)) for xml_file, content in source.get_files('base_classes')]
+    apps = [(xml_file, nxdl_parse.parse_application(content)) for xml_file, content in source.get_files('applications')]
+    typesDict = nxdl_parse.parse_types(source.get_types())
+    tagsDict = source.get_tags()[0]
+    classDict, applicationDict = nxdl_merge.merge(base, apps)
+    n_fields = sum(len(cls['fields']) for cls in classDict.values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_file = os.path.join(tmp, 'model.nxmodel')
+        pickle_file = os.path.join(tmp, 'model.p')
+        nxdl_model.save(model_file, classDict, applicationDict, typesDict, tagsDict)
+        dicts = copy_strings(as_dicts((classDict, applicationDict, typesDict, tagsDict)))
+        with open(pickle_file, 'wb') as f:
+            pickle.dump(dicts, f)
+        if as_dicts(nxdl_model.load(model_file)) != dicts:
+            raise SystemExit('=== Loaded model differs from the merged model')
+
+        def load_pickle():
+            with open(pickle_file, 'rb') as f:
+                return pickle.load(f)
+
+        def save_pickle():
+            with open(pickle_file, 'wb') as f:
+                pickle.dump(dicts, f)
+
+        model, model_size = size(lambda: nxdl_model.load(model_file))
+        model_again, model_again_size = size(lambda: nxdl_model.load(model_file))
+        loaded, dicts_size = size(load_pickle)
+        loaded_again, dicts_again_size = size(load_pickle)
+
+        print('%i classes, %i fields, %i application definitions' % (len(classDict), n_fields, len(applicationDict)))
+        print('%-14s %12s %12s %12s %12s %12s' % ('', 'memory (kB)', 'copy 2 (kB)', 'file (kB)', 'save (ms)', 'load (ms)'))
+        print('%-14s %12.0f %12.0f %12.0f %12.2f %12.2f' % ('nested dicts', dicts_size / 1024, dicts_again_size / 1024, os.path.getsize(pickle_file) / 1024,
+                                                      1000 * best_time(save_pickle, repeats), 1000 * best_time(load_pickle, repeats)))
+        print('%-14s %12.0f %12.0f %12.0f %12.2f %12.2f' % ('nxdl_model', model_size / 1024, model_again_size / 1024, os.path.getsize(model_file) / 1024,
+                                                      1000 * best_time(lambda: nxdl_model.save(model_file, classDict, applicationDict, typesDict, tagsDict), repeats),
+                                                      1000 * best_time(lambda: nxdl_model.load(model_file), repeats)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_model.py <definitions checkout> [repeats]')
+    main(sys.argv[1], *[int(a) for a in sys.argv[2:3]])
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# Loading the modules of one class (onto_modules.ModuleLoader) against loading the whole ontology
+#
+# usage: python bench_modules.py <out_path of the script> [onto_name] [classes...]
+#
+# Needs the modules (write_modules = True) and the .owl and .nt files of the
+# ontology. Each class is loaded by a new loader, with the modules it imports,
+# and compared with reading the complete ontology with onto_patch.
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import onto_modules
+from nexus_ontology import onto_patch
+
+
+def main(out_path, onto_name='NeXusOntology', classes=('NXsample', 'NXbeam', 'NXmx', 'NXentry')):
+    print('%-24s %8s %10s %10s' % ('', 'modules', 'triples', 'time (s)'))
+    for fmt in ('owl', 'nt'):
+        start = time.perf_counter()
+        triples = onto_patch.read(os.path.join(out_path, onto_name + '.' + fmt))
+        print('%-24s %8s %10i %10.3f' % ('complete .' + fmt, '-', len(triples), time.perf_counter() - start))
+    for name in classes:
+        loader = onto_modules.ModuleLoader(os.path.join(out_path, onto_name + '-modules'))
+        start = time.perf_counter()
+        triples = loader.load(name)
+        print('%-24s %8i %10i %10.3f' % (name + ' modules', len(loader.modules), len(triples), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_modules.py <out_path of the script> [onto_name] [classes...]')
+    main(sys.argv[1], *sys.argv[2:3], *([sys.argv[3:]] if len(sys.argv) > 3 else []))
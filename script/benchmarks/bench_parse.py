@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# Benchmark of the single-pass nxdl extractor (nxdl_parse) against the
+# previous minidom / getElementsByTagName extractor, over a whole
+# definitions corpus.
+#
+# usage: python bench_parse.py <definitions checkout> [repeats]
+#
+# The records of both extractors are compared before timing.
+
+import os
+import sys
+import time
+import xml.dom.minidom
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+
+
+# previous extractor, kept here as the reference
+
+def _dom_field(field):
+    try:
+        field_doc = field.getElementsByTagName('doc')[0].firstChild.nodeValue.replace('\n','')
+    except:
+        field_doc = ''
+    return {'fieldName': field.getAttribute('name'),
+            'units': field.getAttribute('units'),
+            'type': field.getAttribute('type'),
+            'fieldDoc': field_doc,
+            'deprecated': field.getAttribute('deprecated')}
+
+
+def _dom_doc(dom):
+    for docelement in dom.getElementsByTagName('doc'):
+        if docelement.parentNode.tagName == 'definition':
+            return docelement.firstChild.nodeValue.replace('\n','')
+    return ''
+
+
+def _dom_fields(group):
+    return [_dom_field(field) for field in group.getElementsByTagName('field') if field.parentNode == group]
+
+
+def dom_base_class(content):
+    dom = xml.dom.minidom.parseString(content)
+    defn = dom.getElementsByTagName('definition')[0]
+    return {'name': defn.getAttribute('name'),
+            'extends': defn.getAttribute('extends'),
+            'classDoc': _dom_doc(dom),
+            'fields': _dom_fields(defn),
+            'groups_cited': [group.getAttribute('type') for group in defn.getElementsByTagName('group')]}
+
+
+def dom_application(content):
+    dom = xml.dom.minidom.parseString(content)
+    appdefn = dom.getElementsByTagName('definition')[0]
+    return {'name': appdefn.getAttribute('name'),
+            'extends': appdefn.getAttribute('extends'),
+            'doc': _dom_doc(dom),
+            'groups': [(group.getAttribute('type'), _dom_fields(group)) for group in dom.getElementsByTagName('group')]}
+
+
+def best_time(parse, files, repeats):
+    best = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        for xml_file, content in files:
+            parse(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(path, repeats=5):
+    source = nxdl_source.LocalSource(path)
+    corpus = [('base_classes', nxdl_parse.parse_base_class, dom_base_class),
+              ('applications', nxdl_parse.parse_application, dom_application)]
+
+    print('%-14s %6s %10s %12s %12s %8s' % ('folder', 'files', 'kB', 'minidom (s)', 'single (s)', 'speed-up'))
+    total_dom = total_new = 0
+    for folder, parse, parse_dom in corpus:
+        files = source.get_files(folder)
+        for xml_file, content in files:
+            if parse(content) != parse_dom(content):
+                raise SystemExit('=== Records differ for %s' % xml_file)
+        t_dom = best_time(parse_dom, files, repeats)
+        t_new = best_time(parse, files, repeats)
+        total_dom += t_dom
+        total_new += t_new
+        size = sum(len(content) for xml_file, content in files) / 1024
+        print('%-14s %6i %10.0f %12.4f %12.4f %7.1fx' % (folder, len(files), size, t_dom, t_new, t_dom / t_new))
+    print('%-14s %6s %10s %12.4f %12.4f %7.1fx' % ('total', '', '', total_dom, total_new, total_dom / total_new))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_parse.py <definitions checkout> [repeats]')
+    main(sys.argv[1], *[int(a) for a in sys.argv[2:3]])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Writing the changeset of an ontology (onto_patch) against writing the complete ontology
+#
+# usage: python bench_patch.py [scale] [changed files]
+#
+# Builds the ontology of a synthetic corpus (nxdl_corpus), changes the
+# documentation of some base classes and adds a field to one of them, builds
+# again and compares writing the new ontology as N-Triples with reading the
+# previous ontology and writing the changes (SPARQL Update and N-Triples).
+
+import collections
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_build
+import nxdl_corpus
+from nexus_ontology import nxdl_merge
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from nexus_ontology import onto_patch
+from nexus_ontology import onto_rdf
+
+
+def dicts(path):
+    source = nxdl_source.LocalSource(path)
+    typesDict = nxdl_parse.parse_types(source.get_types())
+    files = source.get_files('base_classes')
+    classDict = nxdl_merge.merge_base_classes(list(zip([f for f, c in files], map(nxdl_parse.parse_base_class, [c for f, c in files]))))
+    files = source.get_files('applications')
+    applicationDict = nxdl_merge.merge_applications(classDict, list(zip([f for f, c in files], map(nxdl_parse.parse_application, [c for f, c in files]))))
+    return classDict, applicationDict, typesDict
+
+
+def change(path, n):
+    '''Change the documentation of n base classes, and add a field to the first'''
+    folder = os.path.join(path, 'base_classes')
+    names = [name for name in sorted(os.listdir(folder)) if name != 'NXobject.nxdl.xml'] # NXobject fields are not in the ontology
+    for i, name in enumerate(names[:n]):
+        with open(os.path.join(folder, name)) as f:
+            content = f.read()
+        content = content.replace('<doc>\n', '<doc>\n        changed documentation\n', 1)
+        if i == 0:
+            content = re.sub(r'(<definition [^>]*>\n)', r'\1    <field name="new_field" type="NX_FLOAT" units="NX_LENGTH"/>\n', content, 1)
+        with open(os.path.join(folder, name), 'w') as f:
+            f.write(content)
+
+
+def main(scale=1, changed=5):
+    settings = dict(bench_build.settings, version='synthetic')
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'definitions')
+        nxdl_corpus.write_corpus(corpus, scale)
+        with open(os.path.join(tmp, 'previous.nt'), 'w', encoding='utf-8') as f:
+            onto_rdf.write_ntriples(onto_rdf.describe(*dicts(corpus), settings), f)
+        change(corpus, changed)
+        classDict, applicationDict, typesDict = dicts(corpus)
+
+        start = time.perf_counter()
+        full = onto_rdf.write_ontology(os.path.join(tmp, 'full'), ['nt'], classDict, applicationDict, typesDict, settings)
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        previous = onto_patch.read(os.path.join(tmp, 'previous.nt'))
+        read_time = time.perf_counter() - start
+        stats = collections.Counter()
+        new = onto_patch.triples(onto_rdf.describe(classDict, applicationDict, typesDict, settings))
+        files = onto_patch.write_changeset(os.path.join(tmp, 'patch'), previous, new, stats=stats)
+        patch_time = time.perf_counter() - start
+
+        size = lambda files: sum(os.path.getsize(f) for f in files) / 1e3
+        print('=== %ix corpus, %i base classes changed: %i triples removed, %i added, %i classes changed' % (
+            scale, changed, stats['triples_removed'], stats['triples_added'], stats['classes_changed']))
+        print('%-28s %10s %10s' % ('', 'time (s)', 'size (kB)'))
+        print('%-28s %10.3f %10.1f' % ('complete ontology (.nt)', full_time, size(full)))
+        print('%-28s %10.3f %10.1f' % ('changeset (incl. reading)', patch_time, size(files)))
+        print('%-28s %10.3f' % ('  reading previous .nt', read_time))
+        for f in files:
+            print('%-28s %10s %10.1f' % ('  ' + os.path.basename(f), '', size([f])))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
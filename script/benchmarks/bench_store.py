@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Startup latency of the SQLite ontology store (onto_store) against loading the
+# RDF/XML ontology with owlready2 (get_ontology(...).load())
+#
+# usage: python bench_store.py <out_path of the script> [onto_name] [repeats]
+#
+# Each measurement runs in a fresh python process, as a short-lived consumer
+# would: import, open or load the ontology, and look up one field and the
+# restrictions of one class. Times exclude the start of the interpreter.
+
+import os
+import subprocess
+import sys
+
+
+script_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+consumers = {
+    'onto_store': '''
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, %(script_dir)r)
+from nexus_ontology import onto_store
+store = onto_store.load(%(store)r)
+field = store.field('NXsample-temperature')
+restrictions = store.restrictions('NXsample')
+print(time.perf_counter() - start, field['unit_iri'], len(restrictions))
+''',
+    'owlready2': '''
+import sys, time
+start = time.perf_counter()
+from owlready2 import get_ontology, IRIS, Restriction
+onto = get_ontology(%(owl)r).load()
+field = IRIS[%(base_iri)r + 'NXsample-temperature']
+restrictions = [c for c in IRIS[%(base_iri)r + 'NXsample'].is_a if isinstance(c, Restriction)]
+print(time.perf_counter() - start, field.range[0].iri, len(restrictions))
+'''}
+
+
+def main(out_path, onto_name='NeXusOntology', repeats=5):
+    sys.path.insert(0, script_dir)
+    from nexus_ontology import onto_store
+    store_file = os.path.join(os.path.abspath(out_path), onto_name + '.sqlite')
+    with onto_store.load(store_file) as store:
+        base_iri = store.meta['base_iri']
+    args = {'script_dir': script_dir, 'store': store_file, 'base_iri': base_iri,
+            'owl': 'file://' + os.path.join(os.path.abspath(out_path), onto_name + '.owl')}
+
+    print('%-12s %12s %12s   %s' % ('', 'best (ms)', 'mean (ms)', 'answer'))
+    for name, code in consumers.items():
+        times = []
+        for i in range(repeats):
+            result = subprocess.run([sys.executable, '-c', code % args], capture_output=True, text=True)
+            if result.returncode != 0:
+                print('%-12s %s' % (name, result.stderr.strip().splitlines()[-1]))
+                break
+            elapsed, answer = result.stdout.split(None, 1)
+            times.append(float(elapsed))
+        else:
+            print('%-12s %12.1f %12.1f   %s' % (name, 1000 * min(times), 1000 * sum(times) / len(times), answer.strip()))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_store.py <out_path of the script> [onto_name] [repeats]')
+    main(sys.argv[1], *sys.argv[2:3], *[int(a) for a in sys.argv[3:4]])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Vectorized unit normalization (onto_units) against converting row by row
+#
+# usage: python bench_units.py [rows]
+#
+# Random measurements of a few unit categories, each in a mix of units (keV,
+# eV and J for NX_ENERGY; K, mK, degC for NX_TEMPERATURE; ...), with value,
+# min and max columns, are converted to the canonical units: row by row,
+# parsing the unit of every row; row by row with the cached factor table; and
+# in one call of UnitNormalizer.normalize. The results are checked to agree.
+
+import os
+import random
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import onto_units
+
+
+mixes = {'NX_ENERGY': ['keV', 'eV', 'J', 'meV'], 'NX_TEMPERATURE': ['K', 'mK', 'degC'],
+         'NX_LENGTH': ['m', 'mm', 'nm', 'Angstrom'], 'NX_WAVENUMBER': ['1/Angstrom', 'nm^-1', 'm-1'],
+         'NX_PRESSURE': ['Pa', 'mbar', 'Torr']}
+
+
+def rows(n, seed=0):
+    rng = random.Random(seed)
+    categories = [rng.choice(list(mixes)) for i in range(n)]
+    units = [rng.choice(mixes[category]) for category in categories]
+    values = [rng.random() * 100 for i in range(n)]
+    return categories, units, values, [v - 1 for v in values], [v + 1 for v in values]
+
+
+def per_row(categories, units, columns, factor):
+    out = [[], [], []]
+    for i, (category, unit) in enumerate(zip(categories, units)):
+        scale, offset = factor(category, unit)
+        for column, converted in zip(columns, out):
+            converted.append(column[i] * scale + offset)
+    return out
+
+
+def main(n=1000000):
+    categories, units, *columns = rows(n)
+    print('%-22s %10s %12s' % ('', 'time (s)', 'rows/s'))
+
+    def parsed(category, unit):
+        return onto_units.parse(unit)[:2]
+    sample = n // 10 # parsing every row is slow
+    start = time.perf_counter()
+    per_row(categories[:sample], units[:sample], [c[:sample] for c in columns], parsed)
+    seconds = (time.perf_counter() - start) * n / sample
+    print('%-22s %10.2f %12.0f   (from %i rows)' % ('per row, parsed', seconds, n / seconds, sample))
+
+    normalizer = onto_units.UnitNormalizer()
+    start = time.perf_counter()
+    expected = per_row(categories, units, columns, normalizer.factor)
+    seconds = time.perf_counter() - start
+    print('%-22s %10.2f %12.0f' % ('per row, cached', seconds, n / seconds))
+
+    normalizer = onto_units.UnitNormalizer()
+    start = time.perf_counter()
+    converted, *result = normalizer.normalize(categories, units, *columns)
+    seconds = time.perf_counter() - start
+    print('%-22s %10.2f %12.0f' % ('vectorized', seconds, n / seconds))
+
+    arrays = [numpy.array(c) for c in columns]
+    start = time.perf_counter()
+    normalizer.normalize(numpy.array(categories), numpy.array(units), *arrays)
+    seconds = time.perf_counter() - start
+    print('%-22s %10.2f %12.0f' % ('vectorized, arrays', seconds, n / seconds))
+
+    assert converted.all()
+    for a, b in zip(result, expected):
+        assert numpy.allclose(a, b, rtol=1e-12)
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# Benchmark of the application definition validator (hdf5_validate) on synthetic NXtomo files
+#
+# usage: python bench_validate.py <plans file> [files] [workers]
+#
+# Writes NXtomo files (detector frames, image keys, rotation angles and the
+# NXdata links) to a temporary directory; every third file has a float
+# detector image, wrong units or a missing rotation angle. The files are
+# checked with 1 worker and with the given number of workers, both outputs
+# are compared, and the number of valid files is checked.
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nexus_ontology import hdf5_annotate
+from nexus_ontology import hdf5_validate
+
+
+def group(parent, name, nx_class):
+    g = parent.create_group(name)
+    g.attrs['NX_class'] = nx_class
+    return g
+
+
+def write_files(path, n_files):
+    for i in range(n_files):
+        broken = i % 3 == 2
+        with h5py.File(os.path.join(path, 'tomo_%06i.nxs' % i), 'w') as f:
+            entry = group(f, 'entry', 'NXentry')
+            entry['definition'] = 'NXtomo'
+            entry['start_time'] = '2024-01-01T00:00:00Z'
+            detector = group(group(entry, 'instrument', 'NXinstrument'), 'detector', 'NXdetector')
+            detector['data'] = numpy.zeros((10, 64, 64), 'f4' if broken and i % 9 == 2 else 'u2')
+            detector['image_key'] = numpy.zeros(10, 'i1')
+            detector['distance'] = 120.0
+            detector['distance'].attrs['units'] = 'keV' if broken and i % 9 == 5 else 'mm'
+            sample = group(entry, 'sample', 'NXsample')
+            sample['name'] = 'sample %i' % i
+            if not (broken and i % 9 == 8):
+                sample['rotation_angle'] = numpy.linspace(0, 180, 10)
+                sample['rotation_angle'].attrs['units'] = 'deg'
+            data = group(entry, 'data', 'NXdata')
+            data['data'] = h5py.SoftLink('/entry/instrument/detector/data')
+            data['rotation_angle'] = h5py.SoftLink('/entry/sample/rotation_angle')
+            data['image_key'] = h5py.SoftLink('/entry/instrument/detector/image_key')
+
+
+def main(plans_file, n_files=1000, workers=os.cpu_count() or 1):
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_files(tmp, n_files)
+        print('wrote %i files in %.1f s' % (n_files, time.perf_counter() - start))
+        files = hdf5_annotate.find_files([tmp])
+
+        print('%8s %10s %10s %10s %12s' % ('workers', 'valid', 'invalid', 'time (s)', 'files/s'))
+        outputs = []
+        for w in sorted(set([1, workers])):
+            out = io.StringIO()
+            start = time.perf_counter()
+            counts = hdf5_validate.validate(plans_file, files, out, w)
+            elapsed = time.perf_counter() - start
+            outputs.append(out.getvalue())
+            print('%8i %10i %10i %10.2f %12.0f' % (w, counts['valid'], counts['invalid'], elapsed, counts['files'] / elapsed))
+        if len(set(outputs)) != 1:
+            raise SystemExit('=== Results differ between worker counts')
+        if counts['valid'] != n_files - n_files // 3:
+            raise SystemExit('=== %i valid files, expected %i' % (counts['valid'], n_files - n_files // 3))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python bench_validate.py <plans file> [files] [workers]')
+    main(sys.argv[1], *[int(a) for a in sys.argv[2:4]])
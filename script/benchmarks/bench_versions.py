@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Building the definitions of many version tags (nxdl_versions) against building one
+#
+# usage: python bench_versions.py [tags] [changed files per tag] [scale]
+#
+# Commits a synthetic corpus (nxdl_corpus) to a temporary git repository and
+# tags it, then changes the documentation of some files before each further
+# tag. All versions are read (LocalSource.at) and parsed and merged with an
+# empty parse cache; files that are the same in several tags are parsed once.
+# The time of the first version (every file parsed) is compared with the time
+# of all versions, with and without writing an N-Triples ontology for each.
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_build
+from nexus_ontology import nxdl_cache
+import nxdl_corpus
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_versions
+from nexus_ontology import onto_rdf
+
+
+def git(path, *args):
+    subprocess.run(('git', '-C', path) + args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def repository(path, n_tags, changed, scale):
+    '''git repository of the synthetic corpus with tags v1 ... v<n_tags>, changed files differing between tags'''
+    nxdl_corpus.write_corpus(path, scale)
+    git(path, 'init', '-q')
+    files = sorted(os.path.join(folder, name) for folder in nxdl_source.nxdl_folders
+                   for name in os.listdir(os.path.join(path, folder)))
+    for tag in range(1, n_tags + 1):
+        for name in files[(tag - 1) * changed % len(files):][:changed] if tag > 1 else []:
+            with open(os.path.join(path, name)) as f:
+                content = f.read()
+            with open(os.path.join(path, name), 'w') as f:
+                f.write(content.replace('<doc>\n', '<doc>\n        changed in v%i\n' % tag, 1))
+        git(path, 'add', '-A')
+        git(path, '-c', 'user.name=bench', '-c', 'user.email=bench@localhost', 'commit', '-q', '-m', 'v%i' % tag)
+        git(path, 'tag', 'v%i' % tag)
+
+
+def build(source, cache_path, tags, out_path=None):
+    '''Time of building the versions tags; writes their ontologies to out_path if given'''
+    parse_cache = nxdl_cache.ParseCache(cache_path, nxdl_parse.parser_version)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # deprecation warnings
+        for tag, classDict, applicationDict, typesDict, tagsDict in nxdl_versions.versions(source, parse_cache, tags):
+            if out_path is not None:
+                onto_rdf.write_ontology(os.path.join(out_path, tag), ['nt'], classDict, applicationDict, typesDict,
+                                        dict(bench_build.settings, version=tag))
+    return time.perf_counter() - start, parse_cache.misses
+
+
+def main(n_tags=20, changed=5, scale=1):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'definitions')
+        repository(path, n_tags, changed, scale)
+        source = nxdl_source.LocalSource(path)
+        tags = [tag['name'] for tag in source.get_tags()]
+        print('=== %ix corpus, %i tags, %i files changed per tag' % (scale, len(tags), changed))
+        print('%-30s %10s %10s' % ('', 'time (s)', 'parsed'))
+        for label, names, out_path in (('one version', tags[:1], None), ('all versions', tags, None),
+                                       ('one version, written', tags[:1], tmp), ('all versions, written', tags, tmp)):
+            with tempfile.TemporaryDirectory() as cache_path:
+                seconds, parsed = build(source, cache_path, names, out_path)
+            print('%-30s %10.3f %10i' % (label, seconds, parsed))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:4]])
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# Latency of the watch mode (onto_watch): from saving a changed nxdl file to serving the new ontology
+#
+# usage: python bench_watch.py [scale] [edits]
+#
+# Serves a synthetic corpus (nxdl_corpus) with onto_watch on a free local
+# port, then edits a base class file several times. After each save the
+# Turtle file is polled with If-None-Match until the server answers with a
+# new ETag; the time from the save to the new file is compared with a full
+# rebuild (parse every file, merge, write Turtle) as done by the script.
+
+import contextlib
+import http.client
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_build
+import nxdl_corpus
+from nexus_ontology import nxdl_merge
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from nexus_ontology import onto_rdf
+from nexus_ontology import onto_watch
+
+
+def get(port, path, etag=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', path, headers={'If-None-Match': etag} if etag else {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response.status, response.getheader('ETag'), body
+
+
+def full_build(path, settings):
+    source = nxdl_source.LocalSource(path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        typesDict = nxdl_parse.parse_types(source.get_types())
+        classDict = nxdl_merge.merge_base_classes([(f, nxdl_parse.parse_base_class(c)) for f, c in source.get_files('base_classes')])
+        applicationDict = nxdl_merge.merge_applications(classDict, [(f, nxdl_parse.parse_application(c))
+                                                                    for f, c in source.get_files('applications')])
+    f = io.StringIO()
+    onto_rdf.write_turtle(onto_rdf.describe(classDict, applicationDict, typesDict, settings), f, onto_rdf.prefixes(settings))
+    return time.perf_counter() - start
+
+
+def main(scale=1, edits=10, interval=0.05):
+    with tempfile.TemporaryDirectory() as tmp:
+        nxdl_corpus.write_corpus(tmp, scale)
+        settings = dict(bench_build.settings, version='bench')
+        watcher = onto_watch.Watcher(tmp, settings)
+        with contextlib.redirect_stdout(io.StringIO()):
+            watcher.update()
+        server = onto_watch.ThreadingHTTPServer(('127.0.0.1', 0), onto_watch.Handler)
+        server.watcher = watcher
+        port = server.server_port
+        stop = threading.Event()
+        threads = [threading.Thread(target=server.serve_forever, daemon=True),
+                   threading.Thread(target=watcher.watch, args=(interval, stop), daemon=True)]
+        for thread in threads:
+            thread.start()
+        try:
+            status, etag, body = get(port, '/NeXusOntology.ttl')
+            edited = os.path.join(tmp, 'base_classes', sorted(os.listdir(os.path.join(tmp, 'base_classes')))[0])
+            latencies = []
+            with contextlib.redirect_stderr(io.StringIO()):
+                for i in range(edits):
+                    with open(edited) as f:
+                        content = f.read()
+                    start = time.perf_counter()
+                    with open(edited, 'w') as f:
+                        f.write(content.replace('<doc>', '<doc>edit %i ' % i, 1))
+                    while True:
+                        status, new_etag, body = get(port, '/NeXusOntology.ttl', etag)
+                        if status == 200:
+                            break
+                        time.sleep(0.005)
+                    latencies.append(time.perf_counter() - start)
+                    etag = new_etag
+                    assert b'edit %i ' % i in body
+        finally:
+            stop.set()
+            server.shutdown()
+            server.server_close()
+        full = full_build(tmp, settings)
+        print('=== %ix corpus, %i files, polled every %.2f s' % (scale, watcher.build.files, interval))
+        print('%-32s %10s' % ('', 'time (s)'))
+        print('%-32s %10.3f' % ('save to served (median)', sorted(latencies)[len(latencies) // 2]))
+        print('%-32s %10.3f' % ('save to served (max)', max(latencies)))
+        print('%-32s %10.3f' % ('full rebuild', full))
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:3]])
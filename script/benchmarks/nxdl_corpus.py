@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# Synthetic NeXus definitions corpus for the benchmarks
+#
+# usage: python nxdl_corpus.py <directory> [scale] [seed]
+#
+# Writes nxdlTypes.xsd, NXDL_VERSION and base_classes / applications folders
+# of nxdl files laid out like a checkout of nexusformat/definitions, so that
+# it can be read with nxdl_source.LocalSource, or served over HTTP (serve) for
+# nxdl_source.ArchiveSource. At scale 1 the corpus has as many base classes,
+# application definitions and fields, and about as many bytes, as the
+# definitions it is modelled on (v2022.07); scale 10 and 100 have 10 and 100
+# times as many files.
+#
+# Base classes extend each other in chains and cite other base classes in
+# nested groups. Application definitions extend each other in chains and
+# hold nested groups of base classes with fields, some of which are already
+# defined by the base class (and skipped when merged). A few fields are
+# deprecated. The corpus depends only on scale and seed.
+
+import http.server
+import io
+import json
+import os
+import random
+import sys
+import tarfile
+import threading
+
+
+base_classes_per_scale = 77
+applications_per_scale = 34
+chain_length = 4 # longest extends chain
+
+units = ['NX_ANGLE', 'NX_ANY', 'NX_AREA', 'NX_CHARGE', 'NX_CROSS_SECTION', 'NX_CURRENT', 'NX_DIMENSIONLESS',
+         'NX_EMITTANCE', 'NX_ENERGY', 'NX_FLUX', 'NX_FREQUENCY', 'NX_LENGTH', 'NX_MASS', 'NX_MASS_DENSITY',
+         'NX_MOLECULAR_WEIGHT', 'NX_PERIOD', 'NX_PER_AREA', 'NX_PER_LENGTH', 'NX_POWER', 'NX_PRESSURE',
+         'NX_PULSES', 'NX_SCATTERING_LENGTH_DENSITY', 'NX_SOLID_ANGLE', 'NX_TEMPERATURE', 'NX_TIME',
+         'NX_TIME_OF_FLIGHT', 'NX_UNITLESS', 'NX_VOLTAGE', 'NX_VOLUME', 'NX_WAVELENGTH', 'NX_WAVENUMBER']
+types = ['NX_CHAR', 'NX_FLOAT', 'NX_INT', 'NX_NUMBER', 'NX_POSINT', 'NX_BOOLEAN', 'NX_DATE_TIME', 'NX_BINARY']
+
+_words = ('the of sample detector beam value position angle distance energy time source monochromator '
+          'measured nominal used this field is in for a to be as defined axis data group').split()
+
+_header = '<?xml version="1.0" encoding="UTF-8"?>\n<?xml-stylesheet type="text/xsl" href="nxdlformat.xsl" ?>\n'
+_nxdl = ('xmlns="http://definition.nexusformat.org/nxdl/3.1" '
+         'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+         'xsi:schemaLocation="http://definition.nexusformat.org/nxdl/3.1 ../nxdl.xsd"')
+
+
+def _doc(rng, indent, words):
+    text = ' '.join(rng.choice(_words) for i in range(words))
+    return '%s<doc>\n%s    %s\n%s</doc>\n' % (indent, indent, text, indent)
+
+
+def _field(rng, name, indent, deprecated=False):
+    attrs = ' name="%s" type="%s"' % (name, rng.choice(types))
+    if rng.random() < 0.7:
+        attrs += ' units="%s"' % rng.choice(units)
+    if deprecated:
+        attrs += ' deprecated="synthetic deprecated field"'
+    return ('%s<field%s>\n' % (indent, attrs) + _doc(rng, indent + '    ', rng.randint(8, 60)) +
+            '%s    <dimensions rank="1"><dim index="1" value="n"/></dimensions>\n' % indent +
+            '%s</field>\n' % indent)
+
+
+def _group(rng, group_type, indent, body):
+    return ('%s<group type="%s">\n' % (indent, group_type) + _doc(rng, indent + '    ', rng.randint(5, 20)) +
+            body + '%s</group>\n' % indent)
+
+
+def base_class(rng, name, extends, fields, cited):
+    '''nxdl file of a base class with fields, and nested groups of the cited base classes'''
+    body = _doc(rng, '    ', rng.randint(30, 120))
+    for field in fields:
+        body += _field(rng, field, '    ', deprecated=rng.random() < 0.01)
+    for group_type in cited:
+        inner = ''.join(_field(rng, 'inner_%i' % i, '            ') for i in range(rng.randint(0, 2)))
+        if rng.random() < 0.3: # group nested in the group
+            inner += _group(rng, rng.choice(cited), '            ', '')
+        body += _group(rng, group_type, '    ', inner)
+    return (_header + '<definition name="%s" extends="%s" type="group" category="base" %s>\n' % (name, extends, _nxdl) +
+            body + '</definition>\n')
+
+
+def application(rng, name, extends, groups):
+    '''nxdl file of an application definition; groups is a list of (base class, field names, nested groups)'''
+    def write(groups, indent):
+        return ''.join(_group(rng, group_type, indent,
+                              ''.join(_field(rng, field, indent + '    ') for field in fields) + write(nested, indent + '    '))
+                       for group_type, fields, nested in groups)
+    return (_header + '<definition name="%s" extends="%s" type="group" category="application" %s>\n' % (name, extends, _nxdl) +
+            _doc(rng, '    ', rng.randint(30, 120)) +
+            '    <group type="NXentry">\n' + write(groups, '        ') + '    </group>\n</definition>\n')
+
+
+def types_xsd():
+    '''nxdlTypes.xsd with a documented simple type per unit category and type'''
+    body = ''
+    for name in units + types + ['anyUnitsAttr', 'primitiveType']:
+        body += ('    <xs:simpleType name="%s">\n        <xs:annotation>\n            <xs:documentation>synthetic %s</xs:documentation>\n'
+                 '        </xs:annotation>\n        <xs:restriction base="xs:string"/>\n    </xs:simpleType>\n' % (name, name))
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" '
+            'targetNamespace="http://definition.nexusformat.org/nxdl/3.1" elementFormDefault="qualified">\n' +
+            body + '</xs:schema>\n')
+
+
+def corpus(scale=1, seed=0):
+    '''Return {relative path: content (bytes)} of the synthetic corpus'''
+    rng = random.Random('%s-%s' % (scale, seed))
+    n_base = base_classes_per_scale * scale
+    n_app = applications_per_scale * scale
+    names = ['NXentry'] + ['NXsyn%05i' % i for i in range(1, n_base - 1)]
+    files = {'nxdlTypes.xsd': types_xsd().encode(), 'NXDL_VERSION': b'synthetic-%ix\n' % scale}
+    fields = {}
+
+    files['base_classes/NXobject.nxdl.xml'] = base_class(rng, 'NXobject', 'NXobject', [], []).encode()
+    for i, name in enumerate(names):
+        extends = 'NXobject' if i % chain_length == 0 else names[i - 1]
+        fields[name] = ['field_%i' % j for j in rng.sample(range(30), rng.randint(4, 14))]
+        cited = [rng.choice(names) for j in range(rng.randint(1, 5))]
+        files['base_classes/%s.nxdl.xml' % name] = base_class(rng, name, extends, fields[name], cited).encode()
+
+    def groups(depth):
+        result = []
+        for i in range(rng.randint(2, 4) if depth == 0 else rng.randint(0, 1)):
+            group_type = rng.choice(names)
+            own = rng.sample(fields[group_type], min(2, len(fields[group_type]))) # already in the base class
+            new = ['app_field_%i' % rng.randrange(40) for j in range(rng.randint(1, 4))]
+            result.append((group_type, sorted(set(own + new)), groups(depth + 1) if depth < 2 else []))
+        return result
+
+    for i in range(n_app):
+        name = 'NXapp%05i' % i
+        extends = 'NXobject' if i % chain_length == 0 else 'NXapp%05i' % (i - 1)
+        files['applications/%s.nxdl.xml' % name] = application(rng, name, extends, groups(0)).encode()
+    return files
+
+
+def write_corpus(path, scale=1, seed=0):
+    '''Write the synthetic corpus to directory path; returns the number of files and bytes'''
+    files = corpus(scale, seed)
+    for relpath, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(path, relpath)), exist_ok=True)
+        with open(os.path.join(path, relpath), 'wb') as f:
+            f.write(content)
+    return len(files), sum(len(content) for content in files.values())
+
+
+def tarball(path, tag):
+    '''gzipped tar of the corpus in path, laid out like a GitHub tarball of the repository'''
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz', compresslevel=1) as archive:
+        archive.add(path, arcname='nexusformat-definitions-%s' % tag)
+    return buffer.getvalue()
+
+
+def serve(path, tag='synthetic'):
+    '''Serve the corpus in path as a stand-in of the GitHub API on localhost
+
+    GET <api>/repos/<repo>/tags lists one tag whose tarball_url serves the
+    corpus as a tarball, and GET /raw/<relative path> serves single files.
+    Returns (server, api url); pass the api url to nxdl_source.ArchiveSource
+    and call server.shutdown() when done.
+    '''
+    archive = tarball(path, tag)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            if self.path.endswith('/tags'):
+                body = json.dumps([{'name': tag, 'commit': {'sha': None},
+                                    'tarball_url': api + 'tarball/' + tag}]).encode()
+            elif self.path.endswith('/tarball/' + tag):
+                body = archive
+            elif self.path.startswith('/raw/') and os.path.isfile(os.path.join(path, self.path[5:])):
+                with open(os.path.join(path, self.path[5:]), 'rb') as f:
+                    body = f.read()
+            else:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = 'http://127.0.0.1:%i/' % server.server_address[1]
+    return server, api
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        raise SystemExit('usage: python nxdl_corpus.py <directory> [scale] [seed]')
+    n, size = write_corpus(sys.argv[1], *[int(a) for a in sys.argv[2:4]])
+    print('wrote %i files, %.1f MB' % (n, size / 1e6))
@@ -0,0 +1,119 @@
+# Library interface of the ontology script: build, load and look up the NeXus ontology
+#
+# The script is a notebook export: every cell runs when it is imported. Tools
+# that only need the ontology, the model or the lookup index import this
+# package instead, which imports nothing beyond the standard library until one
+# of its functions is called. lookup() then imports onto_index (and onto_rdf),
+# load() imports nxdl_model alone, and only build() and write() import the
+# parser, the XML libraries and the writers. owlready2 is imported by
+# load_owl() and PyGithub by nxdl_source.GithubSource, when one is made. The
+# helper modules are the submodules of the package, also available as
+# attributes (nexus_ontology.nxdl_source), imported on first use.
+#
+#   model = nexus_ontology.build('~/definitions', out_path='out', formats=('owl',))
+#   classDict, applicationDict, typesDict, tagsDict = nexus_ontology.load('out/NeXusOntology.nxmodel')
+#   nexus_ontology.lookup('NXsample temperature', 'out/NeXusOntology.index').iri
+
+import importlib
+import os
+import time
+
+
+onto_name = 'NeXusOntology'
+
+# helper modules that are imported on first access, as nexus_ontology.<name>
+_modules = ('nxdl_cache', 'nxdl_fetch', 'nxdl_merge', 'nxdl_model', 'nxdl_parse', 'nxdl_plans', 'nxdl_source',
+            'nxdl_versions', 'onto_closure', 'onto_index', 'onto_modules', 'onto_patch', 'onto_rdf', 'onto_store',
+            'onto_units', 'onto_watch')
+
+_indexes = {} # path: ((size, mtime_ns), Index) of the indexes used by lookup
+
+
+def __getattr__(name):
+    if name in _modules:
+        module = globals()[name] = importlib.import_module('.' + name, __name__)
+        return module
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_modules))
+
+
+def build(source, cache=None, out_path=None, formats=('owl', 'ttl', 'nt'), settings=None, workers=1,
+          join_string='-', join_string_label=' ', default_units='NX_UNITLESS'):
+    '''Parse and merge the definitions of source; return classDict, applicationDict, typesDict and tagsDict
+
+    source is the path of a local definitions checkout or an nxdl_source
+    Source. cache is the parse cache directory (tmp_file_path/nxdl_cache of
+    the script); without one the files are parsed in a temporary directory.
+    If out_path is given, the ontology (formats), the lookup index and the
+    model are written there as by the script, with the onto_rdf settings
+    (default: onto_rdf.default_settings, with the newest tag of source as version).
+    '''
+    import contextlib
+    import tempfile
+    from . import nxdl_cache
+    from . import nxdl_parse
+    from . import nxdl_source
+    from . import nxdl_versions
+
+    if isinstance(source, str):
+        source = nxdl_source.LocalSource(os.path.expanduser(source))
+    with tempfile.TemporaryDirectory() if cache is None else contextlib.nullcontext(os.path.expanduser(cache)) as path:
+        parse_cache = nxdl_cache.ParseCache(path, nxdl_parse.parser_version)
+        model = nxdl_versions.load(source, parse_cache, workers, join_string, join_string_label, default_units)
+    if out_path is not None:
+        write(out_path, model, formats, settings)
+    return model
+
+
+def write(out_path, model, formats=('owl', 'ttl', 'nt'), settings=None):
+    '''Write the ontology, lookup index and model of build() to out_path; return the files written'''
+    from . import onto_index
+    from . import onto_rdf
+    from . import nxdl_model
+
+    classDict, applicationDict, typesDict, tagsDict = model
+    if settings is None:
+        settings = dict(onto_rdf.default_settings, version=tagsDict['name'], created=time.strftime('%b-%d-%Y'))
+    os.makedirs(out_path, exist_ok=True)
+    path = os.path.join(out_path, onto_name)
+    files = onto_rdf.write_ontology(path, formats, classDict, applicationDict, typesDict, settings)
+    files.append(onto_index.write_index(path + '.index', classDict, settings))
+    nxdl_model.save(path + '.nxmodel', classDict, applicationDict, typesDict, tagsDict)
+    files.append(path + '.nxmodel')
+    return files
+
+
+def load(path):
+    '''Return classDict, applicationDict, typesDict and tagsDict of a model saved by the script (.nxmodel)'''
+    from . import nxdl_model
+    return nxdl_model.load(path)
+
+
+def load_index(path):
+    '''Return the lookup index saved in path, loaded again only if the file has changed'''
+    from . import onto_index
+    st = os.stat(path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _indexes.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _indexes[path] = (stamp, onto_index.load(path))
+    return cached[1]
+
+
+def lookup(name, index, casefold=True):
+    '''Lookup index entry of a field long name, label or IRI, or None
+
+    index is an onto_index Index or the path of one (loaded once per process).
+    '''
+    if isinstance(index, str):
+        index = load_index(index)
+    return index.get(name, casefold=casefold)
+
+
+def load_owl(path):
+    '''Load the RDF/XML ontology in path with owlready2 and return it'''
+    import owlready2
+    return owlready2.get_ontology('file://' + os.path.abspath(path)).load()
@@ -0,0 +1,150 @@
+# Instrumentation of the ontology build and a machine-readable build report
+#
+# The build is divided into named stages (tag lookup, type parsing, base class
+# and application definition fetch/parse, writing the ontology, ...). For each
+# stage the report records wall and CPU time, the peak resident memory of the
+# process so far, the changes of the watched counters (Fetcher.retries,
+# ParseCache.misses, the merge stats Counter, ...), any counts added by the
+# stage itself, and the '=== ' lines printed during the stage (deprecation
+# warnings, fetch problems). Output is still printed as before. The totals
+# are those of the watched counters and messages, summed over the stages.
+#
+# The report is written as JSON; with profile=True the stages also run under
+# cProfile and the profile is written for pstats / snakeviz.
+
+import cProfile
+import collections
+import contextlib
+import datetime
+import io
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # not on Windows
+    resource = None
+
+
+max_messages = 200 # '=== ' lines kept per stage; all of them are counted
+
+
+class _Tee(io.TextIOBase):
+    # stdout that also keeps the '=== ' lines
+    def __init__(self, stdout, messages, counts):
+        self.stdout = stdout
+        self.messages = messages
+        self.counts = counts
+        self.line = ''
+
+    def write(self, s):
+        self.stdout.write(s)
+        lines = (self.line + s).split('\n')
+        self.line = lines.pop()
+        for line in lines:
+            if line.startswith('=== '):
+                self.counts['messages'] += 1
+                if len(self.messages) < max_messages:
+                    self.messages.append(line[4:])
+        return len(s)
+
+    def flush(self):
+        self.stdout.flush()
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1) # bytes on macOS, kB elsewhere
+
+
+def _rounded(counts):
+    return {k: round(v, 4) if isinstance(v, float) else v for k, v in sorted(counts.items())}
+
+
+class BuildReport:
+    '''Stage timings and counters of a build
+
+    report.watch('fetch', fetcher, 'requests', 'bytes', 'retries')
+    with report.stage('base_classes') as counts:
+        ...
+        counts['files'] = len(records)
+    report.write(path)
+    '''
+
+    def __init__(self, profile=False, **info):
+        self.info = dict(info)
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.stages = collections.OrderedDict()
+        self.profiler = cProfile.Profile() if profile else None
+        self._watched = []   # (prefix, obj, names)
+        self._start = time.perf_counter()
+
+    def watch(self, prefix, obj, *names):
+        '''Record the change of counters obj.name (or obj[name] for dicts) in each stage, as prefix.name'''
+        self._watched.append((prefix, obj, names))
+
+    @property
+    def _totaled(self):
+        return set(self._counters()) | {'messages'}
+
+    def _counters(self):
+        values = {}
+        for prefix, obj, names in self._watched:
+            for name in names:
+                value = obj.get(name, 0) if isinstance(obj, dict) else getattr(obj, name, 0)
+                values[prefix + '.' + name] = value
+        return values
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''Time a stage; yields a Counter for counts of the stage'''
+        record = self.stages.setdefault(name, {'seconds': 0.0, 'cpu_seconds': 0.0, 'counts': collections.Counter(),
+                                               'messages': []})
+        before = self._counters()
+        wall, cpu = time.perf_counter(), time.process_time()
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            with contextlib.redirect_stdout(_Tee(sys.stdout, record['messages'], record['counts'])):
+                yield record['counts']
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            record['seconds'] += time.perf_counter() - wall
+            record['cpu_seconds'] += time.process_time() - cpu
+            record['max_rss_mb'] = _max_rss_mb()
+            for key, value in self._counters().items():
+                if value != before.get(key, 0):
+                    record['counts'][key] += value - before.get(key, 0)
+
+    def report(self):
+        '''The report as a dict'''
+        stages = collections.OrderedDict()
+        for name, record in self.stages.items():
+            stages[name] = dict(record, seconds=round(record['seconds'], 4), cpu_seconds=round(record['cpu_seconds'], 4),
+                                counts=_rounded(record['counts']))
+        # only the watched counters and the messages add up across stages; the other counts of a stage
+        # (files, classes, ...) mean different things in different stages and are reported per stage only
+        totals = collections.Counter()
+        for record in self.stages.values():
+            totals.update({key: value for key, value in record['counts'].items() if key in self._totaled})
+        return {'info': self.info,
+                'started': self.started,
+                'seconds': round(time.perf_counter() - self._start, 4),
+                'max_rss_mb': _max_rss_mb(),
+                'stages': stages,
+                'totals': _rounded(totals)}
+
+    def write(self, path, profile_path=None):
+        '''Write the JSON report to path, and the profile to profile_path if profiling; returns the files written'''
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1)
+            f.write('\n')
+        files = [path]
+        if self.profiler is not None and profile_path is not None:
+            self.profiler.dump_stats(profile_path)
+            files.append(profile_path)
+        return files
@@ -0,0 +1,52 @@
+# Versioned file format of the data files written next to the ontology
+#
+# The model (.nxmodel), lookup index (.index), closures (.closure) and
+# validation plans (.plans) are published with the ontology and read by other
+# tools, possibly under another Python version, so their data is not written
+# with marshal or pickle, whose formats belong to the Python version, but as
+# JSON. Each file is
+#
+#   magic (7 bytes)  format (1 byte)  payload length  payload CRC-32  payload
+#
+# with the length and CRC-32 as 4 byte little endian integers and the payload
+# the data as UTF-8 JSON. JSON has no tuples: sequences are loaded as lists.
+#
+# load() rejects a file of another kind or format, and a truncated or damaged
+# one, with ValueError.
+
+import json
+import struct
+import zlib
+
+
+def _header(magic):
+    return struct.Struct('<%isBII' % len(magic))
+
+
+def save(path, magic, file_format, data):
+    '''Write data (JSON types) to path as a file of kind magic (bytes) and format file_format'''
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(_header(magic).pack(magic, file_format, len(payload), zlib.crc32(payload)))
+        f.write(payload)
+
+
+def load(path, magic, file_format, kind):
+    '''Return the data of a file written by save(path, magic, file_format, ...)
+
+    kind names the file in the ValueError raised for any other file, e.g. 'NeXus model file'.
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = _header(magic)
+    if data[:len(magic)] != magic:
+        raise ValueError('%s is not a %s' % (path, kind))
+    if len(data) < header.size:
+        raise ValueError('%s is not a complete %s: truncated' % (path, kind))
+    magic, found, length, crc = header.unpack_from(data)
+    if found != file_format:
+        raise ValueError('%s is a %s of format %i, not %i: write it again' % (path, kind, found, file_format))
+    payload = data[header.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise ValueError('%s is not a complete %s: truncated or damaged' % (path, kind))
+    return json.loads(payload.decode('utf-8'))
@@ -0,0 +1,181 @@
+# Annotate the fields of NeXus HDF5 files with the field IRIs of the ontology
+#
+# Every dataset in a group with an NX_class attribute is resolved, as the
+# pair (NX_class, dataset name), to the field property NXclass-field using
+# the lookup index written next to the ontology (onto_index). One annotation
+# record is written per dataset, as a line of JSON:
+#
+#   {"file": ..., "path": "/entry/sample/temperature", "NX_class": "NXsample",
+#    "field": "temperature", "iri": ..., "unit_category": "NX_TEMPERATURE", "units": "K"}
+#
+# iri and unit_category are null for fields that are not in the ontology.
+# Only the group attributes and the units attribute of each dataset are read,
+# never the data. Files are annotated in a pool of worker processes and the
+# records are written as each file is finished, in the order of the files.
+#
+# usage: python -m nexus_ontology.hdf5_annotate <index file> <output .jsonl> <HDF5 file or directory>... [--workers N]
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import h5py
+import numpy
+
+from . import onto_index
+
+
+hdf5_extensions = ('.nxs', '.h5', '.hdf5', '.hdf', '.nx5')
+
+
+class FieldTable:
+    '''(NX_class, field name) -> (iri, unit category), compiled from an onto_index.Index
+
+    Names that do not match exactly are looked up case-folded, as in onto_index.
+    '''
+
+    def __init__(self, index):
+        self.fields = {}
+        self.folded = {}
+        for entry in index:
+            self.fields.setdefault(entry.className, {})[entry.fieldName] = (entry.iri, entry.units)
+            self.folded.setdefault((entry.className.casefold(), entry.fieldName.casefold()), (entry.iri, entry.units))
+
+    def resolve(self, nx_class, field):
+        try:
+            return self.fields[nx_class][field]
+        except KeyError:
+            return self.folded.get((nx_class.casefold(), field.casefold()), (None, None))
+
+
+def _attr(oid, name):
+    # value of a scalar or one element string attribute as str, or None.
+    # The low level API avoids building h5py Group / Dataset / attribute objects,
+    # which takes most of the time of a walk with the high level API.
+    if not h5py.h5a.exists(oid, name):
+        return None
+    attr = h5py.h5a.open(oid, name)
+    value = numpy.empty(attr.shape, dtype=attr.dtype)
+    attr.read(value)
+    value = value[()] if value.shape == () else value.ravel()[0] if value.size else None
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return None if value is None else str(value)
+
+
+def walk(h5file):
+    '''Yield (path, NX_class, field name, units attribute) for every dataset of an NX_class group
+
+    Groups reached through several links are walked once; dangling links are skipped.
+    '''
+    groups = [(h5file.id, '')]
+    seen = {h5file.id}
+    while groups:
+        gid, path = groups.pop()
+        nx_class = _attr(gid, b'NX_class')
+        for name in gid:
+            try:
+                oid = h5py.h5o.open(gid, name)
+            except KeyError: # dangling soft or external link
+                continue
+            kind = h5py.h5i.get_type(oid)
+            name = name.decode('utf-8', 'replace')
+            if kind == h5py.h5i.GROUP:
+                if not oid in seen:
+                    seen.add(oid)
+                    groups.append((oid, path + '/' + name))
+            elif nx_class is not None and kind == h5py.h5i.DATASET:
+                yield path + '/' + name, nx_class, name, _attr(oid, b'units')
+
+
+def annotate_file(file_name, table):
+    '''Return the annotation records of an HDF5 file'''
+    records = []
+    resolved = {} # the same (NX_class, field) pairs recur in a file
+    with h5py.File(file_name, 'r') as h5file:
+        for path, nx_class, field, units in sorted(walk(h5file)):
+            if not (nx_class, field) in resolved:
+                resolved[nx_class, field] = table.resolve(nx_class, field)
+            iri, unit_category = resolved[nx_class, field]
+            records.append({'file': file_name, 'path': path, 'NX_class': nx_class, 'field': field,
+                            'iri': iri, 'unit_category': unit_category, 'units': units})
+    return records
+
+
+_table = None # FieldTable of a worker process
+
+
+def _init_worker(index_file):
+    global _table
+    _table = FieldTable(onto_index.load(index_file))
+
+
+def _annotate(file_name):
+    try:
+        return file_name, annotate_file(file_name, _table), None
+    except (OSError, KeyError, ValueError) as e:
+        return file_name, [], '%s: %s' % (type(e).__name__, e)
+
+
+def find_files(paths):
+    '''HDF5 files in paths (files, or directories searched recursively), sorted'''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files += [os.path.join(root, name) for name in names if name.lower().endswith(hdf5_extensions)]
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def annotate(index_file, files, out, workers=1, chunksize=None):
+    '''Annotate files and write the records to out (a text file), file by file
+
+    Returns the number of files, records, records resolved to an IRI, and files that could not be read.
+    '''
+    counts = {'files': 0, 'records': 0, 'resolved': 0, 'failed': 0}
+
+    def write(results):
+        for file_name, records, error in results:
+            counts['files'] += 1
+            if error is not None:
+                counts['failed'] += 1
+                print('=== Problem annotating %s (%s)' % (file_name, error), file=sys.stderr)
+            for record in records:
+                out.write(json.dumps(record) + '\n')
+            counts['records'] += len(records)
+            counts['resolved'] += sum(record['iri'] is not None for record in records)
+
+    if workers <= 1 or len(files) <= 1:
+        _init_worker(index_file)
+        write(map(_annotate, files))
+    else:
+        chunksize = chunksize or max(1, min(16, len(files) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index_file,)) as pool:
+            write(pool.map(_annotate, files, chunksize=chunksize))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Annotate the fields of NeXus HDF5 files with ontology IRIs')
+    parser.add_argument('index', help='lookup index written by the ontology script (NeXusOntology.index)')
+    parser.add_argument('output', help='output file, one JSON record per line (- for stdout)')
+    parser.add_argument('paths', nargs='+', help='HDF5 files or directories')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    files = find_files(args.paths)
+    if args.output == '-':
+        counts = annotate(args.index, files, sys.stdout, args.workers)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            counts = annotate(args.index, files, out, args.workers)
+    print('=== Annotated %(files)i files: %(records)i fields, %(resolved)i resolved, %(failed)i files failed' % counts,
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
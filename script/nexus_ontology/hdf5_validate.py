@@ -0,0 +1,249 @@
+# Check NeXus HDF5 files against the application definitions they claim to follow
+#
+# The validation plans (nxdl_plans) written next to the ontology are checked
+# against every NXentry or NXsubentry whose definition field names an
+# application definition (or the one given with --definition): the required
+# groups, fields and links must be there, the fields must have an HDF5 type
+# of their NeXus type (NX_FLOAT: a float type, NX_CHAR: a string, ...) and a
+# units attribute of their unit category (onto_units). Groups of a plan are
+# matched by name and NX_class, or by NX_class alone if the definition allows
+# any name; fields of groups that are present are checked too. Missing
+# recommended groups and fields are warnings.
+#
+# One result is written per file, as a line of JSON:
+#
+#   {"file": ..., "valid": false, "entries": {"/entry": "NXmx"},
+#    "problems": ["/entry/sample: missing field depends_on"], "warnings": [...]}
+#
+# A file is valid if it has at least one entry to check and no problems. Only
+# the NX_class and units attributes, the types of the datasets and the
+# definition fields are read. Files are checked in a pool of worker processes
+# and the results written as each file is finished, in the order of the files.
+#
+# usage: python -m nexus_ontology.hdf5_validate <plans file> <output .jsonl> <HDF5 file or directory>... [--definition NXmx] [--workers N]
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import h5py
+import numpy
+
+from . import hdf5_annotate
+from . import nxdl_plans
+from . import onto_units
+
+
+# HDF5 type classes of the NeXus types; types not listed are not checked
+type_classes = {
+    'NX_CHAR': (h5py.h5t.STRING,),
+    'NX_DATE_TIME': (h5py.h5t.STRING,),
+    'ISO8601': (h5py.h5t.STRING,),
+    'NX_FLOAT': (h5py.h5t.FLOAT,),
+    'NX_INT': (h5py.h5t.INTEGER,),
+    'NX_POSINT': (h5py.h5t.INTEGER,),
+    'NX_UINT': (h5py.h5t.INTEGER,),
+    'NX_NUMBER': (h5py.h5t.INTEGER, h5py.h5t.FLOAT),
+    'NX_BOOLEAN': (h5py.h5t.ENUM, h5py.h5t.INTEGER), # h5py writes bools as an enum
+    'NX_COMPLEX': (h5py.h5t.COMPOUND,),
+    'NX_CCOMPLEX': (h5py.h5t.COMPOUND,),
+    'NX_PCOMPLEX': (h5py.h5t.COMPOUND,),
+    'NX_BINARY': (h5py.h5t.INTEGER, h5py.h5t.OPAQUE),
+}
+_transformation = ('NX_LENGTH', 'NX_ANGLE', 'NX_UNITLESS') # the categories NX_TRANSFORMATION stands for
+
+
+class Validator:
+    '''Checks HDF5 files against the plans of nxdl_plans (a Plans object, or the path of one)'''
+
+    def __init__(self, plans, definition=None):
+        self.plans = nxdl_plans.load(plans) if isinstance(plans, str) else plans
+        self.definition = definition # checked for every entry, whatever its definition field says
+        self.units = onto_units.UnitNormalizer()
+        self._entries = {} # definition: entry plans
+
+    def _units_problem(self, category, units):
+        # why the units attribute does not fit the unit category, or None
+        if not category or category in ('NX_UNITLESS', 'NX_ANY'):
+            return None
+        if units is None:
+            return 'no units attribute (%s)' % category
+        if category == 'NX_TRANSFORMATION':
+            if all(self.units.check(c, units) for c in _transformation):
+                return 'units %r not compatible with %s' % (units, category)
+            return None
+        if category in self.units.categories and self.units.check(category, units):
+            return 'units %r not compatible with %s' % (units, category)
+        return None
+
+    def _check_field(self, oid, field, path, problems):
+        name, level, type_, category, kind = field
+        if kind == 'link':
+            return
+        if h5py.h5i.get_type(oid) != h5py.h5i.DATASET:
+            problems.append('%s/%s: not a dataset' % (path, name))
+            return
+        if type_ in type_classes and oid.get_type().get_class() not in type_classes[type_]:
+            problems.append('%s/%s: not of type %s' % (path, name, type_))
+        reason = self._units_problem(category, hdf5_annotate._attr(oid, b'units'))
+        if reason is not None:
+            problems.append('%s/%s: %s' % (path, name, reason))
+
+    def _check_group(self, gid, group, path, problems, warnings):
+        nx_class, name, level, fields, groups = group
+        members = {}
+        for member in gid:
+            try:
+                members[member.decode('utf-8', 'replace')] = h5py.h5o.open(gid, member)
+            except KeyError: # dangling soft or external link
+                pass
+        for field in fields:
+            oid = members.get(field[0])
+            if oid is not None:
+                self._check_field(oid, field, path, problems)
+            elif field[1] != 'optional':
+                (problems if field[1] == 'required' else warnings).append('%s: missing %s %s' % (path or '/', field[4], field[0]))
+        classes = {}
+        for member, oid in members.items():
+            if h5py.h5i.get_type(oid) == h5py.h5i.GROUP:
+                classes[member] = hdf5_annotate._attr(oid, b'NX_class')
+        for child in groups:
+            if child[1] is None:
+                found = [member for member, nx in classes.items() if nx == child[0]]
+            elif child[1] in classes:
+                found = [child[1]]
+                if classes[child[1]] != child[0]:
+                    problems.append('%s/%s: NX_class %s, not %s' % (path, child[1], classes[child[1]], child[0]))
+                    continue
+            else:
+                found = []
+            if not found and child[2] != 'optional':
+                (problems if child[2] == 'required' else warnings).append(
+                    '%s: missing group %s' % (path or '/', child[0] if child[1] is None else '%s:%s' % (child[1], child[0])))
+            for member in found:
+                self._check_group(members[member], child, path + '/' + member, problems, warnings)
+
+    def entries(self, h5file):
+        '''{path: definition} of the NXentry and NXsubentry groups to check'''
+        entries = {}
+        groups = [(h5file.id, '')]
+        while groups:
+            gid, path = groups.pop()
+            for member in gid:
+                try:
+                    oid = h5py.h5o.open(gid, member)
+                except KeyError:
+                    continue
+                if h5py.h5i.get_type(oid) != h5py.h5i.GROUP:
+                    continue
+                member_path = path + '/' + member.decode('utf-8', 'replace')
+                if hdf5_annotate._attr(oid, b'NX_class') not in ('NXentry', 'NXsubentry'):
+                    continue
+                definition = self.definition or _definition(oid)
+                if definition is not None:
+                    entries[member_path] = definition
+                groups.append((oid, member_path)) # subentries
+        return dict(sorted(entries.items()))
+
+    def check_file(self, file_name):
+        '''Return the result record of an HDF5 file'''
+        problems, warnings = [], []
+        with h5py.File(file_name, 'r') as h5file:
+            entries = self.entries(h5file)
+            for path, definition in entries.items():
+                if definition not in self.plans:
+                    problems.append('%s: unknown application definition %s' % (path, definition))
+                    continue
+                if definition not in self._entries:
+                    self._entries[definition] = self.plans.entries(definition)
+                gid = h5py.h5o.open(h5file.id, path.encode('utf-8'))
+                for entry in self._entries[definition]:
+                    self._check_group(gid, entry, path, problems, warnings)
+        if not entries:
+            problems.append('no NXentry with a definition field')
+        return {'file': file_name, 'valid': not problems, 'entries': entries,
+                'problems': list(dict.fromkeys(problems)), 'warnings': list(dict.fromkeys(warnings))}
+
+
+def _definition(oid):
+    # value of the definition field of an entry, or None
+    try:
+        dataset = h5py.h5o.open(oid, b'definition')
+    except KeyError: # no such member, or a dangling link
+        return None
+    if h5py.h5i.get_type(dataset) != h5py.h5i.DATASET or dataset.get_type().get_class() != h5py.h5t.STRING:
+        return None
+    value = numpy.empty(dataset.shape, dtype=dataset.dtype)
+    dataset.read(h5py.h5s.ALL, h5py.h5s.ALL, value)
+    value = value[()] if value.shape == () else value.ravel()[0] if value.size else None
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    return None if value is None else str(value).strip()
+
+
+_validator = None # Validator of a worker process
+
+
+def _init_worker(plans_file, definition):
+    global _validator
+    _validator = Validator(plans_file, definition)
+
+
+def _check(file_name):
+    try:
+        return _validator.check_file(file_name), None
+    except (OSError, KeyError, ValueError) as e:
+        return {'file': file_name, 'valid': False, 'entries': {}, 'problems': [], 'warnings': []}, '%s: %s' % (type(e).__name__, e)
+
+
+def validate(plans_file, files, out, workers=1, definition=None, chunksize=None):
+    '''Check files and write one result per file to out (a text file), as each file is finished
+
+    Returns the number of files, valid and invalid files, and files that could not be read.
+    '''
+    counts = {'files': 0, 'valid': 0, 'invalid': 0, 'failed': 0}
+
+    def write(results):
+        for result, error in results:
+            counts['files'] += 1
+            if error is not None:
+                counts['failed'] += 1
+                result['problems'].append(error)
+                print('=== Problem validating %s (%s)' % (result['file'], error), file=sys.stderr)
+            counts['valid' if result['valid'] and error is None else 'invalid'] += 1
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+
+    if workers <= 1 or len(files) <= 1:
+        _init_worker(plans_file, definition)
+        write(map(_check, files))
+    else:
+        chunksize = chunksize or max(1, min(16, len(files) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(plans_file, definition)) as pool:
+            write(pool.map(_check, files, chunksize=chunksize))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check NeXus HDF5 files against their application definitions')
+    parser.add_argument('plans', help='validation plans written by the ontology script (NeXusOntology.plans)')
+    parser.add_argument('output', help='output file, one JSON result per line (- for stdout)')
+    parser.add_argument('paths', nargs='+', help='HDF5 files or directories')
+    parser.add_argument('--definition', help='check every entry against this application definition (e.g. NXmx)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    args = parser.parse_args(argv)
+
+    files = hdf5_annotate.find_files(args.paths)
+    if args.output == '-':
+        counts = validate(args.plans, files, sys.stdout, args.workers, args.definition)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            counts = validate(args.plans, files, out, args.workers, args.definition)
+    print('=== Checked %(files)i files: %(valid)i valid, %(invalid)i invalid, %(failed)i could not be read' % counts,
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Content-addressed cache of parsed nxdl files
+#
+# Parsed records are stored one file per nxdl file, keyed by the git blob sha
+# of the file content (the same sha that the GitHub API lists), under a
+# directory named after the parser version and the parse function, so that
+# the same content parsed as a base class, an application definition or a
+# types file gives separate records. Unchanged files are neither downloaded
+# nor parsed again, and changing the parser version starts a new, empty
+# cache. The most recently used records are also kept in memory, so that the
+# versions of a multi-version build (nxdl_versions) share one record per
+# distinct file, without growing in a long-running process (onto_watch).
+
+import collections
+import os
+import pickle
+import tempfile
+import time
+
+from . import nxdl_parse
+from . import nxdl_source
+
+
+class ParseCache:
+    '''Per-file cache of parse results
+
+    path           - cache directory (created if needed)
+    parser_version - records made by a different parser version are never used
+    max_records    - number of records kept in memory
+    '''
+
+    def __init__(self, path, parser_version, max_records=4096):
+        self.path = os.path.join(path, parser_version)
+        os.makedirs(self.path, exist_ok=True)
+        self.max_records = max_records
+        self.records = collections.OrderedDict()  # (kind, sha): record, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0     # bytes of the files read from the source (misses)
+        self.read_seconds = 0   # time spent reading files from the source
+        self.parse_seconds = 0  # time spent parsing files
+
+    def _file(self, kind, sha):
+        return os.path.join(self.path, kind, sha + '.p')
+
+    def _keep(self, key, record):
+        self.records[key] = record
+        self.records.move_to_end(key)
+        while len(self.records) > self.max_records:
+            self.records.popitem(last=False)
+
+    def get(self, sha, kind):
+        '''Return the cached record for sha parsed by the parse function named kind, or None'''
+        key = (kind, sha)
+        if key in self.records:
+            self.records.move_to_end(key)
+            return self.records[key]
+        try:
+            with open(self._file(kind, sha), 'rb') as f:
+                record = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, ImportError, IndexError):
+            return None  # missing or damaged - parse again
+        self._keep(key, record)
+        return record
+
+    def put(self, sha, kind, record):
+        self._keep((kind, sha), record)
+        os.makedirs(os.path.join(self.path, kind), exist_ok=True)
+        # write to a temporary file first so that an interrupted run never leaves a partial record
+        fd, tmp = tempfile.mkstemp(dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._file(kind, sha))
+
+    def parse(self, content, parse):
+        '''Return parse(content), from the cache if this content has been parsed before'''
+        sha = nxdl_source.blob_sha(content)
+        record = self.get(sha, parse.__name__)
+        if record is None:
+            self.misses += 1
+            self.bytes_read += len(content)
+            start = time.perf_counter()
+            record = parse(content)
+            self.parse_seconds += time.perf_counter() - start
+            self.put(sha, parse.__name__, record)
+        else:
+            self.hits += 1
+        return record
+
+    def parse_files(self, source, folder, parse, workers=1):
+        '''Return [(xml_file, record)] for the nxdl files of source in folder
+
+        Only files whose sha is not in the cache are read from the source and
+        parsed, by up to workers processes.
+        '''
+        listing = source.list_files(folder)
+        records = {sha: self.get(sha, parse.__name__) for xml_file, sha in listing}
+        missing = [(xml_file, sha) for xml_file, sha in listing if records[sha] is None]
+        self.hits += len(listing) - len(missing)
+        self.misses += len(missing)
+        start = time.perf_counter()
+        contents = source.read_files(folder, [xml_file for xml_file, sha in missing])
+        self.read_seconds += time.perf_counter() - start
+        self.bytes_read += sum(len(content) for content in contents)
+        start = time.perf_counter()
+        for (xml_file, sha), record in zip(missing, nxdl_parse.parse_all(parse, contents, workers)):
+            records[sha] = record
+            self.put(sha, parse.__name__, record)
+        self.parse_seconds += time.perf_counter() - start
+        return [(xml_file, records[sha]) for xml_file, sha in listing]
@@ -0,0 +1,158 @@
+# Concurrent download of NeXus nxdl files
+#
+# Files are fetched by a pool of worker threads. Each thread keeps one
+# keep-alive connection per host, so a full set of base classes and
+# application definitions costs a handful of TCP/TLS handshakes instead of
+# one per file. Failed requests are retried with bounded exponential backoff.
+
+import http.client
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+_max_redirects = 5
+_retry_status = (429, 500, 502, 503, 504)  # transient server responses worth retrying
+
+
+class FetchError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status  # HTTP status, if there was a response
+
+
+class Fetcher:
+    '''Fetch urls concurrently over pooled keep-alive HTTP(S) connections.
+
+    workers     - number of concurrent downloads
+    max_tries   - try each url this many times before giving up
+    backoff     - delay (s) before the first retry, doubled on each further retry
+    max_backoff - upper bound (s) on the delay between retries
+    '''
+
+    def __init__(self, workers=8, max_tries=10, backoff=0.5, max_backoff=30, timeout=60, headers=None):
+        self.workers = workers
+        self.max_tries = max_tries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {'User-Agent': 'NeXusOntology'}
+        self.headers.update(headers or {})
+        self.retries = 0  # total number of retries, for reporting
+        self.requests = 0 # total number of urls fetched
+        self.bytes = 0    # total number of bytes fetched
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def fetch(self, url):
+        '''Return the content of url as bytes, retrying on failure'''
+        content = self._retry(url, lambda: self._get(url))
+        self._count(len(content))
+        return content
+
+    def fetch_stream(self, url, consume):
+        '''Open url and return consume(response), retrying the whole download on failure.
+
+        Used for large downloads (e.g. archives) which are processed while they
+        are read rather than held in memory.
+        '''
+        def _open():
+            request = urllib.request.Request(url, headers=self.headers)
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    counted = _CountingReader(response)
+                    result = consume(counted)
+                    self._count(counted.bytes)
+                    return result
+            except urllib.error.HTTPError as err:
+                raise FetchError('HTTP %i for %s' % (err.code, url), err.code) from err
+        return self._retry(url, _open)
+
+    def _count(self, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+
+    def _retry(self, url, get):
+        for attempt in range(self.max_tries):
+            try:
+                return get()
+            except (OSError, EOFError, http.client.HTTPException, FetchError) as err:
+                if isinstance(err, FetchError) and not err.status in _retry_status:
+                    raise
+                if attempt == self.max_tries - 1:
+                    raise FetchError('Giving up on %s after %i tries: %s' % (url, self.max_tries, err)) from err
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                print('=== Problem fetching %s (%s); retry in %.1f s' % (url, err, delay))
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+
+    def fetch_all(self, urls):
+        '''Return the contents of all urls, in the same order as urls'''
+        urls = list(urls)
+        if self.workers <= 1 or len(urls) <= 1:
+            return [self.fetch(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self.fetch, urls))
+
+    def _connection(self, scheme, netloc):
+        # one connection per host per worker thread, reused between requests
+        pool = getattr(self._local, 'connections', None)
+        if pool is None:
+            pool = self._local.connections = {}
+        key = (scheme, netloc)
+        if key not in pool:
+            if scheme == 'https':
+                pool[key] = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                pool[key] = http.client.HTTPConnection(netloc, timeout=self.timeout)
+        return pool[key]
+
+    def _drop(self, scheme, netloc):
+        conn = self._local.connections.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def _get(self, url):
+        for i in range(_max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            if parts.scheme not in ('http', 'https'):
+                # e.g. file:// urls - nothing to pool
+                with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                    return response.read()
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('GET', path, headers=self.headers)
+                response = conn.getresponse()
+                content = response.read()  # read fully so the connection can be reused
+            except (OSError, http.client.HTTPException):
+                self._drop(parts.scheme, parts.netloc)
+                raise
+            if response.will_close:
+                self._drop(parts.scheme, parts.netloc)
+            if response.status in (301, 302, 303, 307, 308):
+                url = urllib.parse.urljoin(url, response.getheader('Location'))
+                continue
+            if response.status != 200:
+                raise FetchError('HTTP %i for %s' % (response.status, url), response.status)
+            return content
+        raise FetchError('Too many redirects for %s' % url)
+
+
+class _CountingReader:
+    # file-like wrapper of a response, counting the bytes read
+    def __init__(self, response):
+        self.response = response
+        self.bytes = 0
+
+    def read(self, *args):
+        data = self.response.read(*args)
+        self.bytes += len(data)
+        return data
@@ -0,0 +1,95 @@
+# Merge parsed nxdl records (see nxdl_parse) into classDict and applicationDict
+#
+# Precedence is "first definition wins": a field is added to a base class the
+# first time it is seen and later definitions of the same field are ignored.
+# To make this independent of the order in which files were listed, fetched
+# or parsed, base classes are merged first and then application definitions,
+# each in sorted file name order.
+#
+# Classes, applications and fields are nxdl_model records with interned names.
+
+import posixpath
+
+from .nxdl_model import Application, Field, NexusClass, intern
+
+
+def sorted_records(records):
+    '''Return [(xml_file, record)] sorted by file name'''
+    return sorted(records, key=lambda item: (posixpath.basename(item[0]), item[0]))
+
+
+def addFieldToDict(classDict, className, file, field, defn_name,
+                   join_string='-', join_string_label=' ', default_units='NX_UNITLESS', stats=None):
+    '''Add a field record to classDict[className]['fields'] unless the field already exists
+
+    file is the xml file where the field is defined. defn_name is the application
+    definition name if the field is defined in an application definition, else None.
+    stats, if given, is a collections.Counter of fields_added, duplicate_fields and
+    deprecated_fields. Returns True if the field was added.
+    '''
+    field_name = field['fieldName']
+
+    if not field['deprecated'] == '':
+        print("=== Deprecation warning %s in %s: %s" % (field_name, className, field['deprecated']))
+        if stats is not None:
+            stats['deprecated_fields'] += 1
+
+    long_name = className + join_string + field_name
+    if long_name in classDict[className]['fields']:
+        if stats is not None:
+            stats['duplicate_fields'] += 1
+        return False
+
+    classDict[className]['fields'][intern(long_name)] = Field(
+        fieldName=intern(field_name),
+        units=intern(field['units'] or default_units),
+        xml_file=intern(file),                                # xml file where field is defined
+        defn_name=intern(defn_name),                          # application defn name, or None
+        label=className + join_string_label + field_name,     # compound name for label
+        type=intern(field['type'] or 'NX_CHAR'),              # default if not specified
+        fieldDoc=field['fieldDoc'])
+    if stats is not None:
+        stats['fields_added'] += 1
+    return True
+
+
+def merge_base_classes(base_class_records, join_string='-', join_string_label=' ', default_units='NX_UNITLESS', stats=None):
+    '''Return classDict for [(xml_file, record)] of the base class files (stats: see addFieldToDict)'''
+    classDict = {}
+    for file, record in sorted_records(base_class_records):
+        className = intern(record['name'])
+        if not className in classDict:
+            classDict[className] = NexusClass(fields={}) # create a new class record if doesn't exist
+        classDict[className]['xml_file'] = intern(file)
+        classDict[className]['extends'] = intern(record['extends'])
+        classDict[className]['classDoc'] = record['classDoc']
+        for field in record['fields']:
+            addFieldToDict(classDict, className, file, field, None, join_string, join_string_label, default_units, stats)
+        classDict[className]['groups_cited'] = [intern(g) for g in record['groups_cited']]
+    return classDict
+
+
+def merge_applications(classDict, application_records, join_string='-', join_string_label=' ', default_units='NX_UNITLESS',
+                       stats=None):
+    '''Add the fields of the application definitions to classDict and return applicationDict (stats: see addFieldToDict)'''
+    applicationDict = {}
+    for file, record in sorted_records(application_records):
+        defn_name = intern(record['name'])
+        classNameList = []
+        for className, fields in record['groups']:
+            classNameList += [intern(className)]
+            for field in fields:
+                addFieldToDict(classDict, className, file, field, defn_name, join_string, join_string_label, default_units, stats)
+        applicationDict[defn_name] = Application(extends=intern(record['extends']),
+                                                 doc=record['doc'],
+                                                 xml_file=intern(file),
+                                                 groups_cited=classNameList)
+    return applicationDict
+
+
+def merge(base_class_records, application_records, join_string='-', join_string_label=' ', default_units='NX_UNITLESS',
+          stats=None):
+    '''Return classDict, applicationDict for the parsed base classes and application definitions'''
+    classDict = merge_base_classes(base_class_records, join_string, join_string_label, default_units, stats)
+    applicationDict = merge_applications(classDict, application_records, join_string, join_string_label, default_units, stats)
+    return classDict, applicationDict
@@ -0,0 +1,160 @@
+# Compact in-memory model of the NeXus classes, application definitions and fields
+#
+# classDict and applicationDict hold slotted records instead of one dict per
+# class and field. Records still support item access (field['units']), so
+# code written for the nested dicts keeps working. Class, type and unit names,
+# xml file urls and application definition names are interned, so each
+# distinct string is held once however many fields or definition versions
+# refer to it.
+#
+# save() and load() store a model as a table of distinct strings plus columns
+# of string indices, in the versioned file format of file_format. This is
+# smaller than pickling the nested dicts and readable by any Python version. Loaded strings, docs included, are interned,
+# so models of several definition versions kept in memory share them.
+
+import sys
+from itertools import islice
+
+from . import file_format
+
+
+model_format = 2 # change whenever the file layout below changes
+_magic = b'NXMODEL'
+
+
+class Record:
+    '''Slotted record with dict-style item access to its slots'''
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and hasattr(self, key)
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(self.get(k) == other.get(k) for k in self.__slots__)
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % (k, self.get(k)) for k in self.keys()))
+
+
+class Field(Record):
+    '''A field of a NeXus base class (a value of classDict[className]['fields'])'''
+    __slots__ = ('fieldName', 'units', 'xml_file', 'defn_name', 'label', 'type', 'fieldDoc')
+
+    def __init__(self, fieldName=None, units=None, xml_file=None, defn_name=None, label=None, type=None, fieldDoc=None):
+        # spelled out: there is one Field per field of every class
+        self.fieldName = fieldName
+        self.units = units
+        self.xml_file = xml_file
+        self.defn_name = defn_name
+        self.label = label
+        self.type = type
+        self.fieldDoc = fieldDoc
+
+
+class NexusClass(Record):
+    '''A NeXus base class (a value of classDict); fields maps long names to Field records'''
+    __slots__ = ('xml_file', 'extends', 'classDoc', 'fields', 'groups_cited')
+
+
+class Application(Record):
+    '''A NeXus application definition (a value of applicationDict)'''
+    __slots__ = ('extends', 'doc', 'xml_file', 'groups_cited')
+
+
+def intern(name):
+    '''sys.intern for names that may be None'''
+    return None if name is None else sys.intern(name)
+
+
+# save / load
+#
+# file_format data: [string table, tagsDict, columns]. Each column is a list
+# of string indices (index 0 is None), with fixed width rows:
+#   classes       className, xml_file, extends, classDoc
+#   fields        long name and the Field slots, for the fields of each class in turn
+#   applications  name, extends, doc, xml_file
+#   groups        groups_cited of each class, then of each application
+#   types         name, doc
+#   counts        number of fields and groups_cited of each class, then groups_cited of each application (not indices)
+
+class _Strings:
+    # table of distinct strings, each stored once; index 0 is None
+    def __init__(self):
+        self.index = {None: 0}
+        self.table = [None]
+
+    def __call__(self, s):
+        if not s in self.index:
+            self.index[s] = len(self.table)
+            self.table.append(s)
+        return self.index[s]
+
+
+def _rows(table, column, width):
+    # rows of strings of a column
+    return list(zip(*[iter(map(table.__getitem__, column))] * width))
+
+
+def save(path, classDict, applicationDict, typesDict, tagsDict):
+    '''Save the model to path'''
+    s = _Strings()
+    classes, fields, applications, groups, types, counts = [], [], [], [], [], []
+    for className, cls in classDict.items():
+        classes += [s(className), s(cls['xml_file']), s(cls['extends']), s(cls['classDoc'])]
+        for long_name, field in cls['fields'].items():
+            fields += [s(long_name)] + [s(field[k]) for k in Field.__slots__]
+        groups += [s(g) for g in cls['groups_cited']]
+        counts += [len(cls['fields']), len(cls['groups_cited'])]
+    for name, app in applicationDict.items():
+        applications += [s(name), s(app['extends']), s(app['doc']), s(app['xml_file'])]
+        groups += [s(g) for g in app['groups_cited']]
+        counts += [len(app['groups_cited'])]
+    for name, t in typesDict.items():
+        types += [s(name), s(t['doc'])]
+    columns = [classes, fields, applications, groups, types, counts]
+    file_format.save(path, _magic, model_format, [s.table, tagsDict, columns])
+
+
+def load(path):
+    '''Return classDict, applicationDict, typesDict, tagsDict saved in path'''
+    table, tagsDict, (classes, fields, applications, groups, types, counts) = \
+        file_format.load(path, _magic, model_format, 'NeXus model file')
+    table = [None] + list(map(sys.intern, table[1:])) # shared with other loaded versions
+    fields = iter(_rows(table, fields, 1 + len(Field.__slots__)))
+    groups = iter(map(table.__getitem__, groups))
+    counts = iter(counts)
+
+    classDict = {}
+    for className, xml_file, extends, classDoc in _rows(table, classes, 4):
+        n_fields, n_groups = next(counts), next(counts)
+        classDict[className] = NexusClass(xml_file, extends, classDoc,
+                                          {f[0]: Field(*f[1:]) for f in islice(fields, n_fields)},
+                                          list(islice(groups, n_groups)))
+    applicationDict = {name: Application(extends, doc, xml_file, list(islice(groups, next(counts))))
+                       for name, extends, doc, xml_file in _rows(table, applications, 4)}
+    typesDict = {name: {'doc': doc} for name, doc in _rows(table, types, 2)}
+    return classDict, applicationDict, typesDict, tagsDict
@@ -0,0 +1,144 @@
+# Parse NeXus nxdl files into plain python records
+#
+# Each function parses the content of one file and returns a record made of
+# dicts, lists and strings only, so that records can be cached per file and
+# merged into classDict / applicationDict by the ontology script.
+#
+# Field records hold the raw 'units' and 'type' attributes ('' if missing);
+# defaults are applied when the fields are added to classDict.
+
+import io
+import multiprocessing
+import xml.dom.minidom
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+
+parser_version = '2' # change whenever the records below change, to invalidate cached records
+
+
+def local_name(tag):
+    '''Element tag without the nxdl namespace'''
+    return tag.rpartition('}')[2]
+
+
+def _text(elem):
+    # value of the first child node, as minidom firstChild.nodeValue: the text
+    # before the first child, or the first child itself if that is a comment
+    if elem.text:
+        return elem.text.replace('\n','')
+    if len(elem) and elem[0].tag is ElementTree.Comment:
+        return elem[0].text.replace('\n','')
+    return ''
+
+
+def _field_record(field):
+    return {'fieldName': field.get('name', ''),
+            'units': field.get('units', ''),
+            'type': field.get('type', ''),
+            'fieldDoc': '',
+            'deprecated': field.get('deprecated', '')}
+
+
+def _extract(content, application):
+    # Single pass over the file with iterparse. Elements are dropped as soon as
+    # they end, so memory does not grow with the size of the file.
+    #
+    # base class:  fields are the direct children of the definition and every
+    #              group (at any depth) is cited
+    # application: every group (at any depth) is recorded with its direct child fields
+    record = {'name': '', 'extends': '', 'doc': None, 'fields': [], 'groups': []}
+    stack = []          # open elements
+    group_fields = {}   # open group element -> list of its field records
+    fields = {}         # open field element -> its record
+    documented = set()  # fields whose first doc element has been seen
+    field_doc = {}      # open doc element -> record of the field it documents
+    parser = ElementTree.XMLParser(target=ElementTree.TreeBuilder(insert_comments=True))
+    for event, elem in ElementTree.iterparse(io.BytesIO(content), events=('start', 'end'), parser=parser):
+        tag = local_name(elem.tag)
+        if event == 'start':
+            if not stack:
+                record['name'] = elem.get('name', '')
+                record['extends'] = elem.get('extends', '')
+            elif tag == 'group':
+                record['groups'].append((elem.get('type', ''), []))
+                group_fields[elem] = record['groups'][-1][1]
+            elif tag == 'field':
+                if application and stack[-1] in group_fields:
+                    fields[elem] = _field_record(elem)
+                    group_fields[stack[-1]].append(fields[elem])
+                elif not application and len(stack) == 1:
+                    fields[elem] = _field_record(elem)
+                    record['fields'].append(fields[elem])
+            elif tag == 'doc':
+                # the field doc is the first doc element inside the field, at any depth
+                owner = next((e for e in reversed(stack) if e in fields), None)
+                if owner is not None and owner not in documented:
+                    documented.add(owner)
+                    field_doc[elem] = fields[owner]
+            stack.append(elem)
+        else:
+            stack.pop()
+            if elem in field_doc:
+                field_doc.pop(elem)['fieldDoc'] = _text(elem)
+            elif tag == 'doc' and record['doc'] is None and len(stack) == 1 and local_name(stack[0].tag) == 'definition':
+                record['doc'] = _text(elem)
+            fields.pop(elem, None)
+            documented.discard(elem)
+            group_fields.pop(elem, None)
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+    record['doc'] = record['doc'] or ''
+    return record
+
+
+def parse_base_class(content):
+    '''Return name, extends, classDoc, fields and groups_cited of a base class nxdl file'''
+    record = _extract(content, application=False)
+    return {'name': record['name'],
+            'extends': record['extends'],
+            'classDoc': record['doc'],
+            'fields': record['fields'],
+            'groups_cited': [groupName for groupName, fields in record['groups']]}
+
+
+def parse_application(content):
+    '''Return name, extends, doc and the groups (with their fields) of an application definition nxdl file
+
+    groups is a list of (class name, field records) for every group in the file,
+    in document order.
+    '''
+    record = _extract(content, application=True)
+    return {'name': record['name'],
+            'extends': record['extends'],
+            'doc': record['doc'],
+            'groups': record['groups']}
+
+
+def parse_types(content):
+    '''Return {type name: {'doc': documentation}} for the simple types in nxdlTypes.xsd'''
+    types_dom = xml.dom.minidom.parseString(content)
+    typesDict = {}
+    for nxtype in types_dom.getElementsByTagName('xs:simpleType'):
+        name = nxtype.getAttribute('name')
+        doc = nxtype.getElementsByTagName('xs:documentation')
+        docstr = doc[0].firstChild.nodeValue if doc and doc[0].firstChild else '' # undocumented in older versions
+        docstr = docstr.replace('\n','').replace('\t','')
+        typesDict[name] = {'doc': docstr}
+    return typesDict
+
+
+def parse_all(parse, contents, workers=1):
+    '''Return [parse(content) for content in contents], using a pool of worker processes
+
+    The parse functions are pure, so the result does not depend on the number
+    of workers. Worker processes are forked; where fork is not available the
+    files are parsed in this process (spawned workers would re-run the script).
+    '''
+    contents = list(contents)
+    if workers <= 1 or len(contents) <= 1 or not 'fork' in multiprocessing.get_all_start_methods():
+        return [parse(content) for content in contents]
+    chunksize = max(1, len(contents) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        return list(pool.map(parse, contents, chunksize=chunksize))
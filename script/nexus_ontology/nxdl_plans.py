@@ -0,0 +1,139 @@
+# Validation plans of the NeXus application definitions
+#
+# The ontology holds what an application definition cites, not what it
+# requires. compile_application reads an application definition into a tree
+# of the groups it requires, each with its fields and links: name, whether
+# it is required, recommended or optional, and the type and unit category of
+# each field. In application definitions groups and fields are required
+# unless marked optional="true", recommended="true" or minOccurs="0"; names
+# with nameType="any" or in upper case (DATA) stand for any name, so such
+# groups are matched by NX_class alone and such fields are not checked.
+# Attributes, enumerations and dimensions are not part of the plans, nor are
+# the alternatives of a choice.
+#
+# build completes the plans from classDict (the unit category of a field
+# that the application definition gives without one) and keeps the chain of
+# application definitions each one extends, since a file valid for NXxlaue
+# must also satisfy NXxrot. The plans are nested tuples, saved next to the
+# ontology in the versioned file format of file_format, and checked against
+# HDF5 files by hdf5_validate.
+#
+#   group   (NX_class, name or None, level, fields, groups)
+#   field   (name, level, type or '', unit category or '', 'field' or 'link')
+
+import io
+from xml.etree import ElementTree
+
+from . import file_format
+from . import nxdl_merge
+from . import nxdl_parse
+
+
+compiler_version = 'plans-1' # parse cache namespace; change whenever compile_application changes
+plans_format = 2 # change whenever the layout of the file changes
+_magic = b'NXPLANS'
+
+
+def _level(elem):
+    if elem.get('recommended', 'false') == 'true':
+        return 'recommended'
+    if elem.get('optional', 'false') == 'true' or elem.get('minOccurs') == '0':
+        return 'optional'
+    return 'required'
+
+
+def _name(elem):
+    # the fixed name of a group or field, or None if it stands for any name
+    name = elem.get('name')
+    if not name or elem.get('nameType', 'specified') != 'specified' or name.isupper():
+        return None
+    return name
+
+
+def _group(elem):
+    fields, groups = [], []
+    for child in elem:
+        tag = nxdl_parse.local_name(child.tag)
+        if tag == 'group':
+            groups.append(_group(child))
+        elif tag in ('field', 'link') and _name(child) is not None:
+            fields.append((child.get('name'), _level(child), child.get('type', '') if tag == 'field' else '',
+                           child.get('units', '') if tag == 'field' else '', tag))
+    return (elem.get('type', ''), _name(elem), _level(elem), tuple(fields), tuple(groups))
+
+
+def compile_application(content):
+    '''Return name, extends and the plan of the top level groups of an application definition nxdl file'''
+    root = ElementTree.parse(io.BytesIO(content)).getroot()
+    return {'name': root.get('name', ''),
+            'extends': root.get('extends', ''),
+            'groups': tuple(_group(child) for child in root if nxdl_parse.local_name(child.tag) == 'group')}
+
+
+def _resolve(group, classDict, join_string):
+    # unit categories of fields given without one, from the base class of their group
+    nx_class, name, level, fields, groups = group
+    base = classDict.get(nx_class)
+    resolved = []
+    for field in fields:
+        if not field[3] and field[4] == 'field' and base is not None:
+            record = base['fields'].get(nx_class + join_string + field[0])
+            if record is not None and record['defn_name'] is None:
+                field = field[:3] + (record['units'],) + field[4:]
+        resolved.append(field)
+    return (nx_class, name, level, tuple(resolved), tuple(_resolve(g, classDict, join_string) for g in groups))
+
+
+def build(records, classDict, version=None, join_string='-'):
+    '''Return the Plans of [(xml_file, compiled record)] of the application definitions'''
+    plans = {}
+    for xml_file, record in nxdl_merge.sorted_records(records):
+        plans[record['name']] = (record['extends'],
+                                 tuple(_resolve(group, classDict, join_string) for group in record['groups']))
+    return Plans({'version': version, 'plans': plans})
+
+
+class Plans:
+    '''Validation plans of the application definitions (see build and load)'''
+
+    def __init__(self, data):
+        self.version = data['version']
+        self.plans = data['plans']  # name: (extends, top level groups)
+        self._data = data
+
+    def __contains__(self, name):
+        return name in self.plans
+
+    def __iter__(self):
+        return iter(sorted(self.plans))
+
+    def chain(self, name):
+        '''name and the application definitions it extends, directly or indirectly'''
+        names = []
+        while name in self.plans and name not in names:
+            names.append(name)
+            name = self.plans[name][0]
+        if not names:
+            raise KeyError('No application definition %s' % name)
+        return names
+
+    def entries(self, name):
+        '''Plans of the NXentry / NXsubentry groups of name and of the definitions it extends'''
+        return [group for n in self.chain(name) for group in self.plans[n][1] if group[0] in ('NXentry', 'NXsubentry')]
+
+
+def save(path, plans):
+    '''Save plans to path'''
+    file_format.save(path, _magic, plans_format, plans._data)
+
+
+def _tuples(value):
+    # the nested tuples of a plan, loaded as lists
+    return tuple(map(_tuples, value)) if isinstance(value, list) else value
+
+
+def load(path):
+    '''Return the Plans saved in path'''
+    data = file_format.load(path, _magic, plans_format, 'NeXus plans file')
+    data['plans'] = {name: _tuples(plan) for name, plan in data['plans'].items()}
+    return Plans(data)
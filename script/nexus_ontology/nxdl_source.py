@@ -0,0 +1,353 @@
+# Sources of NeXus definition files
+#
+# A source provides the list of NeXus version tags and the raw contents of
+# nxdlTypes.xsd and of the base class and application definition nxdl files.
+# The parsing cells of the ontology script only see (xml_file, content) pairs,
+# so they do not need to know where the files came from.
+
+import copy
+import glob
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import urllib.parse
+import zlib
+
+
+github_api = 'https://api.github.com/repos/'
+github_raw = 'https://raw.githubusercontent.com/'
+
+nxdl_folders = ('base_classes', 'applications')
+types_file = 'nxdlTypes.xsd'
+
+
+def is_nxdl(path, folder):
+    '''True if path is an nxdl file directly inside folder'''
+    return posixpath.dirname(path) == folder and path.endswith('.nxdl.xml')
+
+
+def blob_sha(content):
+    '''git blob sha of content, as listed by git and the GitHub API'''
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+class Source:
+    '''Common part of the sources
+
+    Sources implement get_tags(), get_types() and get_files(folder). Sources
+    which can list files without reading them (GithubSource, LocalSource at a
+    ref) also override list_files and read_files, so that cached files are not
+    downloaded or read. at(tag) returns a source of the same repository at
+    another version tag.
+    '''
+
+    def list_files(self, folder):
+        '''Return [(xml_file, blob sha)] for the nxdl files in folder'''
+        return [(xml_file, blob_sha(content)) for xml_file, content in self.get_files(folder)]
+
+    def read_files(self, folder, xml_files):
+        '''Return the contents of the given xml_files of folder'''
+        contents = dict(self.get_files(folder))
+        return [contents[xml_file] for xml_file in xml_files]
+
+    def at(self, tag):
+        '''Source of the definitions at version tag'''
+        raise NotImplementedError('%s cannot read other versions' % type(self).__name__)
+
+
+def raw_url(nexus_repo, ref, path):
+    '''Raw GitHub URL of path in nexus_repo at ref
+
+    Every source records its files (xml_file) by this URL at the version tag
+    they describe, so the same definitions give the same model whichever
+    source they are read from.
+    '''
+    return github_raw + nexus_repo + '/' + ref + '/' + path
+
+
+def github_tag(nexus_repo, name, sha, api=github_api):
+    '''Tag record with the keys of the GitHub API tag list, for a tag not listed by the API
+
+    node_id, the GitHub GraphQL id, is None: it cannot be made without the API.
+    '''
+    repo = api + nexus_repo
+    return {'name': name,
+            'zipball_url': repo + '/zipball/refs/tags/' + name,
+            'tarball_url': repo + '/tarball/refs/tags/' + name,
+            'commit': {'sha': sha, 'url': None if sha is None else repo + '/commits/' + sha},
+            'node_id': None}
+
+
+def _tag_first(tags, tag):
+    # put the requested tag first so that tags[0] describes the files
+    return [t for t in tags if t['name'] == tag] + [t for t in tags if t['name'] != tag]
+
+
+class GithubSource(Source):
+    '''Definitions listed with the GitHub API (PyGithub) and downloaded one file at a time
+
+    With ref=None the files of the default branch are downloaded; they are
+    recorded, as by the other sources, by their raw_url at the newest tag.
+    '''
+
+    def __init__(self, nexus_repo, token, fetcher, types_url, ref=None):
+        from github import Github
+        self.repo = Github(token).get_repo(nexus_repo)
+        self.fetcher = fetcher
+        self.types_url = types_url
+        self.ref = ref  # None: the default branch
+        self._tags = None
+        self._urls = {}  # xml_file: download URL, of the files listed
+
+    def get_tags(self):
+        if self._tags is None:
+            self._tags = json.loads(self.fetcher.fetch(self.repo.tags_url).decode())
+        return self._tags if self.ref is None else _tag_first(self._tags, self.ref)
+
+    def get_types(self):
+        return self.fetcher.fetch(self.types_url)
+
+    def get_files(self, folder):
+        urls = [xml_file for xml_file, sha in self.list_files(folder)]
+        return list(zip(urls, self.read_files(folder, urls)))
+
+    def list_files(self, folder):
+        contents = self.repo.get_contents(folder) if self.ref is None else self.repo.get_contents(folder, ref=self.ref)
+        tag = self.get_tags()[0]['name']
+        listing = []
+        for file in contents:
+            if is_nxdl(file.path, folder):
+                xml_file = raw_url(self.repo.full_name, tag, file.path)
+                self._urls[xml_file] = file.download_url
+                listing.append((xml_file, file.sha))
+        return listing
+
+    def read_files(self, folder, xml_files):
+        return self.fetcher.fetch_all([self._urls.get(xml_file, xml_file) for xml_file in xml_files])
+
+    def at(self, tag):
+        source = copy.copy(self)  # same repository and fetcher
+        source.ref, source._tags, source._urls = tag, self.get_tags(), {}
+        source.types_url = raw_url(self.repo.full_name, tag, types_file)
+        return source
+
+
+class ArchiveSource(Source):
+    '''Definitions extracted from a single tarball of the repository at a version tag
+
+    The archive is streamed through tarfile and only nxdlTypes.xsd and the nxdl
+    files in base_classes and applications are kept, in memory. With a cache
+    directory, each tarball is also kept there, named after its tag and
+    commit, and is not downloaded again by later runs or by at(tag).
+    '''
+
+    def __init__(self, nexus_repo, fetcher, tag=None, api=github_api, cache=None):
+        self.nexus_repo = nexus_repo
+        self.fetcher = fetcher
+        self.tag = tag  # None: use the newest tag
+        self.api = api  # GitHub API (or a mirror of it)
+        self.cache = cache  # directory of downloaded tarballs, or None
+        self._tags = None
+        self._files = None
+
+    def get_tags(self):
+        if self._tags is None:
+            url = self.api + self.nexus_repo + '/tags'
+            self._tags = json.loads(self.fetcher.fetch(url).decode())
+            if self.tag is not None:
+                self._tags = _tag_first(self._tags, self.tag)
+        return self._tags
+
+    def at(self, tag):
+        source = ArchiveSource(self.nexus_repo, self.fetcher, tag, self.api, self.cache)
+        source._tags = _tag_first(self.get_tags(), tag)
+        return source
+
+    def get_types(self):
+        return self._archive()[types_file]
+
+    def get_files(self, folder):
+        tag = self.get_tags()[0]['name']
+        files = self._archive()
+        return [(raw_url(self.nexus_repo, tag, path), files[path]) for path in sorted(files) if is_nxdl(path, folder)]
+
+    def _archive(self):
+        if self._files is None:
+            tag = self.get_tags()[0]
+            url = tag.get('tarball_url') or self.api + self.nexus_repo + '/tarball/' + tag['name']
+            if self.cache is None:
+                self._files = self.fetcher.fetch_stream(url, extract_definitions)
+            else:
+                self._files = self._cached(tag, url)
+        return self._files
+
+    def _cached(self, tag, url):
+        # tarballs are named after the repository, tag and commit, so a moved tag is downloaded again
+        name = '%s-%s-%s.tar.gz' % (self.nexus_repo, tag['name'], (tag.get('commit') or {}).get('sha'))
+        path = os.path.join(self.cache, urllib.parse.quote(name, safe=''))
+        if os.path.isfile(path):
+            try:
+                with open(path, 'rb') as f:
+                    return extract_definitions(f)
+            except EOFError:
+                pass  # damaged - download again
+        os.makedirs(self.cache, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache)
+        try:
+            with os.fdopen(fd, 'w+b') as f:
+                def _save(response):
+                    f.seek(0)  # the whole download is repeated on failure
+                    f.truncate()
+                    shutil.copyfileobj(response, f)
+                self.fetcher.fetch_stream(url, _save)
+                f.seek(0)
+                files = extract_definitions(f)
+            os.replace(tmp, path)  # only complete archives are kept
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return files
+
+
+class LocalSource(Source):
+    '''Definitions read from a local directory or git checkout - no network or token needed
+
+    With ref=None the files are read from the directory (working tree). With ref
+    set to a tag, branch or commit of a git checkout, the files are read from
+    that commit with git, leaving the working tree alone: list_files lists the
+    blob shas (git ls-tree) and read_files reads only the blobs asked for.
+
+    The version tags are those of the local git repository, newest version
+    first and with the keys of the GitHub API (github_tag). A directory that
+    is not a git checkout uses the NXDL_VERSION file if there is one. The
+    xml_file of every file is its raw_url at the ref, or at the newest tag
+    for the working tree, as for the online sources.
+    '''
+
+    def __init__(self, path, ref=None, nexus_repo='nexusformat/definitions'):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.ref = ref
+        self.nexus_repo = nexus_repo
+        self._files = None
+        self._shas = {}  # xml_file: blob sha, of the files listed at ref
+        self._tags = None
+
+    def get_tags(self):
+        if self._tags is None:
+            self._tags = []
+            try:
+                refs = self._git('for-each-ref', '--sort=-version:refname',
+                                 '--format=%(refname:short) %(objectname) %(*objectname)', 'refs/tags')
+            except (OSError, subprocess.CalledProcessError):
+                refs = ''
+            for line in refs.splitlines():
+                fields = line.split()  # annotated tags have a third field, the commit the tag points to
+                self._tags.append(github_tag(self.nexus_repo, fields[0], fields[-1]))
+        tags = self._tags
+        if self.ref is not None:
+            # tags[0] describes the files that are read
+            tags = _tag_first(tags, self.ref)
+        if not tags:
+            version_file = os.path.join(self.path, 'NXDL_VERSION')
+            name = open(version_file).read().strip() if os.path.isfile(version_file) else 'Unknown'
+            tags = [github_tag(self.nexus_repo, name, None)]
+        return tags
+
+    def get_types(self):
+        if self.ref is not None:
+            return subprocess.run(('git', '-C', self.path, 'cat-file', 'blob', '%s:%s' % (self.ref, types_file)),
+                                  check=True, stdout=subprocess.PIPE).stdout
+        with open(os.path.join(self.path, types_file), 'rb') as f:
+            return f.read()
+
+    def _url(self, path):
+        # raw_url of a file at the ref, or at the newest tag for the working tree
+        return raw_url(self.nexus_repo, self.ref if self.ref is not None else self.get_tags()[0]['name'], path)
+
+    def get_files(self, folder):
+        if self.ref is not None:
+            files = self._archive()
+            return [(self._url(path), files[path]) for path in sorted(files) if is_nxdl(path, folder)]
+        files = []
+        for path in sorted(glob.glob(os.path.join(self.path, folder, '*.nxdl.xml'))):
+            with open(path, 'rb') as f:
+                files.append((self._url(folder + '/' + os.path.basename(path)), f.read()))
+        return files
+
+    def list_files(self, folder):
+        if self.ref is None:
+            return Source.list_files(self, folder)
+        listing = []
+        for line in self._git('ls-tree', '--full-tree', self.ref, folder + '/').splitlines():
+            info, path = line.split('\t', 1)  # <mode> blob <sha>\t<path>
+            if is_nxdl(path, folder):
+                self._shas[self._url(path)] = sha = info.split()[2]
+                listing.append((self._url(path), sha))
+        return sorted(listing)
+
+    def read_files(self, folder, xml_files):
+        if self.ref is None or not all(xml_file in self._shas for xml_file in xml_files):
+            return Source.read_files(self, folder, xml_files)
+        return read_blobs(self.path, [self._shas[xml_file] for xml_file in xml_files])
+
+    def at(self, tag):
+        source = LocalSource(self.path, tag, self.nexus_repo)
+        self.get_tags()
+        source._tags = self._tags  # listed once for all versions
+        return source
+
+    def _git(self, *args):
+        return subprocess.run(('git', '-C', self.path) + args, check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode()
+
+    def _archive(self):
+        if self._files is None:
+            git = subprocess.Popen(('git', '-C', self.path, 'archive', '--format=tar', '--prefix=definitions/', self.ref),
+                                   stdout=subprocess.PIPE)
+            self._files = extract_definitions(git.stdout)
+            if git.wait() != 0:
+                raise OSError('git archive %s failed in %s' % (self.ref, self.path))
+        return self._files
+
+
+def read_blobs(path, shas):
+    '''Contents of the git blobs shas of the repository in path, read by one git cat-file process'''
+    if not shas:
+        return []
+    git = subprocess.run(('git', '-C', path, 'cat-file', '--batch'), input=''.join(sha + '\n' for sha in shas).encode(),
+                         check=True, stdout=subprocess.PIPE)
+    out, pos, contents = git.stdout, 0, []
+    for sha in shas:
+        end = out.index(b'\n', pos)
+        header = out[pos:end].split()  # <sha> blob <size>, or <sha> missing
+        if len(header) != 3:
+            raise OSError('git blob %s not found in %s' % (sha, path))
+        size = int(header[2])
+        contents.append(out[end + 1:end + 1 + size])
+        pos = end + 2 + size
+    return contents
+
+
+def extract_definitions(fileobj):
+    '''Read a tar (or .tar.gz) stream of the definitions repository and return {path: content}
+
+    Paths are relative to the top level of the repository, e.g.
+    'base_classes/NXsample.nxdl.xml'. Nothing is written to disk.
+    '''
+    files = {}
+    try:
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                path = member.name.split('/', 1)[-1]  # strip the <repo>-<sha>/ top level directory
+                if path == types_file or any(is_nxdl(path, folder) for folder in nxdl_folders):
+                    files[path] = archive.extractfile(member).read()
+    except (tarfile.TarError, zlib.error) as err:
+        raise EOFError('Incomplete or corrupt archive: %s' % err)
+    return files
@@ -0,0 +1,38 @@
+# Build the merged definitions of every NeXus version tag
+#
+# Each version is read through source.at(tag) and parse_cache, which lists the
+# blob sha of every file and reads and parses only the files whose sha has not
+# been seen before. Files that are the same in several versions are therefore
+# read and parsed once, and their parsed records are shared between the
+# versions (parse_cache.records); only the merge, which is cheap, is repeated
+# for every version.
+
+from . import nxdl_merge
+from . import nxdl_parse
+
+
+def load(source, parse_cache, workers=1, join_string='-', join_string_label=' ', default_units='NX_UNITLESS', stats=None):
+    '''Return classDict, applicationDict, typesDict and tagsDict of the definitions of source'''
+    typesDict = parse_cache.parse(source.get_types(), nxdl_parse.parse_types)
+    tagsDict = source.get_tags()[0]
+    records = parse_cache.parse_files(source, 'base_classes', nxdl_parse.parse_base_class, workers)
+    classDict = nxdl_merge.merge_base_classes(records, join_string, join_string_label, default_units, stats)
+    records = parse_cache.parse_files(source, 'applications', nxdl_parse.parse_application, workers)
+    applicationDict = nxdl_merge.merge_applications(classDict, records, join_string, join_string_label, default_units, stats)
+    return classDict, applicationDict, typesDict, tagsDict
+
+
+def versions(source, parse_cache, tags=None, workers=1, join_string='-', join_string_label=' ', default_units='NX_UNITLESS',
+             stats=None):
+    '''Yield (tag, classDict, applicationDict, typesDict, tagsDict) for each version tag of source
+
+    tags is a list of tag names, or None for all tags of the repository (newest
+    first). The dicts of one version can be released before the next one is
+    built; records of files common to several versions are shared.
+    '''
+    names = [tag['name'] for tag in source.get_tags()]
+    for name in names if tags is None else tags:
+        if name not in names:
+            raise KeyError('No version tag %s in %s' % (name, ', '.join(names)))
+        yield (name,) + load(source.at(name), parse_cache, workers, join_string, join_string_label, default_units, stats)
+
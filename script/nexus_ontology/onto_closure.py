@@ -0,0 +1,189 @@
+# Transitive closures of the extends and citesGroup relations of the NeXus classes
+#
+# extends     a base class or application definition to the class it extends
+# citesGroup  a base class or application definition to the base classes of
+#             the groups in it (nested groups of application definitions too)
+#
+# The closures answer "which classes does NXmx extend, directly or not",
+# "what inherits from NXobject" (inverse), "which base classes can appear
+# anywhere under NXmx" and "under which classes can NXdetector appear"
+# (inverse) without walking the definitions. They are computed once per build
+# over the strongly connected components of each relation (citesGroup has
+# cycles, e.g. NXgeometry - NXorientation), with Python ints as bit sets, and saved
+# next to the ontology in the versioned file format of file_format: the class
+# names and, per relation, the sorted forward and inverse closure of every
+# class as name indices.
+#
+# describe() gives the closures as resources of onto_rdf, asserted with the
+# transitive properties extendsTransitive and citesGroupTransitive, for
+# writing with onto_rdf.writers next to the ontology.
+
+from . import file_format
+from . import onto_rdf
+
+
+closure_format = 2 # change whenever the layout of the file changes
+_magic = b'NXCLOSE'
+
+relations = ('extends', 'citesGroup')
+
+
+def edges(classDict, applicationDict):
+    '''{relation: {class name: [names]}} of the direct extends and citesGroup relations'''
+    graph = {'extends': {}, 'citesGroup': {}}
+    for records in (classDict, applicationDict):
+        for name, record in records.items():
+            # NXobject has no extends (or extends itself in some files)
+            graph['extends'][name] = [record['extends']] if record['extends'] and record['extends'] != name else []
+            graph['citesGroup'][name] = sorted(set(record['groups_cited']))
+    return graph
+
+
+def _components(nodes, succ):
+    # strongly connected components (Tarjan, iterative), successors before predecessors
+    index, low, on_stack, stack, components = {}, {}, set(), [], []
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(succ[root]))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(succ[child])))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def closure(succ):
+    '''[sorted indices of the nodes reachable from node i in one or more steps] for the
+    successor lists succ[i] (of indices)'''
+    reach = [0] * len(succ)
+    for component in _components(range(len(succ)), succ):
+        bits = 0
+        for node in component:
+            for child in succ[node]:
+                bits |= reach[child] | 1 << child
+        for node in component: # successors' components are done, so this is the closure
+            reach[node] = bits
+    return [_indices(bits) for bits in reach]
+
+
+def _indices(bits):
+    result = []
+    while bits:
+        low = bits & -bits
+        result.append(low.bit_length() - 1)
+        bits ^= low
+    return tuple(result)
+
+
+def build(classDict, applicationDict, version=None):
+    '''Return the Closures of the extends and citesGroup relations'''
+    graph = edges(classDict, applicationDict)
+    names = sorted(set(graph['extends']).union(*[targets for relation in graph.values() for targets in relation.values()]))
+    position = {name: i for i, name in enumerate(names)}
+    data = {'version': version, 'names': tuple(names)}
+    for relation in relations:
+        succ = [[position[t] for t in graph[relation].get(name, ())] for name in names]
+        forward = closure(succ)
+        inverse = [[] for name in names]
+        for i, reached in enumerate(forward):
+            for j in reached:
+                inverse[j].append(i)
+        data[relation] = (tuple(forward), tuple(tuple(i) for i in inverse))
+    return Closures(data)
+
+
+class Closures:
+    '''Transitive closures of extends and citesGroup (see build and load); names are class names'''
+
+    def __init__(self, data):
+        self.version = data['version']
+        self.names = data['names']
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._data = data
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def related(self, relation, name, inverse=False):
+        '''Names reached from name by one or more relation steps (or reaching name, if inverse), sorted'''
+        names = self.names
+        return [names[i] for i in self._data[relation][1 if inverse else 0][self._position[name]]]
+
+    def ancestors(self, name):
+        '''Classes that name extends, directly or indirectly'''
+        return self.related('extends', name)
+
+    def descendants(self, name):
+        '''Classes that extend name, directly or indirectly'''
+        return self.related('extends', name, inverse=True)
+
+    def cited(self, name):
+        '''Base classes that can appear anywhere under name'''
+        return self.related('citesGroup', name)
+
+    def citing(self, name):
+        '''Classes under which name can appear'''
+        return self.related('citesGroup', name, inverse=True)
+
+
+def save(path, closures):
+    '''Save closures to path'''
+    file_format.save(path, _magic, closure_format, closures._data)
+
+
+def load(path):
+    '''Return the Closures saved in path'''
+    return Closures(file_format.load(path, _magic, closure_format, 'NeXus closure file'))
+
+
+def describe(closures, settings):
+    '''Yield onto_rdf resources asserting the closures with the transitive properties
+    extendsTransitive and citesGroupTransitive, for the classes of the ontology'''
+    IRI, owl, rdfs = onto_rdf.IRI, onto_rdf.owl, onto_rdf.rdfs
+    base_iri, ns = settings['base_iri'], settings['onto_iri'] + '#'
+    properties = {'extends': IRI(ns + 'extendsTransitive'), 'citesGroup': IRI(ns + 'citesGroupTransitive')}
+    yield (properties['citesGroup'], IRI(owl + 'ObjectProperty'),
+           [(IRI(onto_rdf.rdf + 'type'), IRI(owl + 'TransitiveProperty')),
+            (IRI(rdfs + 'comment'), 'Base classes that can appear anywhere under a NeXus class (transitive closure of citesGroup)')])
+    yield (properties['extends'], IRI(owl + 'ObjectProperty'),
+           [(IRI(onto_rdf.rdf + 'type'), IRI(owl + 'TransitiveProperty')),
+            (IRI(rdfs + 'comment'), 'NeXus classes that a NeXus class extends, directly or indirectly')])
+    for name in closures.names: # sorted, as the class IRIs
+        props = [(properties[relation], IRI(base_iri + related))
+                 for relation in relations for related in closures.related(relation, name)]
+        if props:
+            yield (IRI(base_iri + name), IRI(owl + 'Class'), props)
+
+
+def write_triples(path, formats, closures, settings):
+    '''Write the resources of describe to path + '.' + format for each format in formats; returns the files written'''
+    files = []
+    for fmt in formats:
+        with open(path + '.' + fmt, 'w', encoding='utf-8', newline='\n') as f:
+            onto_rdf.writers[fmt](describe(closures, settings), f, onto_rdf.prefixes(settings))
+        files.append(path + '.' + fmt)
+    return files
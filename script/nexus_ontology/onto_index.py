@@ -0,0 +1,129 @@
+# Lookup index of the NeXus field IRIs, written next to the ontology
+#
+# Resolves the long name (NXsample-temperature), label (NXsample temperature)
+# or IRI of a field, or a case-folded long name or label, to the field IRI,
+# its unit category and its seeAlso web page, without loading the ontology.
+# The index holds the same fields as the ontology written by onto_rdf, in the
+# same order (sorted by IRI).
+#
+# The file holds plain dicts, lists and sorted key lists in the versioned
+# file format of file_format, so loading it takes a few milliseconds. Prefix queries use binary search on the
+# sorted keys, and fields can be listed per class.
+
+import bisect
+import collections
+
+from . import file_format
+from . import onto_rdf
+
+
+index_format = 2 # change whenever the layout of the index changes
+_magic = b'NXINDEX'
+
+Entry = collections.namedtuple('Entry', 'iri name label className fieldName units unit_iri see_also')
+
+
+class Index:
+    '''Field lookup index (see build and load)'''
+
+    def __init__(self, data):
+        self.version = data['version']
+        self._rows = data['rows']         # Entry rows, sorted by IRI
+        self._keys = data['keys']         # long name, label or IRI -> row
+        self._folded = data['folded']     # case-folded long name or label -> first row, by IRI
+        self._names = data['names']       # sorted long names and labels
+        self._folded_names = data['folded_names']
+        self._classes = data['classes']   # class name -> rows of its fields
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        return (Entry._make(row) for row in self._rows)
+
+    def __contains__(self, name):
+        return name in self._keys
+
+    def __getitem__(self, name):
+        '''Entry of a long name, label or IRI; KeyError if there is no such field'''
+        return Entry._make(self._rows[self._keys[name]])
+
+    def get(self, name, default=None, casefold=False):
+        '''Entry of a long name, label or IRI, else of a case-folded long name or label if casefold'''
+        row = self._keys.get(name)
+        if row is None and casefold:
+            row = self._folded.get(name.casefold())
+        return default if row is None else Entry._make(self._rows[row])
+
+    def resolve(self, className, fieldName, join_string='-', casefold=True):
+        '''Entry of field fieldName of class className, or None'''
+        return self.get(className + join_string + fieldName, casefold=casefold)
+
+    def prefix(self, prefix, casefold=False, limit=None):
+        '''Entries whose long name or label starts with prefix, in key order, each entry once'''
+        names, keys = (self._folded_names, self._folded) if casefold else (self._names, self._keys)
+        if casefold:
+            prefix = prefix.casefold()
+        rows = {}
+        for i in range(bisect.bisect_left(names, prefix), len(names)):
+            if not names[i].startswith(prefix) or len(rows) == limit:
+                break
+            rows.setdefault(keys[names[i]], None)
+        return [Entry._make(self._rows[row]) for row in rows]
+
+    def classes(self):
+        '''Names of the classes with fields in the index'''
+        return list(self._classes)
+
+    def fields(self, className, prefix=''):
+        '''Entries of the fields of className whose field name starts with prefix'''
+        return [Entry._make(self._rows[row]) for row in self._classes.get(className, ())
+                if self._rows[row][4].startswith(prefix)]
+
+
+def build(classDict, settings):
+    '''Return the lookup index for classDict
+
+    settings are the onto_rdf settings; base_iri, onto_iri, version,
+    base_class_web_page_prefix and application_web_page_prefix are used.
+    '''
+    base_iri = settings['base_iri']
+    ns = settings['onto_iri'] + '#'
+    fields = sorted((base_iri + nxField, nxBaseClass, nxField) for nxBaseClass in classDict if nxBaseClass != 'NXobject'
+                    for nxField in classDict[nxBaseClass]['fields'])
+    rows, keys, folded, names, classes = [], {}, {}, set(), {}
+    for row, (iri, nxBaseClass, nxField) in enumerate(fields):
+        field = classDict[nxBaseClass]['fields'][nxField]
+        rows.append((iri, nxField, field['label'], nxBaseClass, field['fieldName'], field['units'], ns + field['units'],
+                     onto_rdf.field_web_page(nxBaseClass, field, settings)))
+        for key in (nxField, field['label'], iri):
+            keys.setdefault(key, row)
+        for key in (nxField, field['label']):
+            names.add(key)
+            folded.setdefault(key.casefold(), row)
+        classes.setdefault(nxBaseClass, []).append(row)
+    return Index({'version': settings['version'],
+                  'rows': tuple(rows),
+                  'keys': keys,
+                  'folded': folded,
+                  'names': sorted(names),
+                  'folded_names': sorted(folded),
+                  'classes': {c: tuple(r) for c, r in classes.items()}})
+
+
+def save(path, index):
+    '''Save index to path'''
+    data = {'version': index.version, 'rows': index._rows, 'keys': index._keys, 'folded': index._folded,
+            'names': index._names, 'folded_names': index._folded_names, 'classes': index._classes}
+    file_format.save(path, _magic, index_format, data)
+
+
+def write_index(path, classDict, settings):
+    '''Build the lookup index for classDict and save it to path'''
+    save(path, build(classDict, settings))
+    return path
+
+
+def load(path):
+    '''Return the Index saved in path'''
+    return Index(file_format.load(path, _magic, index_format, 'NeXus lookup index'))
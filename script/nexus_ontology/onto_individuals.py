@@ -0,0 +1,322 @@
+# Bulk store of measurement individuals: field values of datasets
+#
+# The data model is that of the test individuals in the ontology script: a
+# dataset individual is linked by a field property (NXsample-temperature) to
+# an individual of the unit category of the field (NX_TEMPERATURE) with
+# hasValue, hasMinValue, hasMaxValue and hasUnit. Instead of one owlready2
+# object per value, measurements are added in columnar batches
+#
+#   {'dataset': [...], 'field': [...], 'value': [...], 'min': [...], 'max': [...], 'unit': [...]}
+#
+# (lists, tuples or NumPy arrays; min, max and unit may be left out, and an
+# optional 'category' column is checked against the field range). Every row
+# is validated against the lookup index of the ontology (onto_index): the
+# field must be a field of the ontology, the category its range, the unit one
+# of that category, the value given and min <= max. Valid rows are written to a SQLite database in one
+# transaction per batch; rejected rows are counted per reason and the first
+# max_rejected of them are kept.
+#
+#   datasets      id, iri
+#   fields        id, iri, unit_category
+#   measurements  id, dataset, field, value, min, max, unit
+#
+# Memory is bounded by the batch size and the id caches (cache_size entries).
+# write_ntriples exports the individuals in the data model of the ontology.
+#
+# Dataset ids that are not absolute IRIs (d0, run/12) are resolved against
+# the base IRI given to write_ntriples.
+#
+# Rows whose unit is not compatible with the unit category of the field (m
+# for NX_ENERGY, or a unit that cannot be parsed) are rejected, using a unit
+# normalizer (onto_units, which needs NumPy); rows without a unit are not
+# checked. normalized returns the measurements of a field across datasets in
+# the canonical unit of its category, as NumPy arrays. Values are stored in the unit they were given in.
+#
+# usage: python -m nexus_ontology.onto_individuals <index> <store> <CSV files> [--batch-size N] [--no-check-units]
+
+import argparse
+import collections
+import csv
+import math
+import sqlite3
+import sys
+import urllib.parse
+
+from . import onto_index
+from . import onto_rdf
+
+
+store_format = 1 # change whenever the tables below change
+columns = ('dataset', 'field', 'value', 'min', 'max', 'unit')
+max_rejected = 1000 # rejected rows kept (all of them are counted)
+cache_size = 100000 # dataset and field ids kept in memory
+
+_schema = '''
+create table if not exists meta (key text primary key, value text);
+create table if not exists datasets (id integer primary key, iri text unique);
+create table if not exists fields (id integer primary key, iri text unique, unit_category text);
+create table if not exists measurements (id integer primary key, dataset integer, field integer,
+                                         value, min, max, unit text);
+create index if not exists measurements_dataset on measurements (dataset);
+create index if not exists measurements_field on measurements (field);
+'''
+
+
+def _column(batch, name, n):
+    values = batch.get(name)
+    if values is None:
+        return [None] * n
+    if hasattr(values, 'tolist'): # NumPy array: Python numbers, which sqlite3 can store
+        values = values.tolist()
+    if len(values) != n:
+        raise ValueError('column %s has %i rows, dataset has %i' % (name, len(values), n))
+    return values
+
+
+class MeasurementStore:
+    '''SQLite store of measurement individuals, validated against a lookup index
+
+    index is an onto_index.Index, or the path of one.
+    units is the onto_units.UnitNormalizer rejecting units not compatible with the field
+    range (default: one for every unit category), or False to store units unchecked.
+    '''
+
+    def __init__(self, path, index, units=None):
+        self.path = path
+        # onto_units.UnitNormalizer checking the units of added rows, or None
+        if units is None:
+            from . import onto_units # needs NumPy, so only when units are checked
+            units = onto_units.UnitNormalizer()
+        self.units = units or None
+        self.index = onto_index.load(index) if isinstance(index, str) else index
+        self.db = sqlite3.connect(path)
+        self.db.execute('pragma journal_mode = wal')
+        self.db.execute('pragma synchronous = normal')
+        self.db.execute('pragma cache_size = -65536') # 64 MB, for the index updates of large batches
+        with self.db:
+            self.db.executescript(_schema)
+            self.db.execute('insert or ignore into meta values (?, ?)', ('store_format', str(store_format)))
+        if self.db.execute("select value from meta where key = 'store_format'").fetchone()[0] != str(store_format):
+            raise ValueError('%s is not a measurement store (format %i)' % (path, store_format))
+        self._datasets = {}   # iri: id
+        self._fields = {}     # iri: (id, unit category, unit category IRI)
+        self.counts = collections.Counter()
+        self.rejected = []    # (dataset, field, reason), the first max_rejected
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reject(self, dataset, field, reason):
+        self.counts['rejected'] += 1
+        self.counts['rejected: ' + reason] += 1
+        if len(self.rejected) < max_rejected:
+            self.rejected.append((dataset, field, reason))
+
+    def _field(self, iri):
+        # (id, unit category, unit category IRI) of a field IRI, or None if it is not a field of the ontology
+        field = self._fields.get(iri)
+        if field is None:
+            entry = self.index.get(iri)
+            if entry is None or entry.iri != iri:
+                return None
+            self.db.execute('insert or ignore into fields (iri, unit_category) values (?, ?)', (iri, entry.units))
+            field = (self.db.execute('select id from fields where iri = ?', (iri,)).fetchone()[0], entry.units, entry.unit_iri)
+            if len(self._fields) >= cache_size:
+                self._fields.clear()
+            self._fields[iri] = field
+        return field
+
+    def _dataset_ids(self, iris):
+        # ids of the dataset IRIs, adding new datasets
+        new = [iri for iri in set(iris) if iri not in self._datasets]
+        if len(self._datasets) + len(new) > cache_size:
+            self._datasets.clear()
+            new = list(set(iris))
+        self.db.executemany('insert or ignore into datasets (iri) values (?)', ((iri,) for iri in new))
+        for i in range(0, len(new), 500): # at most 999 parameters per statement
+            chunk = new[i:i + 500]
+            self._datasets.update(self.db.execute('select iri, id from datasets where iri in (%s)' % ','.join('?' * len(chunk)),
+                                                  chunk))
+        return self._datasets
+
+    def add(self, batch):
+        '''Validate the rows of a columnar batch and write the valid ones in one transaction; returns the counts of the batch'''
+        n = len(batch['dataset'])
+        datasets, fields, values = (_column(batch, name, n) for name in ('dataset', 'field', 'value'))
+        mins, maxs, units, categories = (_column(batch, name, n) for name in ('min', 'max', 'unit', 'category'))
+        before = self.counts.copy()
+        rows = []
+        with self.db:
+            for dataset, iri, value, min_, max_, unit, category in zip(datasets, fields, values, mins, maxs, units, categories):
+                field = self._field(iri)
+                if field is None:
+                    self._reject(dataset, iri, 'unknown field')
+                elif category is not None and category != field[1] and category != field[2]:
+                    self._reject(dataset, iri, 'unit category is not the range of the field')
+                elif value is None or value != value: # None or NaN
+                    self._reject(dataset, iri, 'no value')
+                elif _out_of_order(min_, max_):
+                    self._reject(dataset, iri, 'min > max')
+                elif (self.units is not None and unit is not None and field[1] in self.units.categories
+                      and self.units.check(field[1], unit)):
+                    self._reject(dataset, iri, 'unit not compatible with the unit category')
+                else:
+                    rows.append((dataset, field[0], value, min_, max_, unit))
+            ids = self._dataset_ids([row[0] for row in rows])
+            self.db.executemany('insert into measurements (dataset, field, value, min, max, unit) values (?, ?, ?, ?, ?, ?)',
+                                ((ids[row[0]],) + row[1:] for row in rows))
+        self.counts['rows'] += n
+        self.counts['added'] += len(rows)
+        self.counts['batches'] += 1
+        return self.counts - before
+
+    def ingest(self, batches):
+        '''Add every batch of an iterable of batches; returns the counts of all batches'''
+        before = self.counts.copy()
+        for batch in batches:
+            self.add(batch)
+        return self.counts - before
+
+    def measurements(self, dataset=None, field=None):
+        '''(dataset, field, unit category, value, min, max, unit) of a dataset and/or field IRI'''
+        query = ('select d.iri, f.iri, f.unit_category, m.value, m.min, m.max, m.unit from measurements m '
+                 'join datasets d on d.id = m.dataset join fields f on f.id = m.field')
+        conditions = [(column, value) for column, value in (('d.iri', dataset), ('f.iri', field)) if value is not None]
+        if conditions:
+            query += ' where ' + ' and '.join('%s = ?' % column for column, value in conditions)
+        return self.db.execute(query + ' order by m.id', [value for column, value in conditions])
+
+    def normalized(self, field, units):
+        '''Measurements of a field IRI in the canonical unit of its category (units is an
+        onto_units.UnitNormalizer): {'dataset': [IRIs], 'value', 'min', 'max': float arrays
+        (NaN for no min or max), 'unit': canonical unit}, without those whose unit cannot be
+        converted or whose value, min or max is not a number'''
+        rows = [row for row in self.measurements(field=field) if _is_number(row[3]) and
+                all(v is None or _is_number(v) for v in row[4:6])]
+        category = rows[0][2] if rows else self.index[field].units
+        converted, values, mins, maxs = units.normalize(category, [row[6] for row in rows],
+                                                        [row[3] for row in rows], [row[4] for row in rows],
+                                                        [row[5] for row in rows])
+        return {'dataset': [row[0] for row, ok in zip(rows, converted) if ok],
+                'value': values[converted], 'min': mins[converted], 'max': maxs[converted],
+                'unit': units.canonical(category)}
+
+    def write_ntriples(self, f, onto_iri, dataset=None, base=None):
+        '''Write the measurements (of a dataset) as N-Triples individuals of the ontology onto_iri;
+        the measurement individuals are blank nodes
+
+        Dataset ids that are not absolute IRIs are resolved against base; without
+        a base they raise ValueError.
+        '''
+        ns = onto_iri + '#'
+        rdf_type = '<%stype>' % onto_rdf.rdf
+        written = set()
+        iris = {}
+        for i, (dataset_id, field, category, value, min_, max_, unit) in enumerate(self.measurements(dataset)):
+            dataset_iri = iris.get(dataset_id)
+            if dataset_iri is None:
+                dataset_iri = iris[dataset_id] = _dataset_iri(dataset_id, base)
+            if dataset_iri not in written:
+                f.write('<%s> %s <%sdataset> .\n' % (dataset_iri, rdf_type, ns))
+                written.add(dataset_iri)
+            m = '_:m%i' % i
+            f.write('<%s> <%s> %s .\n%s %s <%s%s> .\n' % (dataset_iri, field, m, m, rdf_type, ns, category))
+            for name, v in (('hasValue', value), ('hasMinValue', min_), ('hasMaxValue', max_), ('hasUnit', unit)):
+                if v is not None:
+                    f.write('%s <%s%s> %s .\n' % (m, ns, name, _literal(v)))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _out_of_order(min_, max_):
+    try:
+        return min_ is not None and max_ is not None and min_ > max_
+    except TypeError: # a number and a string
+        return True
+
+
+def _literal(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return onto_rdf._nt_literal(str(value))
+    if isinstance(value, int):
+        return '"%i"^^<%sinteger>' % (value, onto_rdf.xsd)
+    if math.isnan(value):
+        text = 'NaN'
+    elif math.isinf(value):
+        text = 'INF' if value > 0 else '-INF'
+    else:
+        text = repr(value)
+    return '"%s"^^<%sdouble>' % (text, onto_rdf.xsd)
+
+
+# characters that may appear in an IRI of N-Triples; others are percent-encoded
+_iri_safe = "!#$%&'()*+,-./:;=?@[]_~"
+
+
+def _dataset_iri(dataset, base):
+    # absolute IRI of a dataset id
+    if not urllib.parse.urlsplit(dataset).scheme:
+        if base is None:
+            raise ValueError('dataset %r is not an absolute IRI and no base IRI was given' % dataset)
+        dataset = urllib.parse.urljoin(base, dataset)
+    return urllib.parse.quote(dataset, safe=_iri_safe)
+
+
+def _number(text):
+    # CSV cell: int, float, None (empty) or the text
+    if text == '':
+        return None
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def read_csv(path, batch_size=100000):
+    '''Yield columnar batches of the rows of a CSV file with a header of column names'''
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        while True:
+            rows = [row for _, row in zip(range(batch_size), reader)] # range first: zip must not read a row it drops
+            if not rows:
+                return
+            batch = {name: [row[name] for row in rows] for name in reader.fieldnames}
+            for name in ('value', 'min', 'max'):
+                if name in batch:
+                    batch[name] = [_number(text) for text in batch[name]]
+            for name in ('unit', 'category'):
+                if name in batch:
+                    batch[name] = [text or None for text in batch[name]]
+            yield batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add measurements from CSV files to a measurement store')
+    parser.add_argument('index', help='lookup index written by the ontology script (NeXusOntology.index)')
+    parser.add_argument('store', help='SQLite measurement store (created if needed)')
+    parser.add_argument('files', nargs='+', help='CSV files with columns %s (and optionally category)' % ', '.join(columns))
+    parser.add_argument('--batch-size', type=int, default=100000, help='rows per transaction')
+    parser.add_argument('--no-check-units', action='store_true', help='store units not compatible with the unit category')
+    args = parser.parse_args(argv)
+
+    with MeasurementStore(args.store, args.index, False if args.no_check_units else None) as store:
+        for path in args.files:
+            store.ingest(read_csv(path, args.batch_size))
+        for dataset, field, reason in store.rejected:
+            print('=== Rejected %s %s: %s' % (dataset, field, reason), file=sys.stderr)
+        print('=== Added %(added)i of %(rows)i measurements in %(batches)i batches, %(rejected)i rejected' % store.counts,
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# The NeXus ontology split into one module per class, with an import catalog
+#
+# Written to a directory next to the ontology:
+#
+#   core.<format>          the framework (NeXus, NXobject, NeXusField, citesGroup, unit
+#                          categories, data and annotation properties)
+#   <class>.<format>       a base class or application definition, with the field
+#                          properties of a base class and the restrictions of the class
+#   <onto_name>.<format>   the root ontology, importing core and every module
+#   catalog-v001.xml       OASIS XML catalog of the module IRIs and files (as used by Protege)
+#
+# Each module is an owl:Ontology <onto_iri>/<class> (core: <onto_iri>/core)
+# that imports core and the modules of the classes it extends or cites, so the
+# imports closure of a module holds everything its class refers to. The
+# modules hold the same resources as the ontology written by onto_rdf; the
+# root ontology has its IRI and metadata.
+#
+# ModuleLoader reads the catalog and loads a module and the modules it imports
+# on demand, each once, as onto_patch triple sets.
+
+import os
+import xml.etree.ElementTree as ET
+
+from . import onto_patch
+from . import onto_rdf
+
+
+catalog_file = 'catalog-v001.xml'
+_catalog_ns = 'urn:oasis:names:tc:entity:xmlns:1.0'
+
+
+def module_iri(settings, name):
+    '''IRI of the module of class name (or 'core')'''
+    return settings['onto_iri'] + '/' + name
+
+
+def _dependencies(name, record, modules):
+    # modules imported by the module of a class: the classes it extends or cites
+    names = set(record['groups_cited'])
+    names.add(record['extends'])
+    return sorted(n for n in names if n in modules and n != name)
+
+
+def split(classDict, applicationDict, typesDict, settings):
+    '''Return {module name: [resources]} of the ontology (see onto_rdf.describe), and the module dependencies'''
+    IRI, owl = onto_rdf.IRI, onto_rdf.owl
+    base_iri = settings['base_iri']
+    NeXusClass = settings['onto_iri'] + '#NeXusClass'
+    classes = [c for c in classDict if c != 'NXobject'] + list(applicationDict) # NXobject is in core
+    modules = {'core': []}
+    modules.update((name, []) for name in sorted(classes))
+    for subject, type_, props in onto_rdf.describe(classDict, applicationDict, typesDict, settings):
+        if type_ == owl + 'Ontology':
+            continue
+        name = subject[len(base_iri):] if subject.startswith(base_iri) else None
+        if name not in modules:
+            name = next((o[len(base_iri):] for p, o in props if p == NeXusClass), 'core') # field properties
+        modules[name].append((subject, type_, props))
+    records = dict(classDict, **applicationDict)
+    dependencies = {name: _dependencies(name, records[name], modules) for name in modules if name != 'core'}
+    dependencies['core'] = []
+    return modules, dependencies
+
+
+def _header(settings, name, imports):
+    IRI, owl = onto_rdf.IRI, onto_rdf.owl
+    return (IRI(module_iri(settings, name)), IRI(owl + 'Ontology'),
+            [(IRI(owl + 'imports'), IRI(module_iri(settings, i))) for i in imports] +
+            [(IRI(owl + 'versionInfo'), settings['version'])])
+
+
+def write_modules(path, fmt, classDict, applicationDict, typesDict, settings, onto_name='NeXusOntology'):
+    '''Write the modules, the root ontology and the catalog to directory path; returns the files written'''
+    IRI, owl = onto_rdf.IRI, onto_rdf.owl
+    os.makedirs(path, exist_ok=True)
+    modules, dependencies = split(classDict, applicationDict, typesDict, settings)
+    prefixes = onto_rdf.prefixes(settings)
+    files, catalog = [], []
+    def write(file_name, iri, resources):
+        with open(os.path.join(path, file_name), 'w', encoding='utf-8', newline='\n') as f:
+            onto_rdf.writers[fmt](resources, f, prefixes)
+        files.append(os.path.join(path, file_name))
+        catalog.append((iri, file_name))
+    for name, resources in modules.items():
+        imports = dependencies[name] if name == 'core' else ['core'] + dependencies[name]
+        write(name + '.' + fmt, module_iri(settings, name), [_header(settings, name, imports)] + resources)
+    # root: the metadata of the ontology, importing every module
+    root = next(onto_rdf.describe(classDict, applicationDict, typesDict, settings))
+    root = (root[0], root[1], [(IRI(owl + 'imports'), IRI(module_iri(settings, name))) for name in modules] + root[2])
+    write(onto_name + '.' + fmt, settings['onto_iri'], [root])
+
+    catalog_root = ET.Element('catalog', {'prefer': 'public', 'xmlns': _catalog_ns})
+    for iri, file_name in sorted(catalog):
+        ET.SubElement(catalog_root, 'uri', {'name': iri, 'uri': file_name}).tail = '\n    '
+    if len(catalog_root):
+        # one entry per line, as ET.indent (Python 3.9+) would
+        catalog_root.text, catalog_root[-1].tail = '\n    ', '\n'
+    ET.ElementTree(catalog_root).write(os.path.join(path, catalog_file), encoding='UTF-8', xml_declaration=True)
+    files.append(os.path.join(path, catalog_file))
+    return files
+
+
+class ModuleLoader:
+    '''Loads modules written by write_modules on demand
+
+    loader = ModuleLoader(path)
+    triples = loader.load('NXsample')   # NXsample, core and every module they import
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}    # module IRI: file
+        for uri in ET.parse(os.path.join(path, catalog_file)).getroot():
+            self.files[uri.get('name')] = os.path.join(path, uri.get('uri'))
+        self.names = {iri.rsplit('/', 1)[-1]: iri for iri in self.files}
+        self.modules = {}  # module IRI: triples, of the modules loaded so far
+
+    def iri(self, name):
+        '''Module IRI of a class name, 'core', or a module IRI'''
+        return name if name in self.files else self.names[name]
+
+    def module(self, name):
+        '''Triples of one module, loaded on first use'''
+        iri = self.iri(name)
+        if iri not in self.modules:
+            self.modules[iri] = onto_patch.read(self.files[iri])
+        return self.modules[iri]
+
+    def imports(self, name):
+        '''IRIs of the modules imported by a module'''
+        iri = self.iri(name)
+        return sorted(o[1:-1] for s, p, o in self.module(iri) if s == iri and p == onto_rdf.owl + 'imports')
+
+    def closure(self, name):
+        '''IRIs of the module and the modules it imports, directly or indirectly'''
+        todo, seen = [self.iri(name)], []
+        while todo:
+            iri = todo.pop()
+            if iri not in seen:
+                seen.append(iri)
+                todo += self.imports(iri)
+        return seen
+
+    def load(self, *names):
+        '''Triples of the modules of names and of the modules they import'''
+        triples = set()
+        for name in names:
+            for iri in self.closure(name):
+                triples |= self.module(iri)
+        return triples
@@ -0,0 +1,294 @@
+# Changes between a previously published ontology and the new build
+#
+# The previous ontology (N-Triples, or RDF/XML as written by onto_rdf) and the
+# resources of the new build (onto_rdf.describe) are reduced to sets of
+# triples in which each owl:someValuesFrom restriction is a single object
+# Some(onProperty, someValuesFrom) instead of a blank node, so that unchanged
+# restrictions compare equal although blank node labels differ between files.
+# The difference of the two sets is the changeset:
+#
+#   <path>.changes.ru          SPARQL 1.1 Update (DELETE DATA / DELETE WHERE / INSERT DATA)
+#   <path>.removed.nt, .added.nt   N-Triples of the removed and added triples
+#
+# Applying the SPARQL Update to a store holding the previous ontology gives
+# the new ontology, which is what onto_rdf writes in full. Restrictions are
+# blank nodes, which a store renames when loading, so removed restrictions are
+# matched by their content (DELETE WHERE); in the N-Triples files their blank
+# nodes have labels derived from the content, the same in every build.
+#
+# Objects in the triple sets are N-Triples terms ('<iri>', '"literal"') or
+# Some; subjects and predicates are IRIs. Literals typed xsd:string, as
+# written to RDF/XML by onto_rdf, compare equal to plain ones; a triple set
+# read from a file remembers them (Triples.stored), and the SPARQL Update
+# deletes and inserts literals in the form the previous file stored them in,
+# which is what a store loaded from it holds.
+
+import collections
+import hashlib
+import re
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+from . import onto_rdf
+
+
+rdf, rdfs, owl, xsd = onto_rdf.rdf, onto_rdf.rdfs, onto_rdf.owl, onto_rdf.xsd
+Some = onto_rdf.Some
+
+_type = rdf + 'type'
+_kinds = {'<%sClass>' % owl: 'classes', '<%sObjectProperty>' % owl: 'properties',
+          '<%sDatatypeProperty>' % owl: 'properties', '<%sAnnotationProperty>' % owl: 'properties',
+          '<%sOntology>' % owl: 'ontology'}
+_kind_order = ('ontology', 'classes', 'properties', 'other') # of a resource with several types
+_string = '^^<%sstring>' % xsd
+
+formats = ('sparql', 'nt') # changeset files written by write_changeset
+
+
+class Triples(set):
+    '''Triple set of an ontology file; stored maps the triples whose literal was
+    typed xsd:string in the file to that literal'''
+
+    def __init__(self, triples=(), stored=None):
+        set.__init__(self, triples)
+        self.stored = stored or {}
+
+
+def triples(resources):
+    '''Set of (subject, predicate, object) of resources from onto_rdf.describe'''
+    result = set()
+    for subject, type_, props in resources:
+        result.add((subject, _type, '<%s>' % type_))
+        for p, o in props:
+            if isinstance(o, Some):
+                result.add((subject, p, Some(str(o.onProperty), str(o.someValuesFrom))))
+            elif isinstance(o, onto_rdf.IRI):
+                result.add((subject, p, '<%s>' % o))
+            else:
+                result.add((subject, p, onto_rdf._nt_literal(o)))
+    return result
+
+
+# reading
+
+_escape = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_escapes = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+_term = r'(<[^>]*>|_:[^\s]+|"(?:[^"\\]|\\.)*"(?:\^\^<[^>]*>|@[A-Za-z0-9-]+)?)'
+_line = re.compile(r'^\s*%s\s+%s\s+%s\s*\.\s*$' % (_term, _term, _term))
+
+
+def _unescape(value):
+    return _escape.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)) if m.group(3) is None else _escapes[m.group(3)], value)
+
+
+def _literal(value, datatype=None, lang=None):
+    # canonical N-Triples term of a literal (xsd:string is the plain literal)
+    term = onto_rdf._nt_literal(value)
+    if lang:
+        return term + '@' + lang.lower()
+    if datatype and datatype != xsd + 'string':
+        return term + '^^<%s>' % datatype
+    return term
+
+
+def _nt_term(term):
+    if term.startswith('"'):
+        end = term.rindex('"')
+        suffix = term[end + 1:]
+        return _literal(_unescape(term[1:end]), suffix[3:-1] if suffix.startswith('^^') else None,
+                        suffix[1:] if suffix.startswith('@') else None)
+    return term
+
+
+def _fold_restrictions(plain, bnodes):
+    # replace (s, p, _:b) by (s, p, Some) for blank nodes that are owl:someValuesFrom restrictions
+    result = set()
+    for s, p, o in plain:
+        b = bnodes.get(o)
+        if b is not None and set(b) == {_type, owl + 'onProperty', owl + 'someValuesFrom'} and \
+                b[_type] == '<%sRestriction>' % owl:
+            result.add((s, p, Some(b[owl + 'onProperty'][1:-1], b[owl + 'someValuesFrom'][1:-1])))
+        else:
+            result.add((s, p, o))
+    for b, props in bnodes.items(): # other blank nodes are kept as they are
+        if not (set(props) == {_type, owl + 'onProperty', owl + 'someValuesFrom'} and props[_type] == '<%sRestriction>' % owl):
+            result.update((b, p, o) for p, o in props.items())
+    return result
+
+
+def read_ntriples(f):
+    '''Triple set (Triples) of an N-Triples file object'''
+    plain, bnodes, stored = [], collections.defaultdict(dict), {}
+    for n, line in enumerate(f, 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        m = _line.match(line)
+        if m is None:
+            raise ValueError('line %i is not an N-Triples triple: %s' % (n, line.strip()[:80]))
+        s, p, o = m.groups()
+        if s.startswith('_:'):
+            bnodes[s][p[1:-1]] = _nt_term(o)
+        else:
+            plain.append((s[1:-1], p[1:-1], _nt_term(o)))
+            if o.endswith(_string):
+                stored[plain[-1]] = plain[-1][2] + _string
+    return Triples(_fold_restrictions(plain, bnodes), stored)
+
+
+def _iri(tag):
+    return ''.join(tag[1:].split('}', 1)) # '{namespace}local' -> namespace + local
+
+
+def read_rdfxml(f):
+    '''Triple set (Triples) of an RDF/XML file object in the layout written by onto_rdf or
+    owlready2 (a node element per subject, IRIs relative to xml:base)'''
+    about, resource, datatype = '{%s}about' % rdf, '{%s}resource' % rdf, '{%s}datatype' % rdf
+    xml = '{http://www.w3.org/XML/1998/namespace}'
+    root = ET.parse(f).getroot()
+    base = root.get(xml + 'base', '')
+    def iri(ref):
+        return urllib.parse.urljoin(base, ref) if base and ':' not in ref else ref
+    result, stored = set(), {}
+    for node in root:
+        subject = node.get(about)
+        if subject is None:
+            raise ValueError('%s element without rdf:about' % _iri(node.tag))
+        subject = iri(subject)
+        if node.tag != '{%s}Description' % rdf:
+            result.add((subject, _type, '<%s>' % _iri(node.tag)))
+        for prop in node:
+            p = _iri(prop.tag)
+            if prop.get(resource) is not None:
+                result.add((subject, p, '<%s>' % iri(prop.get(resource))))
+            elif len(prop):
+                values = {_iri(e.tag): iri(e.get(resource) or '') for e in prop[0]}
+                if prop[0].tag != '{%s}Restriction' % owl or set(values) != {owl + 'onProperty', owl + 'someValuesFrom'}:
+                    raise ValueError('unsupported nested element in %s of %s' % (p, subject))
+                result.add((subject, p, Some(values[owl + 'onProperty'], values[owl + 'someValuesFrom'])))
+            else:
+                triple = (subject, p, _literal(prop.text or '', prop.get(datatype), prop.get(xml + 'lang')))
+                result.add(triple)
+                if prop.get(datatype) == xsd + 'string':
+                    stored[triple] = triple[2] + _string
+    return Triples(result, stored)
+
+
+def read(path):
+    '''Triple set of an ontology file: N-Triples (.nt) or RDF/XML (.owl, .rdf)'''
+    if path.endswith('.nt'):
+        with open(path, encoding='utf-8') as f:
+            return read_ntriples(f)
+    if path.endswith(('.owl', '.rdf')):
+        with open(path, 'rb') as f:
+            return read_rdfxml(f)
+    raise ValueError('%s: only N-Triples (.nt) and RDF/XML (.owl, .rdf) ontologies can be read' % path)
+
+
+# changes
+
+def diff(old, new):
+    '''(removed, added) triples between the triple sets old and new'''
+    return old - new, new - old
+
+
+def summarize(old, new, removed, added):
+    '''Counter of the changes: triples and restrictions added and removed, and
+    classes, properties and the ontology resource added, removed or changed'''
+    def kinds(triples):
+        # the first kind in _kind_order of the types of each subject, whatever the order of the set
+        result = {}
+        for s, p, o in triples:
+            if p == _type:
+                kind = _kinds.get(o, 'other')
+                if s not in result or _kind_order.index(kind) < _kind_order.index(result[s]):
+                    result[s] = kind
+        return result
+    old_kinds, new_kinds = kinds(old), kinds(new)
+    counts = collections.Counter()
+    counts['triples_added'], counts['triples_removed'] = len(added), len(removed)
+    counts['restrictions_added'] = sum(isinstance(o, Some) for s, p, o in added)
+    counts['restrictions_removed'] = sum(isinstance(o, Some) for s, p, o in removed)
+    for s in {s for s, p, o in removed} | {s for s, p, o in added}:
+        if s not in old_kinds:
+            counts[new_kinds.get(s, 'other') + '_added'] += 1
+        elif s not in new_kinds:
+            counts[old_kinds[s] + '_removed'] += 1
+        else:
+            counts[new_kinds[s] + '_changed'] += 1
+    return counts
+
+
+def _sorted(triples):
+    return sorted(triples, key=lambda t: (t[0], t[1], str(t[2])))
+
+
+def _restriction_node(s, p, o):
+    # blank node label of a restriction, the same in every build
+    return '_:r' + hashlib.sha1('\n'.join((s, p) + o).encode()).hexdigest()[:16]
+
+
+def write_ntriples(triples, f):
+    '''Write a triple set as N-Triples, restrictions as blank nodes'''
+    for s, p, o in _sorted(triples):
+        s = s if s.startswith('_:') else '<%s>' % s
+        if isinstance(o, Some):
+            b = _restriction_node(s, p, o)
+            f.write('%s <%s> %s .\n' % (s, p, b))
+            f.write('%s <%stype> <%sRestriction> .\n' % (b, rdf, owl))
+            f.write('%s <%sonProperty> <%s> .\n' % (b, owl, o.onProperty))
+            f.write('%s <%ssomeValuesFrom> <%s> .\n' % (b, owl, o.someValuesFrom))
+        else:
+            f.write('%s <%s> %s .\n' % (s, p, o))
+
+
+def write_sparql(removed, added, f, stored=None):
+    '''Write the SPARQL 1.1 Update that turns a store of the old ontology into the new one
+
+    stored is Triples.stored of the old ontology: removed literals are deleted in the
+    form they were stored in, and if strings were stored typed, added ones are typed too.
+    '''
+    stored = stored or {}
+    typed = bool(stored)
+    operations = []
+    def data(triples):
+        return ''.join('  <%s> <%s> %s .\n' % (s, p, stored.get((s, p, o), o)) for s, p, o in _sorted(triples))
+    plain = [t for t in removed if not isinstance(t[2], Some)]
+    if plain:
+        operations.append('DELETE DATA {\n%s}' % data(plain))
+    for s, p, o in _sorted(t for t in removed if isinstance(t[2], Some)):
+        operations.append('DELETE WHERE {\n  <%s> <%s> ?r .\n  ?r a <%sRestriction> ; <%sonProperty> <%s> ; '
+                          '<%ssomeValuesFrom> <%s> .\n}' % (s, p, owl, owl, o.onProperty, owl, o.someValuesFrom))
+    if added:
+        lines = []
+        for s, p, o in _sorted(added):
+            if isinstance(o, Some):
+                o = '[ a <%sRestriction> ; <%sonProperty> <%s> ; <%ssomeValuesFrom> <%s> ]' % (
+                    owl, owl, o.onProperty, owl, o.someValuesFrom)
+            elif typed and o.startswith('"') and o.endswith('"'): # a plain literal
+                o += _string
+            lines.append('  <%s> <%s> %s .\n' % (s, p, o))
+        operations.append('INSERT DATA {\n%s}' % ''.join(lines))
+    f.write('# %i triples removed, %i added\n' % (len(removed), len(added)))
+    f.write(' ;\n'.join(operations) + '\n' if operations else '')
+
+
+def write_changeset(path, old, new, formats=formats, stats=None):
+    '''Write the changes from the triple set old to new as path + '.changes.ru' ('sparql' in
+    formats) and path + '.removed.nt' / '.added.nt' ('nt'); returns the files written
+
+    stats, if given, is a collections.Counter which the summary of the changes is added to.
+    '''
+    removed, added = diff(old, new)
+    if stats is not None:
+        stats.update(summarize(old, new, removed, added))
+    files = []
+    if 'sparql' in formats:
+        files.append(path + '.changes.ru')
+        with open(files[-1], 'w', encoding='utf-8', newline='\n') as f:
+            write_sparql(removed, added, f, getattr(old, 'stored', None))
+    if 'nt' in formats:
+        for name, triples in (('.removed.nt', removed), ('.added.nt', added)):
+            files.append(path + name)
+            with open(files[-1], 'w', encoding='utf-8', newline='\n') as f:
+                write_ntriples(triples, f)
+    return files
@@ -0,0 +1,350 @@
+# Write the NeXus ontology directly from classDict, applicationDict and typesDict
+#
+# The ontology is described as a stream of resources (subject, type,
+# [(predicate, object)]) which are serialized straight to RDF/XML, Turtle or
+# N-Triples. No owlready2 classes or quadstore are created, so time and memory
+# depend only on the size of the output. Subjects are written in a fixed order
+# (ontology, properties, classes; sorted by IRI within each group) so that
+# unchanged definitions give unchanged files.
+#
+# The triples are the same as those made by the owlready2 version of the
+# script: one OWL class per base class and application definition, one object
+# property per field, and owl:someValuesFrom restrictions for the fields and
+# cited groups (each distinct restriction once, as owlready2 does), and the
+# two test datasets with one measurement each (settings['test_individuals'],
+# on unless set to False).
+
+import collections
+import os
+import re
+
+
+rdf = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+rdfs = 'http://www.w3.org/2000/01/rdf-schema#'
+owl = 'http://www.w3.org/2002/07/owl#'
+xsd = 'http://www.w3.org/2001/XMLSchema#'
+dcterms = 'http://purl.org/dc/terms/'
+
+
+class IRI(str):
+    '''An IRI object (other str objects are xsd:string literals)'''
+
+
+class Literal(str):
+    '''A literal of another datatype: Literal('10', xsd + 'integer')'''
+
+    def __new__(cls, value, datatype):
+        literal = str.__new__(cls, value)
+        literal.datatype = datatype
+        return literal
+
+
+Some = collections.namedtuple('Some', 'onProperty someValuesFrom') # owl:Restriction
+
+_base_iri = 'http://purl.org/nexusformat/definitions/'
+
+# settings of the ontologies written by the command line tools and the library interface
+# (nexus_ontology), without version and created; the script has its own
+default_settings = {
+    'base_iri': _base_iri,
+    'onto_iri': _base_iri + 'NeXusOntology',
+    'comment': 'NeXus ontology built from a local definitions checkout',
+    'creator': 'NeXus International Advisory Committee (NIAC)',
+    'licence': 'https://creativecommons.org/licenses/by/4.0/',
+    'see_also': ['https://www.nexusformat.org/', 'https://github.com/nexusformat', 'https://doi.org/10.5281/zenodo.4806026'],
+    'base_class_web_page_prefix': 'https://manual.nexusformat.org/classes/base_classes/',
+    'application_web_page_prefix': 'https://manual.nexusformat.org/classes/applications/',
+    'class_index_page': 'https://manual.nexusformat.org/classes/index.html'}
+
+# test individuals of the script: (measurement, unit category, value, unit, dataset, class, field name)
+test_individuals = (('sample_temp_1', 'NX_TEMPERATURE', Literal('10', xsd + 'integer'), 'Kelvin', 'dataset1',
+                     'NXsample', 'temperature'),
+                    ('beam_energy_1', 'NX_ENERGY', Literal('12.4', xsd + 'decimal'), 'keV', 'dataset2',
+                     'NXbeam', 'final_energy'))
+
+
+def field_web_page(nxBaseClass, field, settings):
+    '''seeAlso web page of a field of a base class'''
+    if field['defn_name'] != None:
+        #Field is defined by an application definition; give app defn web page (no anchor - might add later)
+        return settings['application_web_page_prefix'] + field['defn_name'] + '.html'
+    #Field is defined by base class file; give base class web page with anchor
+    anchor = '#%s-%s-field' % (nxBaseClass.lower(), field['fieldName'].lower())
+    anchor = anchor.replace('_', '-') # replace symbols for anchors
+    return settings['base_class_web_page_prefix'] + nxBaseClass + '.html' + anchor
+
+
+def describe(classDict, applicationDict, typesDict, settings):
+    '''Yield (subject, type, [(predicate, object)]) for every resource of the ontology
+
+    settings is a dict with keys base_iri, onto_iri, version, created, comment,
+    creator, licence, see_also (list), base_class_web_page_prefix,
+    application_web_page_prefix and class_index_page, and optionally
+    test_individuals (default True).
+    '''
+    base_iri = settings['base_iri']
+    ns = settings['onto_iri'] + '#'
+    NeXus, dataset, unitCategory = IRI(ns + 'NeXus'), IRI(ns + 'dataset'), IRI(ns + 'unitCategory')
+    NeXusField, citesGroup = IRI(ns + 'NeXusField'), IRI(ns + 'citesGroup')
+    NeXusBaseClass, NeXusApplicationDefinition = IRI(ns + 'NeXusBaseClass'), IRI(ns + 'NeXusApplicationDefinition')
+    NXobject = IRI(base_iri + 'NXobject')
+    comment, label, seeAlso = IRI(rdfs + 'comment'), IRI(rdfs + 'label'), IRI(rdfs + 'seeAlso')
+    subClassOf = IRI(rdfs + 'subClassOf')
+    extends, NeXusClass = IRI(ns + 'extends'), IRI(ns + 'NeXusClass')
+
+    def unit_class(units):
+        return IRI(ns + units)
+
+    base_classes = sorted(c for c in classDict if c != 'NXobject') # NXobject can't be subclass of NXobject
+
+    # ontology metadata
+    yield (IRI(settings['onto_iri']), IRI(owl + 'Ontology'),
+           [(comment, settings['comment'])] +
+           [(seeAlso, url) for url in settings['see_also']] +
+           [(IRI(owl + 'versionInfo'), settings['version']),
+            (IRI(dcterms + 'creator'), settings['creator']),
+            (IRI(dcterms + 'licence'), settings['licence']),
+            (IRI(dcterms + 'created'), settings['created'])])
+
+    # object properties
+    yield (NeXusField, IRI(owl + 'ObjectProperty'),
+           [(IRI(rdfs + 'domain'), dataset),
+            (comment, 'NeXus field (ObjectProperty). Unique names are created by prepending the NeXus class name to the NeXus field name')])
+    yield (citesGroup, IRI(owl + 'ObjectProperty'),
+           [(IRI(rdfs + 'domain'), NXobject),
+            (IRI(rdfs + 'range'), NeXusBaseClass),
+            (comment, 'NXobject cites base class relationship')])
+
+    fields = sorted((base_iri + nxField, nxBaseClass, nxField) for nxBaseClass in base_classes
+                    for nxField in classDict[nxBaseClass]['fields'])
+    for iri, nxBaseClass, nxField in fields:
+        field = classDict[nxBaseClass]['fields'][nxField]
+        yield (IRI(iri), IRI(owl + 'ObjectProperty'),
+               [(IRI(rdfs + 'range'), unit_class(field['units'])),
+                (IRI(rdfs + 'subPropertyOf'), NeXusField),
+                (NeXusClass, IRI(base_iri + nxBaseClass)),
+                (comment, field['fieldDoc']),
+                (label, field['label']),
+                (seeAlso, field_web_page(nxBaseClass, field, settings))])
+
+    # data properties of unit categories
+    for name, doc in (('hasValue', 'NeXus field value'),
+                      ('hasMinValue', 'Minimum of NeXus field value'),
+                      ('hasMaxValue', 'Maximum of NeXus field value'),
+                      ('hasUnit', 'NeXus unit (string). Should be consistent with unit category.')):
+        yield (IRI(ns + name), IRI(owl + 'DatatypeProperty'),
+               [(IRI(rdf + 'type'), IRI(owl + 'FunctionalProperty')),
+                (IRI(rdfs + 'domain'), unitCategory)] +
+               ([(IRI(rdfs + 'range'), IRI(xsd + 'string'))] if name == 'hasUnit' else []) +
+               [(comment, doc)])
+
+    for name in ('extends', 'NeXusType', 'unit', 'NeXusClass'):
+        yield (IRI(ns + name), IRI(owl + 'AnnotationProperty'), [])
+
+    # classes
+    yield (NeXus, IRI(owl + 'Class'), [(subClassOf, IRI(owl + 'Thing')), (comment, 'NeXus concept')])
+    yield (dataset, IRI(owl + 'Class'), [(subClassOf, IRI(owl + 'Thing')), (comment, 'Dummy data set')])
+    yield (NXobject, IRI(owl + 'Class'),
+           [(subClassOf, NeXus),
+            (comment, classDict['NXobject']['classDoc'].replace('\t','')), # NeXus documentation string
+            (seeAlso, settings['base_class_web_page_prefix'] + 'NXobject' + '.html')])
+    yield (NeXusBaseClass, IRI(owl + 'Class'),
+           [(subClassOf, NXobject), (comment, 'NeXus Base Class'), (seeAlso, settings['class_index_page'])])
+    yield (NeXusApplicationDefinition, IRI(owl + 'Class'),
+           [(subClassOf, NXobject), (comment, 'NeXus Application Definition'), (seeAlso, settings['class_index_page'])])
+
+    unit_comments = [(comment, 'NeXus unit category. Can be considered instances of a measure. Assign data properties '
+                               'hasValue(any), hasMinValue(any), hasMaxValue(any), hasUnits(str)')]
+    if 'anyUnitsAttr' in typesDict: # general description, not specific unit category
+        unit_comments.append((comment, typesDict['anyUnitsAttr']['doc']))
+    yield (unitCategory, IRI(owl + 'Class'), [(subClassOf, NeXus)] + unit_comments)
+
+    for unit in sorted(typesDict):
+        if not unit in ('anyUnitsAttr', 'primitiveType'):
+            yield (unit_class(unit), IRI(owl + 'Class'), [(subClassOf, unitCategory), (comment, typesDict[unit]['doc'])])
+
+    for nxBaseClass in base_classes:
+        cls = classDict[nxBaseClass]
+        restrictions = sorted(set([Some(IRI(base_iri + nxField), unit_class(cls['fields'][nxField]['units']))
+                                   for nxField in cls['fields']] +
+                                  [Some(citesGroup, IRI(base_iri + cited)) for cited in cls['groups_cited']]))
+        yield (IRI(base_iri + nxBaseClass), IRI(owl + 'Class'),
+               [(subClassOf, NeXusBaseClass)] +
+               [(subClassOf, r) for r in restrictions] +
+               [(comment, cls['classDoc']),
+                (seeAlso, settings['base_class_web_page_prefix'] + nxBaseClass + '.html'),
+                (extends, cls['extends'])])
+
+    for application in sorted(applicationDict):
+        app = applicationDict[application]
+        restrictions = sorted(set(Some(citesGroup, IRI(base_iri + cited)) for cited in app['groups_cited']))
+        yield (IRI(base_iri + application), IRI(owl + 'Class'),
+               [(subClassOf, NeXusApplicationDefinition)] +
+               [(subClassOf, r) for r in restrictions] +
+               [(comment, app['doc']),
+                (seeAlso, settings['application_web_page_prefix'] + application + '.html'),
+                (extends, app['extends'])])
+
+    # test individuals, where their class, field and unit category exist
+    if settings.get('test_individuals', True):
+        NamedIndividual, rdf_type = IRI(owl + 'NamedIndividual'), IRI(rdf + 'type')
+        for measurement, units, value, unit, name, nxBaseClass, fieldName in test_individuals:
+            fields = classDict[nxBaseClass]['fields'] if nxBaseClass in classDict else {}
+            nxField = next((f for f in sorted(fields) if fields[f]['fieldName'] == fieldName), None)
+            if nxField is None or units not in typesDict:
+                continue
+            yield (IRI(ns + measurement), unit_class(units),
+                   [(rdf_type, NamedIndividual), (IRI(ns + 'hasValue'), value), (IRI(ns + 'hasUnit'), unit)])
+            yield (IRI(ns + name), dataset, [(rdf_type, NamedIndividual), (IRI(base_iri + nxField), IRI(ns + measurement))])
+
+
+def prefixes(settings):
+    '''Namespace prefixes used in RDF/XML and Turtle output'''
+    return {'rdf': rdf, 'rdfs': rdfs, 'owl': owl, 'xsd': xsd, 'term': dcterms,
+            '': settings['onto_iri'] + '#', 'defi': settings['base_iri']}
+
+
+def restriction_count(resources):
+    '''Number of owl:someValuesFrom restrictions in resources'''
+    return sum(isinstance(o, Some) for s, t, props in resources for p, o in props)
+
+
+# N-Triples
+
+def _nt_literal(value):
+    term = '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') \
+                         .replace('\r', '\\r').replace('\t', '\\t')
+    return term + '^^<%s>' % value.datatype if isinstance(value, Literal) else term
+
+
+def write_ntriples(resources, f, prefixes=None):
+    bnode = 0
+    for subject, type_, props in resources:
+        s = '<%s>' % subject
+        f.write('%s <%stype> <%s> .\n' % (s, rdf, type_))
+        for p, o in props:
+            if isinstance(o, Some):
+                bnode += 1
+                b = '_:r%i' % bnode
+                f.write('%s <%s> %s .\n' % (s, p, b))
+                f.write('%s <%stype> <%sRestriction> .\n' % (b, rdf, owl))
+                f.write('%s <%sonProperty> <%s> .\n' % (b, owl, o.onProperty))
+                f.write('%s <%ssomeValuesFrom> <%s> .\n' % (b, owl, o.someValuesFrom))
+            elif isinstance(o, IRI):
+                f.write('%s <%s> <%s> .\n' % (s, p, o))
+            else:
+                f.write('%s <%s> %s .\n' % (s, p, _nt_literal(o)))
+
+
+# Turtle
+
+_pn_local = re.compile(r'^[A-Za-z_][A-Za-z0-9_-]*$')
+
+
+def _ttl_name(iri, prefixes):
+    for prefix, namespace in prefixes.items():
+        if iri.startswith(namespace) and _pn_local.match(iri[len(namespace):]):
+            return prefix + ':' + iri[len(namespace):]
+    return '<%s>' % iri
+
+
+def write_turtle(resources, f, prefixes):
+    # longest namespace first, so that a name is never split inside a longer namespace
+    by_length = dict(sorted(prefixes.items(), key=lambda item: -len(item[1])))
+    for prefix, namespace in prefixes.items():
+        f.write('@prefix %s: <%s> .\n' % (prefix, namespace))
+    for subject, type_, props in resources:
+        lines = ['a ' + _ttl_name(type_, by_length)]
+        for p, o in props:
+            if isinstance(o, Some):
+                o = '[ a owl:Restriction ; owl:onProperty %s ; owl:someValuesFrom %s ]' % (
+                    _ttl_name(o.onProperty, by_length), _ttl_name(o.someValuesFrom, by_length))
+            elif isinstance(o, IRI):
+                o = _ttl_name(o, by_length)
+            elif isinstance(o, Literal):
+                o = _nt_literal(str(o)) + '^^' + _ttl_name(o.datatype, by_length)
+            else:
+                o = _nt_literal(o) # same string escapes as N-Triples
+            lines.append('%s %s' % (_ttl_name(p, by_length), o))
+        f.write('\n%s\n    %s .\n' % (_ttl_name(subject, by_length), ' ;\n    '.join(lines)))
+
+
+# RDF/XML
+
+def _xml_text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+
+
+def _xml_attr(value):
+    return _xml_text(value).replace('"', '&quot;')
+
+
+def _qname(iri, prefixes):
+    split = max(iri.rfind('#'), iri.rfind('/')) + 1
+    namespace, local = iri[:split], iri[split:]
+    for prefix, ns in prefixes.items():
+        if ns == namespace:
+            return prefix + ':' + local if prefix else local
+    raise ValueError('No namespace prefix for %s' % iri)
+
+
+def write_rdfxml(resources, f, prefixes):
+    f.write('<?xml version="1.0"?>\n<rdf:RDF')
+    f.write('\n         '.join(' xmlns%s="%s"' % (':' + prefix if prefix else '', ns)
+                               for prefix, ns in prefixes.items()))
+    f.write('>\n')
+    string = ' rdf:datatype="%sstring"' % xsd
+    for subject, type_, props in resources:
+        node = _qname(type_, prefixes)
+        f.write('\n<%s rdf:about="%s"' % (node, _xml_attr(subject)))
+        if not props:
+            f.write('/>\n')
+            continue
+        f.write('>\n')
+        for p, o in props:
+            element = _qname(p, prefixes)
+            if isinstance(o, Some):
+                f.write('  <%s>\n    <owl:Restriction>\n' % element)
+                f.write('      <owl:onProperty rdf:resource="%s"/>\n' % _xml_attr(o.onProperty))
+                f.write('      <owl:someValuesFrom rdf:resource="%s"/>\n' % _xml_attr(o.someValuesFrom))
+                f.write('    </owl:Restriction>\n  </%s>\n' % element)
+            elif isinstance(o, IRI):
+                f.write('  <%s rdf:resource="%s"/>\n' % (element, _xml_attr(o)))
+            else:
+                datatype = ' rdf:datatype="%s"' % o.datatype if isinstance(o, Literal) else string
+                f.write('  <%s%s>%s</%s>\n' % (element, datatype, _xml_text(o), element))
+        f.write('</%s>\n' % node)
+    f.write('\n</rdf:RDF>\n')
+
+
+writers = {'owl': write_rdfxml, 'ttl': write_turtle, 'nt': write_ntriples} # file extension: writer
+
+
+def _counted(resources, stats):
+    # pass resources through, adding them and their restrictions to the counts
+    for resource in resources:
+        stats['resources'] += 1
+        stats['restrictions'] += sum(isinstance(o, Some) for p, o in resource[2])
+        yield resource
+
+
+def write_ontology(path, formats, classDict, applicationDict, typesDict, settings, stats=None):
+    '''Write the ontology to path + '.' + format for each format in formats ('owl', 'ttl', 'nt')
+
+    stats, if given, is a collections.Counter: files_written, bytes_written and
+    the resources and restrictions written (counted once per file) are added to.
+    Returns the list of files written.
+    '''
+    files = []
+    for fmt in formats:
+        file_name = path + '.' + fmt
+        resources = describe(classDict, applicationDict, typesDict, settings)
+        if stats is not None:
+            resources = _counted(resources, stats)
+        with open(file_name, 'w', encoding='utf-8', newline='\n') as f:
+            writers[fmt](resources, f, prefixes(settings))
+        if stats is not None:
+            stats['files_written'] += 1
+            stats['bytes_written'] += os.path.getsize(file_name)
+        files.append(file_name)
+    return files
@@ -0,0 +1,162 @@
+# SQLite store of the NeXus ontology, written next to the ontology
+#
+# Holds the classes, field properties and owl:someValuesFrom restrictions of
+# the ontology in indexed tables, so that consumers can answer queries after
+# opening the file read-only, without parsing the RDF/XML:
+#
+#   meta          key, value (onto_iri, base_iri, version, store_format)
+#   classes       iri, name, kind, parent, comment, see_also, extends
+#   fields        iri, name, class_name, field_name, label, unit_iri, comment, see_also
+#   restrictions  class_iri, property_iri, value_iri
+#
+# kind is base_class, application, unit or framework (the NeXus, dataset,
+# NeXusBaseClass ... classes). The tables are filled from the same resources
+# (onto_rdf.describe) as the ontology files, so they hold the same classes,
+# fields and restrictions.
+
+import os
+import pathlib
+import sqlite3
+
+from . import onto_rdf
+
+
+store_format = 1 # change whenever the tables below change
+
+_schema = '''
+create table meta (key text primary key, value text);
+create table classes (iri text primary key, name text, kind text, parent text, comment text, see_also text, extends text);
+create table fields (iri text primary key, name text, class_name text, field_name text, label text,
+                     unit_iri text, comment text, see_also text);
+create table restrictions (class_iri text, property_iri text, value_iri text);
+create index classes_name on classes (name);
+create index fields_name on fields (name);
+create index fields_label on fields (label);
+create index fields_class on fields (class_name, field_name);
+create index restrictions_class on restrictions (class_iri);
+create index restrictions_value on restrictions (value_iri);
+'''
+
+
+def _tables(resources, settings, join_string='-'):
+    # rows of the tables for the resources of onto_rdf.describe; join_string is that of the field long names
+    base_iri = settings['base_iri']
+    ns = settings['onto_iri'] + '#'
+    rdfs, owl = onto_rdf.rdfs, onto_rdf.owl
+    classes, fields, restrictions = [], [], []
+    for subject, type_, props in resources:
+        values = {}
+        for p, o in props:
+            if isinstance(o, onto_rdf.Some):
+                restrictions.append((subject, o.onProperty, o.someValuesFrom))
+            else:
+                values.setdefault(p, o)
+        if type_ == owl + 'Class':
+            parent = values.get(rdfs + 'subClassOf')
+            kind = {ns + 'NeXusBaseClass': 'base_class', ns + 'NeXusApplicationDefinition': 'application',
+                    ns + 'unitCategory': 'unit'}.get(parent, 'framework')
+            name = subject[len(ns):] if subject.startswith(ns) else subject[len(base_iri):]
+            classes.append((subject, name, kind, parent, values.get(rdfs + 'comment'), values.get(rdfs + 'seeAlso'),
+                            values.get(ns + 'extends')))
+        elif values.get(rdfs + 'subPropertyOf') == ns + 'NeXusField':
+            name = subject[len(base_iri):]
+            class_name = values[ns + 'NeXusClass'][len(base_iri):]
+            fields.append((subject, name, class_name, name[len(class_name) + len(join_string):], values.get(rdfs + 'label'),
+                           values.get(rdfs + 'range'), values.get(rdfs + 'comment'), values.get(rdfs + 'seeAlso')))
+    return classes, fields, restrictions
+
+
+def write_store(path, classDict, applicationDict, typesDict, settings, join_string='-'):
+    '''Write the SQLite store of the ontology to path (replacing it atomically)
+
+    join_string is the string between class and field names in the field long names.
+    '''
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    classes, fields, restrictions = _tables(onto_rdf.describe(classDict, applicationDict, typesDict, settings), settings,
+                                          join_string)
+    db = sqlite3.connect(tmp_path)
+    try:
+        with db:
+            db.executescript(_schema)
+            db.executemany('insert into meta values (?, ?)',
+                           [('store_format', str(store_format)), ('onto_iri', settings['onto_iri']),
+                            ('base_iri', settings['base_iri']), ('version', settings['version'])])
+            db.executemany('insert into classes values (?, ?, ?, ?, ?, ?, ?)', classes)
+            db.executemany('insert into fields values (?, ?, ?, ?, ?, ?, ?, ?)', fields)
+            db.executemany('insert into restrictions values (?, ?, ?)', restrictions)
+        db.execute('vacuum')
+    finally:
+        db.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+class OntologyStore:
+    '''Read-only queries of a store written by write_store
+
+    Rows are returned as sqlite3.Row objects (indexable by column name).
+    '''
+
+    def __init__(self, path, mmap_size=64 * 1024 * 1024):
+        self.path = path
+        # a file: URI, with ?, # and % in the path escaped
+        self.db = sqlite3.connect(pathlib.Path(os.path.abspath(path)).as_uri() + '?mode=ro&immutable=1', uri=True,
+                                  check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('pragma mmap_size = %i' % mmap_size)
+        self.meta = dict(self.db.execute('select key, value from meta'))
+        if self.meta.get('store_format') != str(store_format):
+            raise ValueError('%s is not a NeXus ontology store (format %i)' % (path, store_format))
+        self.version = self.meta['version']
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def classes(self, kind=None):
+        '''All classes, or the classes of a kind (base_class, application, unit, framework), sorted by IRI'''
+        if kind is None:
+            return self.db.execute('select * from classes order by iri').fetchall()
+        return self.db.execute('select * from classes where kind = ? order by iri', (kind,)).fetchall()
+
+    def get_class(self, name):
+        '''Class with this name or IRI, or None'''
+        return self.db.execute('select * from classes where name = ? or iri = ?', (name, name)).fetchone()
+
+    def fields(self, class_name):
+        '''Fields of a base class, sorted by IRI'''
+        return self.db.execute('select * from fields where class_name = ? order by iri', (class_name,)).fetchall()
+
+    def field(self, name):
+        '''Field with this long name, label or IRI, or None'''
+        return self.db.execute('select * from fields where name = ? or label = ? or iri = ?', (name, name, name)).fetchone()
+
+    def restrictions(self, class_name=None, value=None):
+        '''(class_iri, property_iri, value_iri) restrictions of a class and/or with a value (class name or IRI)'''
+        query, args = 'select * from restrictions', []
+        conditions = []
+        for column, name in (('class_iri', class_name), ('value_iri', value)):
+            if name is not None:
+                conditions.append('%s = ?' % column)
+                args.append(self._iri(name))
+        if conditions:
+            query += ' where ' + ' and '.join(conditions)
+        return self.db.execute(query + ' order by class_iri, property_iri, value_iri', args).fetchall()
+
+    def _iri(self, name):
+        if ':' in name:
+            return name
+        row = self.db.execute('select iri from classes where name = ?', (name,)).fetchone()
+        return row['iri'] if row else name
+
+
+def load(path):
+    '''Open the store in path read-only'''
+    return OntologyStore(path)
@@ -0,0 +1,270 @@
+# Unit normalization per NeXus unit category
+#
+# The values of one unit category come in many units: the final_energy of
+# NXbeam (NX_ENERGY) is given in keV, eV or J. To compare them across datasets
+# they are converted to the canonical SI unit of the category (canonical_units),
+# value * scale + offset; only degC and degF have an offset. Unit strings are
+# parsed into numbers, SI prefixes, symbols and powers (keV, mm^-1, kg/m^3,
+# 1/s, cm-2 s-1, counts), and a unit whose dimension is not that of the
+# category (m for NX_ENERGY) or that cannot be parsed is rejected. Angles are
+# a dimension of their own here (sr = rad^2), so deg is not dimensionless.
+#
+# The (category, unit) -> (scale, offset) table is filled on first use, so
+# each distinct unit string of a category is parsed once, and a batch is
+# converted with one NumPy gather and multiply-add per column (hasValue,
+# hasMinValue, hasMaxValue); rows with a rejected unit are NaN.
+#
+# NX_ANY and NX_TRANSFORMATION (length, angle or unitless) have no canonical
+# unit and are not normalized.
+#
+# Besides the symbols, the names found in nxdl units attributes and in data
+# are understood (metre, meter, Celsius, kelvin, electronvolt, Ry, ...). u is
+# the unified atomic mass unit (Da), as in SI; as a prefix it is micro (um).
+# Not understood, and so rejected: logarithmic units (dB), imperial and US
+# units (inch, ft, psi), prefixed unit names (millimetre: write mm), and
+# counting units other than counts (photons, events).
+
+import math
+import re
+
+import numpy
+
+
+class UnitError(ValueError):
+    '''A unit that cannot be parsed or is not compatible with a unit category'''
+
+
+# canonical unit of each unit category of nxdlTypes.xsd that has one dimension
+canonical_units = {
+    'NX_ANGLE': 'rad',
+    'NX_AREA': 'm^2',
+    'NX_CHARGE': 'C',
+    'NX_COUNT': '',
+    'NX_CROSS_SECTION': 'm^2',
+    'NX_CURRENT': 'A',
+    'NX_DIMENSIONLESS': '',
+    'NX_EMITTANCE': 'm rad',
+    'NX_ENERGY': 'J',
+    'NX_FLUX': 's^-1 m^-2',
+    'NX_FREQUENCY': 'Hz',
+    'NX_LENGTH': 'm',
+    'NX_MASS': 'kg',
+    'NX_MASS_DENSITY': 'kg m^-3',
+    'NX_MOLECULAR_WEIGHT': 'kg mol^-1',
+    'NX_PERIOD': 's',
+    'NX_PER_AREA': 'm^-2',
+    'NX_PER_LENGTH': 'm^-1',
+    'NX_POWER': 'W',
+    'NX_PRESSURE': 'Pa',
+    'NX_PULSES': '',
+    'NX_SCATTERING_LENGTH_DENSITY': 'm^-2',
+    'NX_SOLID_ANGLE': 'sr',
+    'NX_TEMPERATURE': 'K',
+    'NX_TIME': 's',
+    'NX_TIME_OF_FLIGHT': 's',
+    'NX_UNITLESS': '',
+    'NX_VOLTAGE': 'V',
+    'NX_VOLUME': 'm^3',
+    'NX_WAVELENGTH': 'm',
+    'NX_WAVENUMBER': 'm^-1',
+}
+
+# unit categories of nxdlTypes.xsd that are not normalized
+unnormalized = ('NX_ANY', 'NX_TRANSFORMATION')
+
+_dimensions = ('m', 'kg', 's', 'A', 'K', 'mol', 'cd', 'rad')
+
+
+def _dim(**powers):
+    return tuple(powers.get(d, 0) for d in _dimensions)
+
+
+_none = _dim()
+_eV = 1.602176634e-19
+
+# symbol: (scale to SI, dimension, takes SI prefixes)
+_units = {
+    'm': (1, _dim(m=1), True),
+    'g': (1e-3, _dim(kg=1), True),
+    's': (1, _dim(s=1), True),
+    'A': (1, _dim(A=1), True),
+    'K': (1, _dim(K=1), True),
+    'mol': (1, _dim(mol=1), True),
+    'cd': (1, _dim(cd=1), True),
+    'rad': (1, _dim(rad=1), True),
+    'sr': (1, _dim(rad=2), True),
+    'Hz': (1, _dim(s=-1), True),
+    'N': (1, _dim(kg=1, m=1, s=-2), True),
+    'Pa': (1, _dim(kg=1, m=-1, s=-2), True),
+    'J': (1, _dim(kg=1, m=2, s=-2), True),
+    'W': (1, _dim(kg=1, m=2, s=-3), True),
+    'C': (1, _dim(A=1, s=1), True),
+    'V': (1, _dim(kg=1, m=2, s=-3, A=-1), True),
+    'F': (1, _dim(kg=-1, m=-2, s=4, A=2), True),
+    'Ohm': (1, _dim(kg=1, m=2, s=-3, A=-2), True),
+    'S': (1, _dim(kg=-1, m=-2, s=3, A=2), True),
+    'Wb': (1, _dim(kg=1, m=2, s=-2, A=-1), True),
+    'T': (1, _dim(kg=1, s=-2, A=-1), True),
+    'H': (1, _dim(kg=1, m=2, s=-2, A=-2), True),
+    'eV': (_eV, _dim(kg=1, m=2, s=-2), True),
+    'b': (1e-28, _dim(m=2), True),
+    'barn': (1e-28, _dim(m=2), True),
+    'L': (1e-3, _dim(m=3), True),
+    'bar': (1e5, _dim(kg=1, m=-1, s=-2), True),
+    'Torr': (101325 / 760, _dim(kg=1, m=-1, s=-2), True),
+    'atm': (101325, _dim(kg=1, m=-1, s=-2), False),
+    'min': (60, _dim(s=1), False),
+    'h': (3600, _dim(s=1), False),
+    'd': (86400, _dim(s=1), False),
+    'Angstrom': (1e-10, _dim(m=1), False),
+    'micron': (1e-6, _dim(m=1), False),
+    'deg': (math.pi / 180, _dim(rad=1), False),
+    'arcmin': (math.pi / 10800, _dim(rad=1), False),
+    'arcsec': (math.pi / 648000, _dim(rad=1), False),
+    'Da': (1.66053906660e-27, _dim(kg=1), True),
+    'Ry': (13.605693122994 * _eV, _dim(kg=1, m=2, s=-2), True),
+    'Ha': (27.211386245988 * _eV, _dim(kg=1, m=2, s=-2), False),
+    'G': (1e-4, _dim(kg=1, s=-2, A=-1), True),
+    'counts': (1, _none, False),
+    '%': (0.01, _none, False),
+}
+_aliases = {'ohm': 'Ohm', 'Ω': 'Ohm', 'l': 'L', 'angstrom': 'Angstrom', 'Ang': 'Angstrom', 'Å': 'Angstrom',
+            'degree': 'deg', 'degrees': 'deg', '°': 'deg', 'amu': 'Da', 'u': 'Da', 'count': 'counts', 'cts': 'counts',
+            'pulses': 'counts', 'second': 's', 'seconds': 's', 'sec': 's', 'hour': 'h', 'hours': 'h', 'day': 'd',
+            'days': 'd', 'minute': 'min', 'minutes': 'min',
+            'metre': 'm', 'metres': 'm', 'meter': 'm', 'meters': 'm', 'gram': 'g', 'grams': 'g', 'kelvin': 'K',
+            'Kelvin': 'K', 'ampere': 'A', 'mole': 'mol', 'radian': 'rad', 'radians': 'rad', 'steradian': 'sr',
+            'hertz': 'Hz', 'newton': 'N', 'pascal': 'Pa', 'joule': 'J', 'watt': 'W', 'coulomb': 'C', 'volt': 'V',
+            'tesla': 'T', 'gauss': 'G', 'electronvolt': 'eV', 'litre': 'L', 'liter': 'L', 'Rydberg': 'Ry',
+            'rydberg': 'Ry', 'hartree': 'Ha', 'Hartree': 'Ha', 'Eh': 'Ha', 'dalton': 'Da'}
+_units.update((alias, _units[name]) for alias, name in _aliases.items())
+
+# units with an offset: (scale, offset) to K; only valid on their own
+_offset_units = {'degC': (1, 273.15), 'celsius': (1, 273.15), 'Celsius': (1, 273.15), '°C': (1, 273.15),
+                 'deg C': (1, 273.15), 'degree_Celsius': (1, 273.15), 'degrees Celsius': (1, 273.15),
+                 'degF': (5 / 9, 459.67 * 5 / 9), 'fahrenheit': (5 / 9, 459.67 * 5 / 9), 'Fahrenheit': (5 / 9, 459.67 * 5 / 9),
+                 '°F': (5 / 9, 459.67 * 5 / 9), 'deg F': (5 / 9, 459.67 * 5 / 9)}
+
+_prefixes = {'Y': 1e24, 'Z': 1e21, 'E': 1e18, 'P': 1e15, 'T': 1e12, 'G': 1e9, 'M': 1e6, 'k': 1e3, 'h': 1e2,
+             'da': 1e1, 'd': 1e-1, 'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'µ': 1e-6, 'μ': 1e-6, 'n': 1e-9, 'p': 1e-12,
+             'f': 1e-15, 'a': 1e-18, 'z': 1e-21, 'y': 1e-24}
+
+_superscripts = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻', '0123456789-')
+_factor = re.compile(r'(\D+?)(?:\^|\*\*)?([+-]?\d+)?$')
+
+
+def _symbol(name):
+    # (scale, dimension) of a symbol with an optional SI prefix
+    if name in _units:
+        return _units[name][:2]
+    for prefix, scale in _prefixes.items():
+        unit = _units.get(name[len(prefix):]) if name.startswith(prefix) else None
+        if unit is not None and unit[2]:
+            return scale * unit[0], unit[1]
+    raise UnitError('unknown unit %r' % name)
+
+
+def parse(unit):
+    '''(scale, offset, dimension) of a unit string: SI value = value * scale + offset'''
+    text = (unit or '').strip()
+    if text in _offset_units:
+        return _offset_units[text] + (_dim(K=1),)
+    scale, dimension = 1.0, [0] * len(_dimensions)
+    for i, part in enumerate(text.translate(_superscripts).replace('**', '^').split('/')):
+        if i and not part.strip():
+            raise UnitError('%r: nothing after /' % unit)
+        sign = -1 if i else 1 # a/b/c is a/(b c)
+        for token in part.replace('*', ' ').replace('·', ' ').split():
+            try:
+                scale *= float(token) ** sign
+                continue
+            except ValueError:
+                pass
+            match = _factor.match(token)
+            if match is None:
+                raise UnitError('%r: cannot parse %r' % (unit, token))
+            if match.group(1) in _offset_units:
+                raise UnitError('%r: %s only as a unit of its own' % (unit, match.group(1)))
+            s, d = _symbol(match.group(1))
+            power = sign * int(match.group(2) or 1)
+            scale *= s ** power
+            dimension = [a + b * power for a, b in zip(dimension, d)]
+    return scale, 0.0, tuple(dimension)
+
+
+class UnitNormalizer:
+    '''Converts values to the canonical unit of their unit category
+
+    typesDict (of nxdl_parse) limits the categories to those of a NeXus version.
+    '''
+
+    def __init__(self, typesDict=None):
+        self.categories = {name: unit for name, unit in canonical_units.items() if typesDict is None or name in typesDict}
+        self._dimensions = {name: parse(unit)[2] for name, unit in self.categories.items()}
+        self.table = {}  # (category, unit): (scale, offset, reason); reason is None for compatible units
+
+    def _lookup(self, category, unit):
+        key = (category, unit)
+        entry = self.table.get(key)
+        if entry is None:
+            if category not in self.categories:
+                reason = ('%s has no canonical unit' if category in unnormalized else 'unknown unit category %s') % category
+                entry = (math.nan, math.nan, reason)
+            else:
+                try:
+                    scale, offset, dimension = parse(unit)
+                except UnitError as e:
+                    entry = (math.nan, math.nan, str(e))
+                else:
+                    if dimension == self._dimensions[category]:
+                        entry = (scale, offset, None)
+                    else:
+                        entry = (math.nan, math.nan, 'unit %r is not compatible with %s' % (unit, category))
+            self.table[key] = entry
+        return entry
+
+    def canonical(self, category):
+        '''Canonical unit of a unit category'''
+        if category not in self.categories:
+            raise UnitError(self._lookup(category, None)[2])
+        return self.categories[category]
+
+    def factor(self, category, unit):
+        '''(scale, offset) converting values of category in unit to the canonical unit; raises UnitError'''
+        scale, offset, reason = self._lookup(category, unit)
+        if reason is not None:
+            raise UnitError(reason)
+        return scale, offset
+
+    def check(self, category, unit):
+        '''Why unit cannot be converted for category, or None if it can'''
+        return self._lookup(category, unit)[2]
+
+    def convert(self, category, unit, values):
+        '''values (array-like) of category in unit, as a float array in the canonical unit; raises UnitError'''
+        scale, offset = self.factor(category, unit)
+        values = numpy.asarray(values, dtype=float) * scale
+        return values + offset if offset else values
+
+    def normalize(self, categories, units, *columns):
+        '''Convert columns of rows (value, min, max, ...) to the canonical unit of their category
+
+        categories is a column or one category for all rows, units a column; None values
+        are NaN. Returns a boolean array of the rows converted and the converted columns
+        (float arrays, NaN for rows whose unit was rejected; see check for the reasons).
+        '''
+        n = len(units)
+        units = units.tolist() if hasattr(units, 'tolist') else units # NumPy strings hash slowly
+        if hasattr(categories, 'tolist'):
+            categories = categories.tolist()
+        if isinstance(categories, str):
+            keys = {(categories, unit): i for i, unit in enumerate(dict.fromkeys(units))}
+            codes = numpy.fromiter((keys[categories, unit] for unit in units), dtype=numpy.intp, count=n)
+        else:
+            keys = {}
+            codes = numpy.fromiter((keys.setdefault(key, len(keys)) for key in zip(categories, units)),
+                                   dtype=numpy.intp, count=n)
+        factors = numpy.array([self._lookup(*key)[:2] for key in keys], dtype=float).reshape(-1, 2)
+        scales, offsets = factors[codes, 0], factors[codes, 1]
+        converted = ~numpy.isnan(scales)
+        return (converted,) + tuple(numpy.asarray(column, dtype=float) * scales + offsets for column in columns)
@@ -0,0 +1,321 @@
+# Watch a local definitions checkout and serve the ontology built from it over HTTP
+#
+# The nxdl files and nxdlTypes.xsd of the working tree are polled (size and
+# modification time, every interval seconds); files that were added or
+# changed are read and parsed again, through the parse cache if one is
+# given, so that undoing an edit costs nothing, and every other file keeps its
+# parsed record. The records are then merged into a new Build, which replaces
+# the current one as a whole, so requests always see one consistent version.
+# The ontology files and the lookup index of a build are only made when first
+# asked for.
+#
+#   GET /                           status: version, build id, files, time of the last rebuild, error
+#   GET /<onto_name>.owl .ttl .nt   the ontology (RDF/XML, Turtle, N-Triples)
+#   GET /fields/<name>              lookup index entry of a field long name, label or IRI (JSON)
+#   GET /fields?prefix=NXsample%20t&limit=20   entries of the names starting with prefix
+#
+# Responses carry an ETag made from the blob shas of the files the build was
+# made from, so a client polling with If-None-Match gets 304 Not Modified
+# until a definition changes, without the ontology being serialized again.
+# If a rebuild fails, the last good build is still served; the error is shown
+# by the status page and sent as an X-Build-Error header until a rebuild works.
+#
+# usage: python -m nexus_ontology.onto_watch <definitions checkout> [--port 8000] [--interval 0.2] [--cache dir]
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import nxdl_cache
+from . import nxdl_merge
+from . import nxdl_parse
+from . import nxdl_source
+from . import onto_index
+from . import onto_rdf
+
+
+# onto_rdf settings of the command line; the ontology script passes its own
+settings = dict(onto_rdf.default_settings,
+                comment='NeXus ontology built from a local definitions checkout (onto_watch)')
+
+content_types = {'owl': 'application/rdf+xml', 'ttl': 'text/turtle', 'nt': 'application/n-triples'}
+
+_parsers = {'base_classes': nxdl_parse.parse_base_class, 'applications': nxdl_parse.parse_application}
+
+
+class Build:
+    '''The ontology of one version of the watched files; the outputs are made on first use'''
+
+    def __init__(self, build_id, classDict, applicationDict, typesDict, settings, files, seconds):
+        self.id = build_id
+        self.classDict, self.applicationDict, self.typesDict = classDict, applicationDict, typesDict
+        self.settings = settings
+        self.files = files         # number of nxdl files
+        self.seconds = seconds     # time of the parse and merge
+        self.time = time.time()
+        self._outputs = {}         # format: bytes
+        self._index = None
+        self._lock = threading.Lock()
+
+    def output(self, fmt):
+        '''The ontology in format fmt ('owl', 'ttl' or 'nt'), as bytes'''
+        with self._lock:
+            if fmt not in self._outputs:
+                f = io.StringIO()
+                onto_rdf.writers[fmt](onto_rdf.describe(self.classDict, self.applicationDict, self.typesDict, self.settings),
+                                      f, onto_rdf.prefixes(self.settings))
+                self._outputs[fmt] = f.getvalue().encode('utf-8')
+            return self._outputs[fmt]
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                self._index = onto_index.build(self.classDict, self.settings)
+            return self._index
+
+
+class Watcher:
+    '''Keeps a Build of the definitions in path up to date with the files
+
+    settings are the onto_rdf settings (version included); parse_cache is an
+    nxdl_cache.ParseCache or None.
+    '''
+
+    def __init__(self, path, settings, parse_cache=None, join_string='-', join_string_label=' ', default_units='NX_UNITLESS'):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.settings = settings
+        self.parse_cache = parse_cache
+        self.merge_args = (join_string, join_string_label, default_units)
+        self.records = {folder: {} for folder in nxdl_source.nxdl_folders}  # folder: {file: record}
+        self._stamps = {}   # file: (size, mtime_ns)
+        self._failed = set() # files that could not be read or parsed, so have no stamp
+        self._shas = {}     # file: blob sha
+        self._types = None
+        self.build = None   # the current Build
+        self.rebuilds = 0
+        self.error = None   # {'message', 'time'} of the last failed rebuild, until a rebuild succeeds
+        self.errors = 0     # failed rebuilds reported
+
+    def _listing(self):
+        # {file: (size, mtime_ns)} of nxdlTypes.xsd and the nxdl files
+        stamps = {}
+        for folder in (None,) + nxdl_source.nxdl_folders:
+            if folder is None:
+                paths = [os.path.join(self.path, nxdl_source.types_file)]
+            else:
+                try:
+                    paths = [entry.path for entry in os.scandir(os.path.join(self.path, folder)) if entry.name.endswith('.nxdl.xml')]
+                except FileNotFoundError:
+                    paths = []
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError: # removed while listing
+                    continue
+                stamps[path] = (st.st_size, st.st_mtime_ns)
+        return stamps
+
+    def _parse(self, content, parse):
+        if self.parse_cache is not None:
+            return self.parse_cache.parse(content, parse)
+        return parse(content)
+
+    def update(self):
+        '''Parse the files added or changed since the last call and rebuild; returns the files changed
+
+        A file that cannot be read or parsed keeps its previous record and is
+        tried again on the next call, and its removal is a change; any error
+        leaves the current build alone.
+        '''
+        start = time.perf_counter()
+        stamps = self._listing()
+        changed = sorted(path for path, stamp in stamps.items() if self._stamps.get(path) != stamp)
+        removed = sorted((set(self._stamps) | self._failed) - set(stamps))
+        if not changed and not removed and self.build is not None:
+            return []
+        self._failed.difference_update(removed)
+        for path in removed:
+            self._stamps.pop(path, None)
+            self._shas.pop(path, None)
+            if os.path.basename(path) == nxdl_source.types_file:
+                self._types = None
+            for records in self.records.values():
+                records.pop(path, None)
+        for path in changed:
+            folder = os.path.basename(os.path.dirname(path))
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                if os.path.basename(path) == nxdl_source.types_file:
+                    self._types = self._parse(content, nxdl_parse.parse_types)
+                elif folder in self.records:
+                    self.records[folder][path] = self._parse(content, _parsers[folder])
+            except Exception:
+                self._failed.add(path)
+                raise
+            self._failed.discard(path)
+            self._shas[path] = nxdl_source.blob_sha(content)
+            self._stamps[path] = stamps[path] # only once parsed, so that a file being written is read again
+        if self._types is None:
+            raise FileNotFoundError('No %s in %s' % (nxdl_source.types_file, self.path))
+        # deprecation warnings are printed by the first build only
+        with contextlib.redirect_stdout(io.StringIO()) if self.build is not None else contextlib.nullcontext():
+            classDict = nxdl_merge.merge_base_classes(list(self.records['base_classes'].items()), *self.merge_args)
+            applicationDict = nxdl_merge.merge_applications(classDict, list(self.records['applications'].items()),
+                                                            *self.merge_args)
+        build_id = hashlib.sha1(json.dumps([self.settings['version'], sorted(self._shas.items())]).encode()).hexdigest()[:20]
+        self.build = Build(build_id, classDict, applicationDict, self._types, self.settings,
+                           sum(len(records) for records in self.records.values()), time.perf_counter() - start)
+        self.rebuilds += 1
+        return changed + removed
+
+    def watch(self, interval=0.2, stop=None):
+        '''Call update every interval seconds until stop (a threading.Event) is set
+
+        If a rebuild fails (a file being written, not well-formed, or naming a
+        class that does not exist), the last good build is kept and served, and
+        the error is kept in self.error until a rebuild succeeds.
+        '''
+        stop = stop or threading.Event()
+        while not stop.wait(interval):
+            try:
+                changed = self.update()
+            except Exception as e:
+                message = '%s: %s' % (type(e).__name__, e)
+                if self.error is None or self.error['message'] != message: # reported once, not at every poll
+                    print('=== Not rebuilt: %s' % message, file=sys.stderr)
+                    self.errors += 1
+                    self.error = {'message': message, 'time': time.time()}
+                continue
+            if changed:
+                self.error = None
+                print('=== Rebuilt %s in %.3f s (%s)' % (self.build.id, self.build.seconds,
+                                                     ', '.join(os.path.basename(path) for path in changed[:5]) +
+                                                     (' ...' if len(changed) > 5 else '')), file=sys.stderr)
+
+
+def _entry(entry):
+    return dict(entry._asdict())
+
+
+class Handler(BaseHTTPRequestHandler):
+    '''Serves the current build of server.watcher'''
+
+    verbose = False
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        error = self.server.watcher.error
+        if error is not None: # the build served is not that of the files
+            self.send_header('X-Build-Error', error['message'].encode('ascii', 'backslashreplace').decode()[:500])
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if body is not None:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body is not None and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, value, etag=None, status=200):
+        self._send(status, json.dumps(value, indent=1).encode('utf-8') + b'\n', 'application/json', etag)
+
+    def do_GET(self):
+        watcher = self.server.watcher
+        build = watcher.build
+        url = urllib.parse.urlsplit(self.path)
+        path = urllib.parse.unquote(url.path)
+        query = urllib.parse.parse_qs(url.query)
+        onto_name = build.settings['onto_iri'].rsplit('/', 1)[-1]
+        name, dot, fmt = path[1:].rpartition('.')
+        if path == '/':
+            etag = '"%s-%i"' % (build.id, watcher.errors) # changes when a rebuild fails
+        elif path == '/fields' or path.startswith('/fields/'):
+            etag = '"%s"' % build.id
+        elif name == onto_name and fmt in content_types:
+            etag = '"%s-%s"' % (build.id, fmt)
+        else:
+            return self._json({'error': 'not found'}, status=404)
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            return self._send(304, None, None, etag)
+
+        if path == '/':
+            self._json({'version': build.settings['version'], 'build': build.id, 'files': build.files,
+                        'built': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(build.time)),
+                        'rebuild_seconds': round(build.seconds, 4), 'rebuilds': watcher.rebuilds,
+                        'ontology': ['/%s.%s' % (onto_name, fmt) for fmt in content_types],
+                        'error': None if watcher.error is None else dict(
+                            watcher.error, time=time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(watcher.error['time'])))},
+                       etag)
+        elif path == '/fields':
+            prefix = query.get('prefix', [''])[0]
+            try:
+                limit = int(query.get('limit', ['50'])[0])
+            except ValueError:
+                limit = -1
+            if limit < 0:
+                return self._json({'error': 'limit must be a whole number >= 0'}, status=400)
+            self._json([_entry(entry) for entry in build.index.prefix(prefix, casefold=True, limit=limit)], etag)
+        elif path.startswith('/fields/'):
+            entry = build.index.get(path[len('/fields/'):], casefold=True)
+            if entry is None:
+                return self._json({'error': 'no field %s' % path[len('/fields/'):]}, status=404)
+            self._json(_entry(entry), etag)
+        else:
+            self._send(200, build.output(fmt), content_types[fmt], etag)
+
+    do_HEAD = do_GET
+
+
+def serve(watcher, host='127.0.0.1', port=8000, interval=0.2, verbose=False):
+    '''Build, then serve the builds of watcher on host:port and watch its files until interrupted'''
+    watcher.update()
+    server = ThreadingHTTPServer((host, port), type('Handler', (Handler,), {'verbose': verbose}))
+    server.watcher = watcher
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.watch, args=(interval, stop), daemon=True)
+    thread.start()
+    print('=== Serving %s (%i files) on http://%s:%i/' % (watcher.path, watcher.build.files, host, server.server_port),
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Watch a local definitions checkout and serve the ontology built from it')
+    parser.add_argument('path', help='local directory or git checkout of nexusformat/definitions')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on')
+    parser.add_argument('--interval', type=float, default=0.2, help='seconds between checks of the files')
+    parser.add_argument('--cache', help='parse cache directory (as tmp_file_path/nxdl_cache of the script)')
+    parser.add_argument('--version', help='version of the ontology (default: the newest tag of the checkout)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args(argv)
+
+    version = args.version or nxdl_source.LocalSource(args.path).get_tags()[0]['name']
+    parse_cache = nxdl_cache.ParseCache(args.cache, nxdl_parse.parser_version) if args.cache else None
+    onto_settings = dict(settings, version=version, created=time.strftime('%b-%d-%Y'))
+    serve(Watcher(args.path, onto_settings, parse_cache), args.host, args.port, args.interval, args.verbose)
+
+
+if __name__ == '__main__':
+    main()
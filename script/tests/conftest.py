@@ -0,0 +1,85 @@
+# Fixtures shared by the tests
+#
+# The nexus_ontology package is imported from script/ and the synthetic corpus
+# generator from script/benchmarks, as the benchmarks do.
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..'))
+sys.path.insert(0, os.path.join(here, '..', 'benchmarks'))
+
+from nexus_ontology import nxdl_cache
+import nxdl_corpus
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_versions
+from nexus_ontology import onto_rdf
+
+
+@pytest.fixture(scope='session')
+def corpus(tmp_path_factory):
+    '''Directory holding the synthetic definitions corpus (scale 1)'''
+    path = str(tmp_path_factory.mktemp('corpus'))
+    nxdl_corpus.write_corpus(path)
+    return path
+
+
+_base_class = '''<?xml version="1.0" encoding="UTF-8"?>
+<definition name="%s" extends="NXobject" type="group" category="base" xmlns="http://definition.nexusformat.org/nxdl/3.1">
+    <doc>Test class</doc>
+    <field name="%s" type="NX_FLOAT" units="%s"><doc>Test field</doc></field>
+</definition>
+'''
+
+
+def git(path, *args):
+    return subprocess.run(('git', '-C', path, '-c', 'user.name=test', '-c', 'user.email=test@example.org') + args,
+                          check=True, stdout=subprocess.PIPE).stdout.decode()
+
+
+@pytest.fixture(scope='session')
+def checkout(corpus, tmp_path_factory):
+    '''git checkout of the corpus with two version tags
+
+    v2020.01 is the corpus; v2020.02, the newest and checked out, adds
+    added_field to NXentry, adds NXsample and NXbeam with the fields of the
+    test individuals (onto_rdf.test_individuals) and removes the application
+    NXapp00001.
+    '''
+    path = str(tmp_path_factory.mktemp('checkout'))
+    shutil.copytree(corpus, path, dirs_exist_ok=True)
+    git(path, 'init', '-q')
+    git(path, 'add', '.')
+    git(path, 'commit', '-q', '-m', 'first')
+    git(path, 'tag', 'v2020.01')
+    entry = os.path.join(path, 'base_classes', 'NXentry.nxdl.xml')
+    with open(entry) as f:
+        content = f.read()
+    with open(entry, 'w') as f:
+        f.write(content.replace('</definition>', '    <field name="added_field" units="NX_LENGTH"/>\n</definition>'))
+    for name, field, units in (('NXsample', 'temperature', 'NX_TEMPERATURE'), ('NXbeam', 'final_energy', 'NX_ENERGY')):
+        with open(os.path.join(path, 'base_classes', name + '.nxdl.xml'), 'w') as f:
+            f.write(_base_class % (name, field, units))
+    git(path, 'add', 'base_classes')
+    git(path, 'rm', '-q', 'applications/NXapp00001.nxdl.xml')
+    git(path, 'commit', '-q', '-a', '-m', 'second')
+    git(path, 'tag', 'v2020.02')
+    return path
+
+
+@pytest.fixture(scope='session')
+def model(checkout, tmp_path_factory):
+    '''classDict, applicationDict, typesDict and tagsDict of the checkout'''
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path_factory.mktemp('nxdl_cache')), 'test')
+    return nxdl_versions.load(nxdl_source.LocalSource(checkout), parse_cache)
+
+
+@pytest.fixture
+def settings():
+    '''onto_rdf settings of the test ontologies'''
+    return dict(onto_rdf.default_settings, version='v2020.02-1.1', created='Jan-01-2020')
@@ -0,0 +1,62 @@
+import collections
+import json
+
+from nexus_ontology import build_report
+
+
+class _Counters:
+    def __init__(self):
+        self.requests = 0
+
+
+def test_stages_record_counters_counts_and_messages(tmp_path, capsys):
+    fetcher, stats = _Counters(), collections.Counter()
+    report = build_report.BuildReport(tag='v2020.02')
+    report.watch('fetch', fetcher, 'requests')
+    report.watch('merge', stats, 'fields')
+    with report.stage('base_classes') as counts:
+        fetcher.requests += 3
+        stats['fields'] += 5
+        counts['files'] = 2
+        print('=== Deprecated: NXold')
+        print('not kept')
+    with report.stage('applications') as counts:
+        fetcher.requests += 1
+        counts['files'] = 7
+    with report.stage('base_classes'):  # stages of the same name add up
+        fetcher.requests += 2
+    assert 'Deprecated: NXold' in capsys.readouterr().out  # output is still printed
+
+    data = report.report()
+    assert data['info'] == {'tag': 'v2020.02'}
+    assert list(data['stages']) == ['base_classes', 'applications']
+    assert data['stages']['base_classes']['counts'] == {'fetch.requests': 5, 'files': 2, 'merge.fields': 5, 'messages': 1}
+    assert data['stages']['base_classes']['messages'] == ['Deprecated: NXold']
+    assert data['stages']['applications']['counts'] == {'fetch.requests': 1, 'files': 7}
+    # only the watched counters and the messages are totaled
+    assert data['totals'] == {'fetch.requests': 6, 'merge.fields': 5, 'messages': 1}
+
+    files = report.write(str(tmp_path / 'report.json'), str(tmp_path / 'report.prof'))
+    assert files == [str(tmp_path / 'report.json')]  # no profile without profile=True
+    with open(files[0]) as f:
+        assert json.load(f)['totals'] == data['totals']
+
+
+def test_messages_are_capped_but_counted(monkeypatch):
+    monkeypatch.setattr(build_report, 'max_messages', 2)
+    report = build_report.BuildReport()
+    with report.stage('fetch'):
+        for i in range(5):
+            print('=== problem %i' % i, end='\n' if i < 4 else '')
+        print()  # the last line only counts once complete
+    assert report.report()['stages']['fetch']['messages'] == ['problem 0', 'problem 1']
+    assert report.report()['totals'] == {'messages': 5}
+
+
+def test_profile(tmp_path):
+    report = build_report.BuildReport(profile=True)
+    with report.stage('work'):
+        sum(range(1000))
+    files = report.write(str(tmp_path / 'report.json'), str(tmp_path / 'report.prof'))
+    assert files == [str(tmp_path / 'report.json'), str(tmp_path / 'report.prof')]
+    assert (tmp_path / 'report.prof').stat().st_size > 0
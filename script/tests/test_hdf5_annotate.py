@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+h5py = pytest.importorskip('h5py')
+numpy = pytest.importorskip('numpy')
+
+from nexus_ontology import hdf5_annotate
+from nexus_ontology import onto_index
+
+
+@pytest.fixture
+def index_file(tmp_path, model, settings):
+    return onto_index.write_index(str(tmp_path / 'NeXusOntology.index'), model[0], settings)
+
+
+def _nexus_file(path, temperature_units='K'):
+    with h5py.File(path, 'w') as f:
+        entry = f.create_group('entry')
+        entry.attrs['NX_class'] = 'NXentry'
+        entry.create_dataset('added_field', data=1.0).attrs['units'] = 'mm'
+        sample = entry.create_group('sample')
+        sample.attrs['NX_class'] = numpy.bytes_(b'NXsample')  # fixed length string, as written by many facilities
+        sample.create_dataset('temperature', data=[290.0, 300.0]).attrs['units'] = temperature_units
+        sample.create_dataset('Not_A_Field', data=0)
+        entry['sample_link'] = h5py.SoftLink('/entry/sample')  # walked once
+        entry['dangling'] = h5py.SoftLink('/nowhere')
+        f.create_dataset('outside', data=0)  # not in an NX_class group
+    return str(path)
+
+
+def test_annotate_file(tmp_path, index_file, settings):
+    table = hdf5_annotate.FieldTable(onto_index.load(index_file))
+    records = hdf5_annotate.annotate_file(_nexus_file(tmp_path / 'a.nxs'), table)
+    by_path = {record['path']: record for record in records}
+    assert sorted(by_path) == ['/entry/added_field', '/entry/sample/Not_A_Field', '/entry/sample/temperature']
+    assert by_path['/entry/sample/temperature']['iri'] == settings['base_iri'] + 'NXsample-temperature'
+    assert by_path['/entry/sample/temperature']['unit_category'] == 'NX_TEMPERATURE'
+    assert by_path['/entry/sample/temperature']['units'] == 'K'
+    assert by_path['/entry/added_field']['NX_class'] == 'NXentry'
+    assert by_path['/entry/sample/Not_A_Field']['iri'] is None
+
+
+def test_field_names_resolve_case_folded(index_file, settings):
+    table = hdf5_annotate.FieldTable(onto_index.load(index_file))
+    assert table.resolve('nxsample', 'Temperature') == (settings['base_iri'] + 'NXsample-temperature', 'NX_TEMPERATURE')
+    assert table.resolve('NXsample', 'pressure') == (None, None)
+
+
+def test_workers_give_the_same_records(tmp_path, index_file, capsys):
+    files = [_nexus_file(tmp_path / ('%02i.nxs' % i), units) for i, units in enumerate(['K', 'degC', 'mK'] * 3)]
+    (tmp_path / 'broken.nxs').write_bytes(b'not HDF5')
+    files = hdf5_annotate.find_files([str(tmp_path)])
+    assert len(files) == 10
+
+    outputs = []
+    for workers in (1, 3):
+        out = io.StringIO()
+        counts = hdf5_annotate.annotate(index_file, files, out, workers=workers)
+        outputs.append(out.getvalue())
+        assert counts == {'files': 10, 'records': 27, 'resolved': 18, 'failed': 1}
+    assert outputs[0] == outputs[1]
+    assert [json.loads(line)['file'] for line in outputs[0].splitlines()][::3] == files[:9]
+    assert 'Problem annotating' in capsys.readouterr().err
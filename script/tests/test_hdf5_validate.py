@@ -0,0 +1,75 @@
+import io
+import json
+
+import pytest
+
+h5py = pytest.importorskip('h5py')
+numpy = pytest.importorskip('numpy')
+
+from nexus_ontology import hdf5_annotate
+from nexus_ontology import hdf5_validate
+from nexus_ontology import nxdl_plans
+from test_nxdl_plans import application, derived
+
+
+@pytest.fixture
+def plans_file(tmp_path, model):
+    records = [('applications/NXtest.nxdl.xml', nxdl_plans.compile_application(application)),
+               ('applications/NXderived.nxdl.xml', nxdl_plans.compile_application(derived))]
+    path = str(tmp_path / 'NeXusOntology.plans')
+    nxdl_plans.save(path, nxdl_plans.build(records, model[0]))
+    return path
+
+
+def _nexus_file(path, definition='NXtest', temperature=300.0, units='K', sample=True):
+    with h5py.File(path, 'w') as f:
+        entry = f.create_group('entry')
+        entry.attrs['NX_class'] = 'NXentry'
+        if definition is not None:
+            entry['definition'] = definition
+        if sample:
+            group = entry.create_group('sample')
+            group.attrs['NX_class'] = numpy.bytes_(b'NXsample')
+            group.create_dataset('temperature', data=temperature).attrs['units'] = units
+            entry['data'] = h5py.SoftLink('/entry/sample/temperature')
+    return str(path)
+
+
+def test_valid_file(tmp_path, plans_file):
+    result = hdf5_validate.Validator(plans_file).check_file(_nexus_file(tmp_path / 'a.nxs'))
+    assert result['valid'] and result['entries'] == {'/entry': 'NXtest'} and result['problems'] == []
+    assert result['warnings'] == ['/entry/sample: missing field mass']
+
+
+def test_problems(tmp_path, plans_file):
+    validator = hdf5_validate.Validator(plans_file)
+    result = validator.check_file(_nexus_file(tmp_path / 'a.nxs', temperature=300, units='m'))
+    assert not result['valid']
+    assert result['problems'] == ['/entry/sample/temperature: not of type NX_FLOAT',
+                                  "/entry/sample/temperature: units 'm' not compatible with NX_TEMPERATURE"]
+    result = validator.check_file(_nexus_file(tmp_path / 'b.nxs', definition='NXderived', sample=False))
+    assert result['problems'] == ['/entry: missing field extra', '/entry: missing link data',
+                                  '/entry: missing group sample:NXsample']
+    result = validator.check_file(_nexus_file(tmp_path / 'c.nxs', definition='NXnothing'))
+    assert result['problems'] == ['/entry: unknown application definition NXnothing']
+    result = validator.check_file(_nexus_file(tmp_path / 'd.nxs', definition=None))
+    assert result['problems'] == ['no NXentry with a definition field']
+    # unless the definition is given
+    result = hdf5_validate.Validator(plans_file, 'NXtest').check_file(str(tmp_path / 'd.nxs'))
+    assert result['entries'] == {'/entry': 'NXtest'} and result['problems'] == ['/entry: missing field definition']
+
+
+def test_workers_give_the_same_results(tmp_path, plans_file, capsys):
+    for i in range(6):
+        _nexus_file(tmp_path / ('%02i.nxs' % i), units=['K', 'm', 'degC'][i % 3])
+    (tmp_path / 'broken.nxs').write_bytes(b'not HDF5')
+    files = hdf5_annotate.find_files([str(tmp_path)])
+    outputs = []
+    for workers in (1, 3):
+        out = io.StringIO()
+        counts = hdf5_validate.validate(plans_file, files, out, workers=workers)
+        assert counts == {'files': 7, 'valid': 4, 'invalid': 3, 'failed': 1}
+        outputs.append(out.getvalue())
+    assert outputs[0] == outputs[1]
+    assert [json.loads(line)['file'] for line in outputs[0].splitlines()] == files
+    assert 'Problem validating' in capsys.readouterr().err
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import nexus_ontology
+
+
+def test_import_is_lazy(tmp_path, model, settings):
+    index = nexus_ontology.onto_index.write_index(str(tmp_path / 'NeXusOntology.index'), model[0], settings)
+    code = '''if True:
+        import json, sys
+        import nexus_ontology
+        imported = {name for name in ('xml.etree.ElementTree', 'nexus_ontology.nxdl_parse', 'nexus_ontology.onto_index',
+                                      'nexus_ontology.onto_rdf') if name in sys.modules}
+        iri = nexus_ontology.lookup('NXsample temperature', sys.argv[1]).iri
+        print(json.dumps([sorted(imported), iri, 'nexus_ontology.onto_index' in sys.modules,
+                          'nexus_ontology.nxdl_parse' in sys.modules or
+                          'xml.etree.ElementTree' in sys.modules]))
+    '''
+    script = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code, index], cwd=script, check=True,
+                            stdout=subprocess.PIPE).stdout
+    assert json.loads(output) == [[], settings['base_iri'] + 'NXsample-temperature', True, False]
+
+
+def test_helper_modules_are_attributes():
+    assert nexus_ontology.nxdl_model is sys.modules['nexus_ontology.nxdl_model']
+    assert 'onto_watch' in dir(nexus_ontology)
+    with pytest.raises(AttributeError):
+        nexus_ontology.nothing
+
+
+def test_build_write_load_and_lookup(tmp_path, checkout, model):
+    out_path = str(tmp_path / 'out')
+    built = nexus_ontology.build(checkout, cache=str(tmp_path / 'cache'), out_path=out_path, formats=('nt',))
+    assert built == model
+    path = os.path.join(out_path, nexus_ontology.onto_name)
+    assert sorted(os.listdir(out_path)) == ['NeXusOntology.index', 'NeXusOntology.nt', 'NeXusOntology.nxmodel']
+    assert nexus_ontology.load(path + '.nxmodel') == tuple(model)
+    with open(path + '.nt', encoding='utf-8') as f:
+        assert '"%s"' % model[3]['name'] in f.read()  # the version is the newest tag
+
+    entry = nexus_ontology.lookup('nxsample TEMPERATURE', path + '.index')
+    assert entry.fieldName == 'temperature'
+    assert nexus_ontology.lookup('nxsample TEMPERATURE', path + '.index', casefold=False) is None
+    index = nexus_ontology.load_index(path + '.index')
+    assert nexus_ontology.load_index(path + '.index') is index  # loaded once
+    nexus_ontology.write(out_path, model, formats=())
+    assert nexus_ontology.load_index(path + '.index') is not index  # unless written again
+
+
+def test_load_owl(tmp_path, model, settings):
+    pytest.importorskip('owlready2')
+    files = nexus_ontology.write(str(tmp_path), model, formats=('owl',), settings=settings)
+    ontology = nexus_ontology.load_owl(files[0])
+    assert ontology.base_iri == settings['onto_iri'] + '#'
+    assert ontology.search_one(iri=settings['base_iri'] + 'NXsample') is not None
@@ -0,0 +1,24 @@
+import json
+import os
+
+script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'NeXusOntology_V1.1')
+
+
+def _export(notebook):
+    # the notebook as exported by jupyter nbconvert --to script
+    lines = ['#!/usr/bin/env python', '# coding: utf-8', '']
+    for cell in notebook['cells']:
+        source = ''.join(cell['source'])
+        if cell['cell_type'] == 'markdown':
+            lines += ['# ' + line for line in source.split('\n')] + ['']
+        else:
+            count = cell['execution_count'] if cell['execution_count'] is not None else ' '
+            lines += ['# In[%s]:' % count, '', '', source, '', '']
+    return '\n'.join(lines)
+
+
+def test_script_is_the_notebook_export():
+    with open(script + '.ipynb', encoding='utf-8') as f:
+        notebook = json.load(f)
+    with open(script + '.py', encoding='utf-8') as f:
+        assert f.read().rstrip('\n') == _export(notebook).rstrip('\n')  # blank lines of the last, empty cell
@@ -0,0 +1,78 @@
+import os
+import pickle
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+
+
+def _count_calls(parse, calls):
+    def counted(content):
+        calls.append(content)
+        return parse(content)
+    counted.__name__ = parse.__name__
+    return counted
+
+
+def test_unchanged_files_are_parsed_once(corpus, tmp_path):
+    source = nxdl_source.LocalSource(corpus)
+    calls = []
+    parse = _count_calls(nxdl_parse.parse_base_class, calls)
+    cache = nxdl_cache.ParseCache(str(tmp_path), nxdl_parse.parser_version)
+    records = cache.parse_files(source, 'base_classes', parse)
+    assert len(calls) == cache.misses == len(records)
+    assert records == [(xml_file, nxdl_parse.parse_base_class(content)) for xml_file, content in source.get_files('base_classes')]
+
+    # a new cache on the same directory reads the records from disk
+    again = nxdl_cache.ParseCache(str(tmp_path), nxdl_parse.parser_version)
+    assert again.parse_files(source, 'base_classes', parse) == records
+    assert len(calls) == len(records) and again.hits == len(records) and again.misses == 0
+
+    # a new parser version starts an empty cache
+    other = nxdl_cache.ParseCache(str(tmp_path), nxdl_parse.parser_version + '-next')
+    other.parse_files(source, 'base_classes', parse)
+    assert other.misses == len(records)
+
+
+def test_records_are_kept_per_parse_function(tmp_path):
+    def as_base_class(content):
+        return 'base class'
+
+    def as_application(content):
+        return 'application'
+
+    cache = nxdl_cache.ParseCache(str(tmp_path), 'v')
+    assert cache.parse(b'<definition/>', as_base_class) == 'base class'
+    assert cache.parse(b'<definition/>', as_application) == 'application'
+    again = nxdl_cache.ParseCache(str(tmp_path), 'v')
+    assert again.parse(b'<definition/>', as_base_class) == 'base class'
+    assert again.parse(b'<definition/>', as_application) == 'application'
+    assert again.hits == 2
+
+
+def test_damaged_records_are_parsed_again(tmp_path):
+    def parse(content):
+        return content.upper()
+
+    cache = nxdl_cache.ParseCache(str(tmp_path), 'v')
+    path = os.path.join(str(tmp_path), 'v', 'parse', nxdl_source.blob_sha(b'abc') + '.p')
+    for damaged in (b'', b'\x80\x04\x95', b'cno_such_module\nRecord\n.', pickle.dumps(b'x')[:-1] + b'\x00'):
+        cache.records.clear()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(damaged)
+        assert cache.parse(b'abc', parse) == b'ABC'
+    assert cache.hits == 0
+
+
+def test_records_in_memory_are_bounded(tmp_path):
+    def parse(content):
+        return len(content)
+
+    cache = nxdl_cache.ParseCache(str(tmp_path), 'v', max_records=3)
+    for i in range(10):
+        cache.parse(b'x' * i, parse)
+    assert len(cache.records) == 3
+    # least recently used records are dropped from memory but still read from disk
+    assert cache.parse(b'', parse) == 0
+    assert cache.hits == 1 and cache.misses == 10
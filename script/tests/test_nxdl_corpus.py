@@ -0,0 +1,50 @@
+import io
+
+import nxdl_corpus
+from nexus_ontology import nxdl_fetch
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+
+
+def test_corpus_is_deterministic_and_scales():
+    first = nxdl_corpus.corpus(1)
+    assert first == nxdl_corpus.corpus(1)
+    assert first != nxdl_corpus.corpus(1, seed=1)
+    larger = nxdl_corpus.corpus(3)
+    for folder in nxdl_source.nxdl_folders:
+        count = sum(nxdl_source.is_nxdl(path, folder) for path in first)
+        assert sum(nxdl_source.is_nxdl(path, folder) for path in larger) > 2 * count
+
+
+def test_corpus_is_valid_nxdl():
+    files = nxdl_corpus.corpus(1)
+    names = set()
+    for path, content in sorted(files.items()):
+        if nxdl_source.is_nxdl(path, 'base_classes'):
+            record = nxdl_parse.parse_base_class(content)
+            names.add(record['name'])
+            assert record['fields'] or record['name'] == 'NXobject'
+        elif nxdl_source.is_nxdl(path, 'applications'):
+            record = nxdl_parse.parse_application(content)
+            assert record['groups']
+    # extends chains and cited groups only refer to classes of the corpus
+    for path, content in files.items():
+        if nxdl_source.is_nxdl(path, 'base_classes'):
+            record = nxdl_parse.parse_base_class(content)
+            assert record['extends'] in names and set(record['groups_cited']) <= names
+    types = nxdl_parse.parse_types(files['nxdlTypes.xsd'])
+    assert set(nxdl_corpus.units) <= set(types)
+
+
+def test_served_tarball_holds_the_corpus(corpus):
+    server, api = nxdl_corpus.serve(corpus)
+    try:
+        fetcher = nxdl_fetch.Fetcher(workers=1)
+        tags = nxdl_source.ArchiveSource('nexusformat/definitions', fetcher, api=api + 'repos/').get_tags()
+        archive = fetcher.fetch(tags[0]['tarball_url'])
+        assert fetcher.fetch(api + 'raw/nxdlTypes.xsd') == nxdl_corpus.corpus(1)['nxdlTypes.xsd']
+    finally:
+        server.shutdown()
+    files = nxdl_source.extract_definitions(io.BytesIO(archive))
+    expected = nxdl_corpus.corpus(1)
+    assert files == {path: content for path, content in expected.items() if path != 'NXDL_VERSION'}
@@ -0,0 +1,108 @@
+import http.server
+import threading
+
+import pytest
+
+from nexus_ontology import nxdl_fetch
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    # stub server: /file/<n> answers n, /flaky answers 503 twice, /down always 503
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.connections = 0
+        self.requests = {}
+        self.lock = threading.Lock()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            count = self.server.requests[self.path] = self.server.requests.get(self.path, 0) + 1
+        if self.path.startswith('/file/'):
+            status, body = 200, self.path[6:].encode()
+        elif self.path == '/flaky':
+            status, body = (503, b'') if count <= 2 else (200, b'ok')
+        elif self.path == '/moved':
+            self.send_response(301)
+            self.send_header('Location', '/file/moved')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        else:
+            status, body = (503, b'') if self.path == '/down' else (404, b'')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = _Server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = 'http://127.0.0.1:%i' % server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    delays = []
+    monkeypatch.setattr(nxdl_fetch.time, 'sleep', delays.append)
+    return delays
+
+
+def test_fetch_all_keeps_order_and_reuses_connections(server):
+    fetcher = nxdl_fetch.Fetcher(workers=4)
+    urls = ['%s/file/%i' % (server.url, i) for i in range(40)]
+    assert fetcher.fetch_all(urls) == [str(i).encode() for i in range(40)]
+    assert fetcher.requests == 40
+    assert fetcher.bytes == sum(len(str(i)) for i in range(40))
+    assert server.connections <= 4  # one keep-alive connection per worker thread
+
+
+def test_retries_transient_errors_with_backoff(server, delays):
+    fetcher = nxdl_fetch.Fetcher(workers=1, backoff=0.5)
+    assert fetcher.fetch(server.url + '/flaky') == b'ok'
+    assert fetcher.retries == 2
+    assert delays == [0.5, 1.0]
+
+
+def test_gives_up_after_max_tries(server, delays):
+    fetcher = nxdl_fetch.Fetcher(workers=1, max_tries=5, backoff=1, max_backoff=3)
+    with pytest.raises(nxdl_fetch.FetchError, match='after 5 tries'):
+        fetcher.fetch(server.url + '/down')
+    assert server.requests['/down'] == 5
+    assert delays == [1, 2, 3, 3]  # doubled, bounded by max_backoff
+
+
+def test_client_errors_are_not_retried(server, delays):
+    fetcher = nxdl_fetch.Fetcher(workers=1)
+    with pytest.raises(nxdl_fetch.FetchError) as err:
+        fetcher.fetch(server.url + '/missing')
+    assert err.value.status == 404
+    assert fetcher.retries == 0 and delays == []
+
+
+def test_follows_redirects(server):
+    assert nxdl_fetch.Fetcher(workers=1).fetch(server.url + '/moved') == b'moved'
+
+
+def test_fetch_stream_retries_the_whole_download(server, delays):
+    fetcher = nxdl_fetch.Fetcher(workers=1, backoff=0.5)
+    assert fetcher.fetch_stream(server.url + '/flaky', lambda response: response.read()) == b'ok'
+    assert fetcher.retries == 2
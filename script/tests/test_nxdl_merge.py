@@ -0,0 +1,136 @@
+import collections
+import random
+import xml.dom.minidom
+
+from nexus_ontology import nxdl_merge
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from bench_model import as_dicts
+
+
+# cells 5 and 6 of the script before nxdl_parse and nxdl_merge, reading
+# (xml_file, content) pairs instead of downloading the files
+
+def _baseline_add_field(classDict, className, file, field, defn_name, join_string='-', join_string_label=' ',
+                        default_units='NX_UNITLESS'):
+    field_name = field.getAttribute('name')
+    deprecationAttribute = field.getAttribute('deprecated')
+    if not deprecationAttribute == '':
+        print("=== Deprecation warning %s in %s: %s" % (field_name, className, deprecationAttribute))
+    long_name = className + join_string + field_name
+    label = className + join_string_label + field_name
+    if not long_name in classDict[className]['fields'].keys():
+        classDict[className]['fields'][long_name] = {}
+        classDict[className]['fields'][long_name]['fieldName'] = field_name
+        classDict[className]['fields'][long_name]['units'] = field.getAttribute('units')
+        if classDict[className]['fields'][long_name]['units'] == '':
+            classDict[className]['fields'][long_name]['units'] = default_units
+        classDict[className]['fields'][long_name]['xml_file'] = file
+        classDict[className]['fields'][long_name]['defn_name'] = defn_name
+        classDict[className]['fields'][long_name]['label'] = label
+        _type = field.getAttribute('type')
+        if _type == '':
+            _type = 'NX_CHAR'
+        classDict[className]['fields'][long_name]['type'] = _type
+        try:
+            field_doc = field.getElementsByTagName('doc')[0].firstChild.nodeValue.replace('\n','')
+        except:
+            field_doc = ''
+        classDict[className]['fields'][long_name]['fieldDoc'] = field_doc
+
+
+def _baseline_doc(dom1):
+    for docelement in dom1.getElementsByTagName('doc'):
+        if docelement.parentNode.tagName == 'definition':
+            return docelement.firstChild.nodeValue.replace('\n','')
+    return ''
+
+
+def baseline(base_class_files, application_files):
+    classDict = {}
+    for file, content in base_class_files:
+        dom1 = xml.dom.minidom.parseString(content)
+        defn = dom1.getElementsByTagName('definition')[0]
+        className = defn.getAttribute('name')
+        if not className in classDict.keys():
+            classDict[className] = {}
+        classDict[className]['xml_file'] = file
+        classDict[className]['extends'] = defn.getAttribute('extends')
+        classDict[className]['classDoc'] = _baseline_doc(dom1)
+        if not 'fields' in classDict[className].keys():
+            classDict[className]['fields'] = {}
+        for field in (field for field in defn.getElementsByTagName('field') if field.parentNode == defn):
+            _baseline_add_field(classDict, className, file, field, None)
+        classDict[className]['groups_cited'] = [group.getAttribute('type') for group in defn.getElementsByTagName('group')]
+
+    applicationDict = {}
+    for file, content in application_files:
+        dom1 = xml.dom.minidom.parseString(content)
+        appdefn = dom1.getElementsByTagName('definition')[0]
+        defn_name = appdefn.getAttribute('name')
+        classNameList = []
+        for defn in dom1.getElementsByTagName('group'):
+            className = defn.getAttribute('type')
+            classNameList += [className]
+            for field in (field for field in defn.getElementsByTagName('field') if field.parentNode == defn):
+                _baseline_add_field(classDict, className, file, field, defn_name)
+        applicationDict[defn_name] = {'extends': appdefn.getAttribute('extends'),
+                                      'doc': _baseline_doc(dom1),
+                                      'xml_file': file,
+                                      'groups_cited': classNameList}
+    return classDict, applicationDict
+
+
+def _plain(merged):
+    return tuple(as_dicts(d) for d in merged)
+
+
+def _records(files, parse, workers=1):
+    return list(zip([xml_file for xml_file, content in files],
+                    nxdl_parse.parse_all(parse, [content for xml_file, content in files], workers)))
+
+
+def test_merge_matches_the_baseline(checkout, capsys):
+    source = nxdl_source.LocalSource(checkout)
+    base_class_files, application_files = source.get_files('base_classes'), source.get_files('applications')
+    expected = baseline(base_class_files, application_files)
+    expected_output = capsys.readouterr().out
+    assert 'Deprecation warning' in expected_output
+
+    merged = nxdl_merge.merge(_records(base_class_files, nxdl_parse.parse_base_class),
+                              _records(application_files, nxdl_parse.parse_application))
+    assert _plain(merged) == expected
+    assert list(merged[0]) == list(expected[0])  # same class order
+    assert [list(merged[0][name]['fields']) for name in merged[0]] == [list(expected[0][name]['fields']) for name in expected[0]]
+    assert capsys.readouterr().out == expected_output
+
+
+def test_merge_does_not_depend_on_file_or_worker_order(corpus):
+    source = nxdl_source.LocalSource(corpus)
+    base_classes = _records(source.get_files('base_classes'), nxdl_parse.parse_base_class)
+    applications = _records(source.get_files('applications'), nxdl_parse.parse_application)
+    expected = _plain(nxdl_merge.merge(base_classes, applications))
+
+    rng = random.Random(1)
+    shuffled_base, shuffled_applications = base_classes[:], applications[:]
+    rng.shuffle(shuffled_base)
+    rng.shuffle(shuffled_applications)
+    assert _plain(nxdl_merge.merge(shuffled_base, shuffled_applications)) == expected
+
+    # records parsed by a process pool are the same
+    assert _records(source.get_files('base_classes'), nxdl_parse.parse_base_class, workers=3) == base_classes
+    assert _records(source.get_files('applications'), nxdl_parse.parse_application, workers=3) == applications
+
+
+def test_first_definition_wins(corpus):
+    stats = collections.Counter()
+    source = nxdl_source.LocalSource(corpus)
+    classDict, applicationDict = nxdl_merge.merge(
+        _records(source.get_files('base_classes'), nxdl_parse.parse_base_class),
+        _records(source.get_files('applications'), nxdl_parse.parse_application), stats=stats)
+    fields = [field for nexus_class in classDict.values() for field in nexus_class['fields'].values()]
+    assert stats['fields_added'] == len(fields)
+    # fields of the base classes are never replaced by those of application definitions
+    for name, nexus_class in classDict.items():
+        for field in nexus_class['fields'].values():
+            assert (field['defn_name'] is None) == field['xml_file'].endswith('/base_classes/%s.nxdl.xml' % name)
@@ -0,0 +1,59 @@
+import pytest
+
+from nexus_ontology import nxdl_model
+
+
+def test_save_and_load_give_the_same_model(tmp_path, model):
+    path = str(tmp_path / 'NeXusOntology.nxmodel')
+    nxdl_model.save(path, *model)
+    loaded = nxdl_model.load(path)
+    assert loaded == tuple(model)
+    classDict, applicationDict = loaded[:2]
+    assert list(classDict) == list(model[0])
+    for name, nexus_class in classDict.items():
+        assert list(nexus_class['fields']) == list(model[0][name]['fields'])  # field order is kept
+    assert [application.keys() for application in applicationDict.values()] == \
+        [application.keys() for application in model[1].values()]
+
+
+def test_loaded_strings_are_shared(tmp_path, model):
+    path = str(tmp_path / 'NeXusOntology.nxmodel')
+    nxdl_model.save(path, *model)
+    first, second = nxdl_model.load(path)[0], nxdl_model.load(path)[0]
+    field, again = first['NXentry']['fields']['NXentry-added_field'], second['NXentry']['fields']['NXentry-added_field']
+    assert field == again
+    assert field['units'] is again['units'] and field['xml_file'] is again['xml_file']
+    assert first['NXentry']['classDoc'] is second['NXentry']['classDoc']
+
+
+def test_records_behave_as_dicts():
+    field = nxdl_model.Field(fieldName='x', units='NX_LENGTH')
+    assert field['units'] == 'NX_LENGTH' and field.get('defn_name') is None and field.get('nothing', 1) == 1
+    field['type'] = 'NX_FLOAT'
+    assert field.type == 'NX_FLOAT'
+    with pytest.raises(KeyError):
+        field['nothing']
+    with pytest.raises(KeyError):
+        field['nothing'] = 1
+    nexus_class = nxdl_model.NexusClass(fields={})
+    assert 'fields' in nexus_class and 'extends' not in nexus_class
+    assert nexus_class.keys() == ['fields']
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'other.nxmodel'
+    path.write_bytes(b'NXINDEX\x01')
+    with pytest.raises(ValueError, match='not a NeXus model file'):
+        nxdl_model.load(str(path))
+
+
+def test_short_damaged_and_older_files_are_rejected(tmp_path, model):
+    path = tmp_path / 'NeXusOntology.nxmodel'
+    nxdl_model.save(str(path), *model)
+    data = path.read_bytes()
+    for content, message in ((data[:8], 'truncated'), (data[:-10], 'truncated or damaged'),
+                             (data[:-1] + b' ', 'truncated or damaged'),
+                             (data[:7] + b'\x01' + data[8:], 'format 1, not %i' % nxdl_model.model_format)):
+        path.write_bytes(content)
+        with pytest.raises(ValueError, match=message):
+            nxdl_model.load(str(path))
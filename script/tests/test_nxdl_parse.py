@@ -0,0 +1,70 @@
+import pytest
+
+from nexus_ontology import nxdl_parse
+from nexus_ontology import nxdl_source
+from bench_parse import dom_application, dom_base_class  # the previous minidom extractor
+
+
+# corner cases of the NeXus definitions: undocumented fields, comments before
+# the text of a doc, a doc inside a nested element of a field, fields of
+# nested groups and groups citing the same class twice
+edge_case = b'''<?xml version="1.0" encoding="UTF-8"?>
+<definition name="NXedge" extends="NXobject" type="group" xmlns="http://definition.nexusformat.org/nxdl/3.1">
+    <!-- a comment before the doc -->
+    <doc><!-- comment first -->
+        Edge
+        cases
+    </doc>
+    <field name="plain"/>
+    <field name="documented" type="NX_FLOAT" units="NX_LENGTH" deprecated="use plain">
+        <dimensions rank="1"><dim index="1" value="n"><doc>dimension doc comes first</doc></dim></dimensions>
+        <doc>field doc</doc>
+    </field>
+    <group type="NXentry">
+        <doc>group doc</doc>
+        <field name="in_group"><doc>in group</doc></field>
+        <group type="NXsample">
+            <field name="nested" units="NX_TEMPERATURE"/>
+        </group>
+    </group>
+    <group type="NXentry" name="second"/>
+</definition>
+'''
+
+
+def _files(source):
+    return [(folder, content) for folder in nxdl_source.nxdl_folders for xml_file, content in source.get_files(folder)]
+
+
+@pytest.mark.parametrize('parse, reference', [(nxdl_parse.parse_base_class, dom_base_class),
+                                              (nxdl_parse.parse_application, dom_application)])
+def test_edge_cases_match_the_minidom_extractor(parse, reference):
+    assert parse(edge_case) == reference(edge_case)
+
+
+def test_edge_cases():
+    record = nxdl_parse.parse_base_class(edge_case)
+    assert record['classDoc'] == ' comment first '  # the first child of the doc, as minidom firstChild
+    assert [field['fieldName'] for field in record['fields']] == ['plain', 'documented']
+    assert record['fields'][1]['fieldDoc'] == 'dimension doc comes first'
+    assert record['groups_cited'] == ['NXentry', 'NXsample', 'NXentry']
+    application = nxdl_parse.parse_application(edge_case)
+    assert [(name, [f['fieldName'] for f in fields]) for name, fields in application['groups']] == \
+        [('NXentry', ['in_group']), ('NXsample', ['nested']), ('NXentry', [])]
+
+
+def test_corpus_matches_the_minidom_extractor(corpus, checkout):
+    for source in (nxdl_source.LocalSource(corpus), nxdl_source.LocalSource(checkout)):
+        for folder, content in _files(source):
+            if folder == 'base_classes':
+                assert nxdl_parse.parse_base_class(content) == dom_base_class(content)
+            else:
+                assert nxdl_parse.parse_application(content) == dom_application(content)
+
+
+def test_types(corpus):
+    typesDict = nxdl_parse.parse_types(nxdl_source.LocalSource(corpus).get_types())
+    assert typesDict['NX_FLOAT'] == {'doc': 'synthetic NX_FLOAT'}
+    undocumented = b'''<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+        <xs:simpleType name="NX_OLD"><xs:restriction base="xs:string"/></xs:simpleType></xs:schema>'''
+    assert nxdl_parse.parse_types(undocumented) == {'NX_OLD': {'doc': ''}}
@@ -0,0 +1,92 @@
+import pytest
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_plans
+from nexus_ontology import nxdl_source
+
+
+application = b'''<?xml version="1.0" encoding="UTF-8"?>
+<definition name="NXtest" extends="NXobject" type="group" category="application" xmlns="http://definition.nexusformat.org/nxdl/3.1">
+    <doc>Test application</doc>
+    <group type="NXentry">
+        <field name="definition" type="NX_CHAR"/>
+        <field name="title" optional="true"/>
+        <field name="DATA" type="NX_FLOAT"/>
+        <group type="NXsample" name="sample">
+            <field name="temperature" type="NX_FLOAT"/>
+            <field name="mass" type="NX_FLOAT" units="NX_MASS" recommended="true"/>
+        </group>
+        <group type="NXbeam" minOccurs="0">
+            <field name="final_energy" units="NX_ENERGY"/>
+        </group>
+        <link name="data" target="/entry/sample/temperature"/>
+    </group>
+</definition>
+'''
+
+derived = b'''<?xml version="1.0" encoding="UTF-8"?>
+<definition name="NXderived" extends="NXtest" type="group" category="application" xmlns="http://definition.nexusformat.org/nxdl/3.1">
+    <group type="NXentry">
+        <field name="extra" type="NX_INT" nameType="specified"/>
+        <field name="anything" nameType="any"/>
+    </group>
+    <group type="NXprocess"/>
+</definition>
+'''
+
+
+def _plans(classDict, version=None):
+    records = [('applications/NXtest.nxdl.xml', nxdl_plans.compile_application(application)),
+               ('applications/NXderived.nxdl.xml', nxdl_plans.compile_application(derived))]
+    return nxdl_plans.build(records, classDict, version)
+
+
+def test_compile_application():
+    record = nxdl_plans.compile_application(application)
+    assert (record['name'], record['extends']) == ('NXtest', 'NXobject')
+    entry, = record['groups']
+    assert entry == ('NXentry', None, 'required',
+                     (('definition', 'required', 'NX_CHAR', '', 'field'),
+                      ('title', 'optional', '', '', 'field'),
+                      ('data', 'required', '', '', 'link')),
+                     (('NXsample', 'sample', 'required',
+                       (('temperature', 'required', 'NX_FLOAT', '', 'field'),
+                        ('mass', 'recommended', 'NX_FLOAT', 'NX_MASS', 'field')), ()),
+                      ('NXbeam', None, 'optional', (('final_energy', 'required', '', 'NX_ENERGY', 'field'),), ())))
+
+
+def test_build_resolves_units_and_chains(model):
+    plans = _plans(model[0], 'v1')
+    assert list(plans) == ['NXderived', 'NXtest'] and 'NXtest' in plans and 'NXobject' not in plans
+    sample = plans.plans['NXtest'][1][0][4][0]
+    assert sample[3][0] == ('temperature', 'required', 'NX_FLOAT', 'NX_TEMPERATURE', 'field')  # from NXsample
+    assert plans.chain('NXderived') == ['NXderived', 'NXtest']
+    entries = plans.entries('NXderived')
+    assert [[field[0] for field in entry[3]] for entry in entries] == [['extra'], ['definition', 'title', 'data']]
+    with pytest.raises(KeyError, match='No application definition NXnothing'):
+        plans.chain('NXnothing')
+
+
+def test_save_and_load(tmp_path, model):
+    path = str(tmp_path / 'NeXusOntology.plans')
+    plans = _plans(model[0], 'v1')
+    nxdl_plans.save(path, plans)
+    loaded = nxdl_plans.load(path)
+    assert loaded.version == 'v1' and loaded.plans == plans.plans
+    assert all(type(plan[1]) is tuple for plan in loaded.plans.values())
+    (tmp_path / 'other').write_bytes(b'NXCLOSE\x01')
+    with pytest.raises(ValueError, match='not a NeXus plans file'):
+        nxdl_plans.load(str(tmp_path / 'other'))
+    (tmp_path / 'short').write_bytes(open(path, 'rb').read()[:-1])
+    with pytest.raises(ValueError, match='not a complete NeXus plans file'):
+        nxdl_plans.load(str(tmp_path / 'short'))
+
+
+def test_plans_of_the_definitions(tmp_path, model, checkout):
+    source = nxdl_source.LocalSource(checkout)
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path), nxdl_plans.compiler_version)
+    records = parse_cache.parse_files(source, 'applications', nxdl_plans.compile_application)
+    plans = nxdl_plans.build(records, model[0])
+    assert list(plans) == sorted(model[1])
+    for name in plans:
+        assert plans.chain(name)[0] == name
@@ -0,0 +1,94 @@
+import os
+import types
+
+import nxdl_corpus
+from nexus_ontology import nxdl_fetch
+from nexus_ontology import nxdl_source
+
+
+def _corpus_files(path, folder):
+    names = sorted(name for name in os.listdir(os.path.join(path, folder)) if name.endswith('.nxdl.xml'))
+    return [open(os.path.join(path, folder, name), 'rb').read() for name in names]
+
+
+def test_archive_source_reads_the_tarball_once_per_tag(corpus, tmp_path):
+    server, api = nxdl_corpus.serve(corpus, tag='v2020.01')
+    try:
+        fetcher = nxdl_fetch.Fetcher(workers=1)
+        source = nxdl_source.ArchiveSource('nexusformat/definitions', fetcher, api=api + 'repos/', cache=str(tmp_path))
+        files = source.get_files('base_classes')
+        assert [content for xml_file, content in files] == _corpus_files(corpus, 'base_classes')
+        assert files[0][0] == nxdl_source.github_raw + 'nexusformat/definitions/v2020.01/base_classes/NXentry.nxdl.xml'
+        assert source.get_types() == open(os.path.join(corpus, 'nxdlTypes.xsd'), 'rb').read()
+        assert fetcher.requests == 2  # tag list and tarball
+
+        # another run, and another version source, read the kept tarball
+        again = nxdl_source.ArchiveSource('nexusformat/definitions', fetcher, api=api + 'repos/', cache=str(tmp_path))
+        assert again.at('v2020.01').get_files('applications') == source.get_files('applications')
+        assert fetcher.requests == 3  # tag list only
+        assert len(os.listdir(str(tmp_path))) == 1
+    finally:
+        server.shutdown()
+
+
+def _github_source(corpus, api, fetcher):
+    # a GithubSource whose PyGithub repository is a stand-in listing the corpus served at api
+    def get_contents(folder, ref=None):
+        return [types.SimpleNamespace(path=folder + '/' + name, download_url=api + 'raw/' + folder + '/' + name,
+                                      sha=nxdl_source.blob_sha(content))
+                for name, content in zip(sorted(os.listdir(os.path.join(corpus, folder))), _corpus_files(corpus, folder))]
+    source = nxdl_source.GithubSource.__new__(nxdl_source.GithubSource)
+    source.repo = types.SimpleNamespace(full_name='nexusformat/definitions', get_contents=get_contents,
+                                        tags_url=api + 'repos/nexusformat/definitions/tags')
+    source.fetcher, source.types_url = fetcher, api + 'raw/nxdlTypes.xsd'
+    source.ref, source._tags, source._urls = None, None, {}
+    return source
+
+
+def test_github_and_archive_sources_record_the_same_files(corpus):
+    server, api = nxdl_corpus.serve(corpus, tag='v2020.01')
+    try:
+        fetcher = nxdl_fetch.Fetcher(workers=2)
+        github = _github_source(corpus, api, fetcher)
+        archive = nxdl_source.ArchiveSource('nexusformat/definitions', fetcher, api=api + 'repos/')
+        for folder in nxdl_source.nxdl_folders:
+            assert github.get_files(folder) == archive.get_files(folder)
+            assert github.list_files(folder) == archive.list_files(folder)
+        assert github.get_files('base_classes')[0][0] == \
+            nxdl_source.raw_url('nexusformat/definitions', 'v2020.01', 'base_classes/NXentry.nxdl.xml')
+    finally:
+        server.shutdown()
+
+
+def test_local_source_at_tag_reads_git_objects(checkout):
+    source = nxdl_source.LocalSource(checkout)
+    assert [tag['name'] for tag in source.get_tags()] == ['v2020.02', 'v2020.01']
+    old = source.at('v2020.01')
+    assert old.get_tags()[0]['name'] == 'v2020.01'
+    names = [xml_file.rsplit('/', 1)[1] for xml_file, sha in old.list_files('applications')]
+    assert 'NXapp00001.nxdl.xml' in names
+    assert 'NXapp00001.nxdl.xml' not in [xml_file.rsplit('/', 1)[1] for xml_file, sha in source.list_files('applications')]
+    # blob shas listed by git are those of the content read
+    listing = old.list_files('base_classes')
+    contents = old.read_files('base_classes', [xml_file for xml_file, sha in listing])
+    assert [sha for xml_file, sha in listing] == [nxdl_source.blob_sha(content) for content in contents]
+
+
+def test_local_working_tree_matches_the_online_sources(checkout):
+    # the working tree is recorded as the files at the newest tag, with the tag keys of the GitHub API
+    tree, tagged = nxdl_source.LocalSource(checkout), nxdl_source.LocalSource(checkout).at('v2020.02')
+    for folder in nxdl_source.nxdl_folders:
+        assert tree.get_files(folder) == tagged.get_files(folder)
+        assert tree.list_files(folder) == tagged.list_files(folder)
+    tag = tree.get_tags()[0]
+    assert tag == tagged.get_tags()[0]
+    assert set(tag) == {'name', 'zipball_url', 'tarball_url', 'commit', 'node_id'}
+    assert tag['commit']['sha'] == nxdl_source.LocalSource(checkout)._git('rev-parse', 'v2020.02').strip()
+
+
+def test_directory_without_git_uses_nxdl_version(corpus):
+    source = nxdl_source.LocalSource(corpus)
+    tag = source.get_tags()[0]
+    assert tag['name'] == 'synthetic-1x' and tag['commit']['sha'] is None
+    xml_file, content = source.get_files('base_classes')[0]
+    assert xml_file == nxdl_source.github_raw + 'nexusformat/definitions/synthetic-1x/base_classes/NXentry.nxdl.xml'
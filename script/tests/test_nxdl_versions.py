@@ -0,0 +1,37 @@
+import pytest
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_versions
+
+
+def test_versions_are_those_built_one_by_one(tmp_path, checkout):
+    source = nxdl_source.LocalSource(checkout)
+    built = list(nxdl_versions.versions(source, nxdl_cache.ParseCache(str(tmp_path / 'shared'), 'test')))
+    assert [version[0] for version in built] == ['v2020.02', 'v2020.01']  # newest first
+    for i, (tag, classDict, applicationDict, typesDict, tagsDict) in enumerate(built):
+        alone = nxdl_versions.load(source.at(tag), nxdl_cache.ParseCache(str(tmp_path / str(i)), 'test'))
+        assert (classDict, applicationDict, typesDict, tagsDict) == alone
+        assert tagsDict['name'] == tag
+    newest, oldest = built[0][1], built[1][1]
+    assert 'NXsample' in newest and 'NXsample' not in oldest
+    assert 'NXapp00001' in built[1][2] and 'NXapp00001' not in built[0][2]
+
+
+def test_common_files_are_parsed_once(tmp_path, checkout):
+    source = nxdl_source.LocalSource(checkout)
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path / 'cache'), 'test')
+    versions = nxdl_versions.versions(source, parse_cache)
+    next(versions)
+    misses = parse_cache.misses
+    next(versions)
+    # only the old NXentry and the application removed in v2020.02 are parsed again
+    assert parse_cache.misses - misses == 2
+
+
+def test_selected_tags(tmp_path, checkout):
+    source = nxdl_source.LocalSource(checkout)
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path / 'cache'), 'test')
+    assert [version[0] for version in nxdl_versions.versions(source, parse_cache, tags=['v2020.01'])] == ['v2020.01']
+    with pytest.raises(KeyError, match='No version tag v1999.01'):
+        list(nxdl_versions.versions(source, parse_cache, tags=['v1999.01']))
@@ -0,0 +1,77 @@
+import pytest
+
+from nexus_ontology import onto_closure
+from nexus_ontology import onto_patch
+
+
+def _record(extends, *cited):
+    return {'extends': extends, 'groups_cited': list(cited)}
+
+
+classes = {'NXobject': _record('NXobject'),
+           'NXentry': _record('NXobject', 'NXsample', 'NXgeometry'),
+           'NXsample': _record('NXobject', 'NXgeometry'),
+           'NXgeometry': _record('NXobject', 'NXorientation'),
+           'NXorientation': _record('NXobject', 'NXgeometry')}  # a cycle
+applications = {'NXbase': _record('NXobject', 'NXentry'),
+                'NXderived': _record('NXbase', 'NXentry', 'NXentry')}
+
+
+def _reachable(graph, name):
+    # by walking the definitions
+    seen, todo = set(), list(graph.get(name, ()))
+    while todo:
+        node = todo.pop()
+        if node not in seen:
+            seen.add(node)
+            todo.extend(graph.get(node, ()))
+    return sorted(seen)
+
+
+def test_closures():
+    closures = onto_closure.build(classes, applications, 'v1')
+    assert closures.ancestors('NXderived') == ['NXbase', 'NXobject']
+    assert closures.ancestors('NXobject') == []
+    assert closures.descendants('NXbase') == ['NXderived']
+    assert closures.cited('NXderived') == ['NXentry', 'NXgeometry', 'NXorientation', 'NXsample']
+    assert closures.cited('NXgeometry') == ['NXgeometry', 'NXorientation']  # through the cycle
+    assert closures.citing('NXsample') == ['NXbase', 'NXderived', 'NXentry']
+    assert 'NXderived' in closures and 'NXnothing' not in closures
+
+
+def test_closures_of_the_definitions(model):
+    classDict, applicationDict = model[:2]
+    closures = onto_closure.build(classDict, applicationDict)
+    graph = onto_closure.edges(classDict, applicationDict)
+    for relation in onto_closure.relations:
+        for name in closures.names:
+            assert closures.related(relation, name) == _reachable(graph[relation], name)
+            assert closures.related(relation, name, inverse=True) == \
+                sorted(other for other in closures.names if name in _reachable(graph[relation], other))
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'NeXusOntology.closure')
+    onto_closure.save(path, onto_closure.build(classes, applications, 'v1'))
+    closures = onto_closure.load(path)
+    assert closures.version == 'v1'
+    assert closures.citing('NXorientation') == ['NXbase', 'NXderived', 'NXentry', 'NXgeometry', 'NXorientation',
+                                                'NXsample']
+    (tmp_path / 'other').write_bytes(b'NXMODEL\x01')
+    with pytest.raises(ValueError, match='not a NeXus closure file'):
+        onto_closure.load(str(tmp_path / 'other'))
+    (tmp_path / 'short').write_bytes(open(path, 'rb').read()[:-1])
+    with pytest.raises(ValueError, match='not a complete NeXus closure file'):
+        onto_closure.load(str(tmp_path / 'short'))
+
+
+def test_write_triples(tmp_path, settings):
+    closures = onto_closure.build(classes, applications)
+    nt, = onto_closure.write_triples(str(tmp_path / 'NeXusOntology.closure'), ('nt',), closures, settings)
+    triples = onto_patch.read(nt)
+    base_iri, ns = settings['base_iri'], settings['onto_iri'] + '#'
+    assert (base_iri + 'NXderived', ns + 'extendsTransitive', '<%sNXobject>' % base_iri) in triples
+    assert (base_iri + 'NXentry', ns + 'citesGroupTransitive', '<%sNXorientation>' % base_iri) in triples
+    assert (ns + 'citesGroupTransitive', onto_patch.rdf + 'type', '<%sTransitiveProperty>' % onto_patch.owl) in triples
+    assert len([t for t in triples if t[1] == ns + 'extendsTransitive']) == \
+        sum(len(closures.ancestors(name)) for name in closures.names)
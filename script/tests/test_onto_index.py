@@ -0,0 +1,61 @@
+import pytest
+
+from nexus_ontology import onto_index
+
+
+@pytest.fixture
+def index(tmp_path, model, settings):
+    path = onto_index.write_index(str(tmp_path / 'NeXusOntology.index'), model[0], settings)
+    return onto_index.load(path)
+
+
+def test_fields_resolve_by_long_name_label_and_iri(index, model, settings):
+    entry = index['NXsample-temperature']
+    assert entry.iri == settings['base_iri'] + 'NXsample-temperature'
+    assert (entry.label, entry.className, entry.fieldName) == ('NXsample temperature', 'NXsample', 'temperature')
+    assert entry.unit_iri == settings['onto_iri'] + '#NX_TEMPERATURE'
+    assert entry.see_also == 'https://manual.nexusformat.org/classes/base_classes/NXsample.html#nxsample-temperature-field'
+    assert index['NXsample temperature'] == index[entry.iri] == entry
+    assert index.resolve('NXsample', 'temperature') == entry
+    assert index.version == settings['version']
+
+
+def test_casefold_and_missing_names(index):
+    assert index.get('nxsample TEMPERATURE') is None
+    assert index.get('nxsample TEMPERATURE', casefold=True) == index['NXsample-temperature']
+    assert index.get('NXsample-pressure', 'missing') == 'missing'
+    assert 'NXsample-pressure' not in index
+    with pytest.raises(KeyError):
+        index['NXsample-pressure']
+
+
+def test_index_holds_the_fields_of_the_ontology(index, model, settings):
+    classDict = model[0]
+    fields = {(name, field) for name in classDict if name != 'NXobject' for field in classDict[name]['fields']}
+    assert len(index) == len(fields)
+    assert [entry.iri for entry in index] == sorted(settings['base_iri'] + field for name, field in fields)
+    assert sorted(index.classes()) == sorted({name for name, field in fields})
+
+
+def test_prefix_search(index, model):
+    entries = index.prefix('NXentry-')
+    assert [entry.name for entry in entries] == sorted(model[0]['NXentry']['fields'])
+    assert index.prefix('nxentry-ADDED', casefold=True) == [index['NXentry-added_field']]
+    assert len(index.prefix('NXsyn', limit=5)) == 5
+    assert index.prefix('NXnothing') == []
+    assert [entry.fieldName for entry in index.fields('NXentry', 'added')] == ['added_field']
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'other.index'
+    path.write_bytes(b'NXMODEL\x01')
+    with pytest.raises(ValueError, match='not a NeXus lookup index'):
+        onto_index.load(str(path))
+
+
+def test_truncated_index_is_rejected(tmp_path, model, settings):
+    path = tmp_path / 'NeXusOntology.index'
+    onto_index.write_index(str(path), model[0], settings)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match='not a complete NeXus lookup index'):
+        onto_index.load(str(path))
@@ -0,0 +1,137 @@
+import io
+import math
+import os
+import subprocess
+import sys
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from nexus_ontology import onto_index
+from nexus_ontology import onto_individuals
+from nexus_ontology import onto_patch
+from nexus_ontology import onto_units
+
+
+@pytest.fixture
+def index_file(tmp_path, model, settings):
+    return onto_index.write_index(str(tmp_path / 'NeXusOntology.index'), model[0], settings)
+
+
+def _batch(settings, *rows):
+    temperature = settings['base_iri'] + 'NXsample-temperature'
+    energy = settings['base_iri'] + 'NXbeam-final_energy'
+    fields = {'temperature': temperature, 'energy': energy}
+    batch = {name: [] for name in onto_individuals.columns}
+    for dataset, field, value, min_, max_, unit in rows:
+        for name, v in zip(onto_individuals.columns, (dataset, fields.get(field, field), value, min_, max_, unit)):
+            batch[name].append(v)
+    return batch
+
+
+def test_rows_are_validated(tmp_path, index_file, settings):
+    with onto_individuals.MeasurementStore(str(tmp_path / 'store.sqlite'), index_file) as store:
+        counts = store.add(_batch(settings,
+                                  ('d0', 'temperature', 290.0, 280.0, 300.0, 'K'),
+                                  ('d0', 'energy', 12.4, None, None, 'keV'),
+                                  ('d1', 'temperature', 25.0, None, None, 'degC'),
+                                  ('d1', 'temperature', 1.0, None, None, None),  # no unit: not checked
+                                  ('d1', 'nothing', 1.0, None, None, 'K'),
+                                  ('d1', 'temperature', None, None, None, 'K'),
+                                  ('d1', 'temperature', math.nan, None, None, 'K'),
+                                  ('d1', 'temperature', 1.0, 2.0, 1.0, 'K'),
+                                  ('d1', 'energy', 1.0, None, None, 'm'),
+                                  ('d1', 'energy', 1.0, None, None, 'furlong')))
+        assert counts['rows'] == 10 and counts['added'] == 4 and counts['rejected'] == 6
+        assert counts['rejected: unknown field'] == 1
+        assert counts['rejected: no value'] == 2
+        assert counts['rejected: min > max'] == 1
+        assert counts['rejected: unit not compatible with the unit category'] == 2
+        assert [reason for dataset, field, reason in store.rejected][0] == 'unknown field'
+        rows = list(store.measurements(dataset='d0'))
+        assert rows[0] == ('d0', settings['base_iri'] + 'NXsample-temperature', 'NX_TEMPERATURE', 290.0, 280.0, 300.0, 'K')
+        assert rows[1][2:] == ('NX_ENERGY', 12.4, None, None, 'keV')
+
+
+def test_category_column_and_numpy_batches(tmp_path, index_file, settings):
+    with onto_individuals.MeasurementStore(str(tmp_path / 'store.sqlite'), index_file) as store:
+        temperature = settings['base_iri'] + 'NXsample-temperature'
+        counts = store.add({'dataset': numpy.array(['d0', 'd1', 'd2']), 'field': [temperature] * 3,
+                            'value': numpy.array([1.0, 2.0, 3.0]),
+                            'category': ['NX_TEMPERATURE', settings['onto_iri'] + '#NX_TEMPERATURE', 'NX_ENERGY']})
+        assert counts['added'] == 2 and counts['rejected: unit category is not the range of the field'] == 1
+        with pytest.raises(ValueError, match='column value has 1 rows'):
+            store.add({'dataset': ['d0', 'd1'], 'field': [temperature] * 2, 'value': [1.0]})
+
+
+def test_units_can_be_left_unchecked(tmp_path, index_file, settings):
+    with onto_individuals.MeasurementStore(str(tmp_path / 'store.sqlite'), index_file, units=False) as store:
+        assert store.add(_batch(settings, ('d0', 'energy', 1.0, None, None, 'm')))['added'] == 1
+
+
+def test_normalized(tmp_path, index_file, settings):
+    temperature = settings['base_iri'] + 'NXsample-temperature'
+    with onto_individuals.MeasurementStore(str(tmp_path / 'store.sqlite'), index_file, units=False) as store:
+        store.add(_batch(settings,
+                         ('d0', 'temperature', 290.0, 280.0, None, 'K'),
+                         ('d1', 'temperature', 25.0, 20.0, 30.0, 'degC'),
+                         ('d2', 'temperature', 500.0, None, None, 'mK'),
+                         ('d3', 'temperature', 'warm', None, None, 'K'),  # not a number
+                         ('d4', 'temperature', 1.0, None, None, 'm')))  # stored unchecked, not converted
+        result = store.normalized(temperature, onto_units.UnitNormalizer())
+        assert result['dataset'] == ['d0', 'd1', 'd2'] and result['unit'] == 'K'
+        numpy.testing.assert_allclose(result['value'], [290.0, 298.15, 0.5])
+        numpy.testing.assert_allclose(result['min'], [280.0, 293.15, math.nan])
+        numpy.testing.assert_allclose(result['max'], [math.nan, 303.15, math.nan])
+
+
+def test_write_ntriples(tmp_path, index_file, settings):
+    with onto_individuals.MeasurementStore(str(tmp_path / 'store.sqlite'), index_file) as store:
+        store.add(_batch(settings,
+                         ('http://example.org/d0', 'temperature', 290.0, None, math.inf, 'K'),
+                         ('run/12', 'energy', 12, None, None, 'keV')))
+        with pytest.raises(ValueError, match='not an absolute IRI'):
+            store.write_ntriples(io.StringIO(), settings['onto_iri'])
+        out = io.StringIO()
+        store.write_ntriples(out, settings['onto_iri'], base='http://example.org/data/')
+        triples = onto_patch.read_ntriples(io.StringIO(out.getvalue()))
+
+        only = io.StringIO()
+        store.write_ntriples(only, settings['onto_iri'], dataset='http://example.org/d0')
+    ns, xsd = settings['onto_iri'] + '#', onto_patch.xsd
+    assert ('http://example.org/data/run/12', onto_patch.rdf + 'type', '<%sdataset>' % ns) in triples
+    values = {p[len(ns):]: o for s, p, o in triples if p.startswith(ns)}
+    assert values['hasMaxValue'] == '"INF"^^<%sdouble>' % xsd
+    assert values['hasValue'] in ('"290.0"^^<%sdouble>' % xsd, '"12"^^<%sinteger>' % xsd)
+    assert 'run/12' not in only.getvalue() and 'NXsample-temperature' in only.getvalue()
+
+
+def test_csv_command(tmp_path, index_file, settings, capsys):
+    path = tmp_path / 'measurements.csv'
+    path.write_text('dataset,field,value,min,max,unit\n'
+                    'd0,%sNXbeam-final_energy,12.4,,,keV\n'
+                    'd1,%sNXbeam-final_energy,1,,,m\n' % (settings['base_iri'], settings['base_iri']))
+    store = str(tmp_path / 'store.sqlite')
+    onto_individuals.main([index_file, store, str(path), '--batch-size', '1'])
+    assert 'Added 1 of 2 measurements in 2 batches, 1 rejected' in capsys.readouterr().err
+    onto_individuals.main([index_file, store, str(path), '--no-check-units'])
+    assert 'Added 2 of 2 measurements in 1 batches, 0 rejected' in capsys.readouterr().err
+    with onto_individuals.MeasurementStore(store, index_file) as store:
+        assert [row[3:] for row in store.measurements(dataset='d1')] == [(1, None, None, 'm')]
+
+
+def test_csv_command_without_numpy(tmp_path, index_file, settings):
+    # NumPy is only needed to check units
+    path = tmp_path / 'measurements.csv'
+    path.write_text('dataset,field,value,min,max,unit\nd0,%sNXbeam-final_energy,1,,,m\n' % settings['base_iri'])
+    code = '''if True:
+        import sys
+        sys.modules['numpy'] = None  # import numpy raises ImportError
+        from nexus_ontology import onto_individuals
+        onto_individuals.main(sys.argv[1:])
+    '''
+    script = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', code, index_file, str(tmp_path / 'store.sqlite'), str(path),
+                             '--no-check-units'], cwd=script, stderr=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0 and 'Added 1 of 1 measurements' in result.stderr
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from nexus_ontology import onto_modules
+from nexus_ontology import onto_patch
+from nexus_ontology import onto_rdf
+
+
+@pytest.mark.parametrize('fmt', ['nt', 'owl'])
+def test_modules_hold_the_ontology(tmp_path, model, settings, fmt):
+    path = str(tmp_path / 'NeXusOntology-modules')
+    files = onto_modules.write_modules(path, fmt, *model[:3], settings)
+    classDict, applicationDict = model[:2]
+    assert sorted(os.path.basename(f) for f in files) == sorted(
+        ['core.' + fmt, 'NeXusOntology.' + fmt, onto_modules.catalog_file] +
+        [name + '.' + fmt for name in list(classDict) + list(applicationDict) if name != 'NXobject'])
+
+    loader = onto_modules.ModuleLoader(path)
+    everything = loader.load('NeXusOntology')
+    assert len(loader.modules) == len(files) - 1  # every module, once
+    imports = onto_rdf.owl + 'imports'
+    module = settings['onto_iri'] + '/'
+    ontology = {t for t in everything if not t[0].startswith(module) and not (t[1] == imports)}
+    assert ontology == onto_patch.triples(onto_rdf.describe(*model[:3], settings))
+
+
+def test_modules_import_what_their_class_refers_to(tmp_path, model, settings):
+    path = str(tmp_path / 'NeXusOntology-modules')
+    onto_modules.write_modules(path, 'nt', *model[:3], settings)
+    loader = onto_modules.ModuleLoader(path)
+    iri = onto_modules.module_iri(settings, 'NXentry')
+    assert loader.iri('NXentry') == loader.iri(iri) == iri
+    assert loader.imports('NXentry') == [onto_modules.module_iri(settings, 'NXsyn00049'),
+                                         onto_modules.module_iri(settings, 'core')]
+    assert loader.imports('core') == []
+
+    triples = loader.load('NXentry')
+    assert set(loader.closure('NXentry')) == set(loader.modules)  # only the imports closure is read
+    assert {iri, onto_modules.module_iri(settings, 'NXsyn00049')} <= set(loader.modules)
+    field = settings['base_iri'] + 'NXentry-added_field'
+    assert (field, onto_rdf.rdf + 'type', '<%sObjectProperty>' % onto_rdf.owl) in triples
+    assert any(s == settings['base_iri'] + 'NXentry' and isinstance(o, onto_patch.Some) for s, p, o in triples)
+
+
+def test_catalog_has_one_entry_per_line(tmp_path, model, settings):
+    path = str(tmp_path / 'NeXusOntology-modules')
+    onto_modules.write_modules(path, 'nt', *model[:3], settings)
+    with open(os.path.join(path, onto_modules.catalog_file), encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines[1].startswith('<catalog ') and lines[-1] == '</catalog>'
+    assert all(line.startswith('    <uri name=') and line.endswith(' />') for line in lines[2:-1])
+    assert len(lines) == 3 + len(os.listdir(path)) - 1
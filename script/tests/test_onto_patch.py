@@ -0,0 +1,75 @@
+import collections
+import io
+
+import pytest
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_versions
+from nexus_ontology import onto_patch
+from nexus_ontology import onto_rdf
+
+
+@pytest.fixture(scope='module')
+def triples(checkout, tmp_path_factory):
+    '''Triple sets of the v2020.01 and v2020.02 ontologies of the checkout'''
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path_factory.mktemp('nxdl_cache')), 'test')
+    settings = dict(onto_rdf.default_settings, version='v2020.02-1.1', created='Jan-01-2020')
+    return {tag: onto_patch.triples(onto_rdf.describe(classDict, applicationDict, typesDict, settings))
+            for tag, classDict, applicationDict, typesDict, tagsDict in
+            nxdl_versions.versions(nxdl_source.LocalSource(checkout), parse_cache)}
+
+
+def test_files_read_as_the_described_triples(tmp_path, model, settings):
+    expected = onto_patch.triples(onto_rdf.describe(*model[:3], settings))
+    owl, nt = onto_rdf.write_ontology(str(tmp_path / 'NeXusOntology'), ('owl', 'nt'), *model[:3], settings)
+    from_owl, from_nt = onto_patch.read(owl), onto_patch.read(nt)
+    assert from_owl == from_nt == expected
+    assert from_owl.stored and not from_nt.stored  # RDF/XML types literals as xsd:string
+    with pytest.raises(ValueError, match='only N-Triples'):
+        onto_patch.read(str(tmp_path / 'NeXusOntology.ttl'))
+
+
+def test_summary_of_the_changes(triples):
+    old, new = triples['v2020.01'], triples['v2020.02']
+    removed, added = onto_patch.diff(old, new)
+    assert not removed & added and old - removed | added == new
+    counts = onto_patch.summarize(old, new, removed, added)
+    assert counts['triples_removed'] == len(removed) and counts['triples_added'] == len(added)
+    assert counts['classes_added'] == 2  # NXsample, NXbeam
+    assert counts['classes_removed'] == 1  # NXapp00001
+    assert counts['classes_changed'] > 0  # NXentry has a new field
+    added_subjects = {s for s, p, o in added}
+    assert {onto_rdf.default_settings['base_iri'] + name for name in ('NXsample', 'NXbeam', 'NXentry-added_field')} \
+        <= added_subjects
+
+
+def test_changeset_files(tmp_path, triples):
+    old, new = triples['v2020.01'], triples['v2020.02']
+    stats = collections.Counter()
+    files = onto_patch.write_changeset(str(tmp_path / 'NeXusOntology'), old, new, stats=stats)
+    assert [name[len(str(tmp_path)):] for name in files] == \
+        ['/NeXusOntology.changes.ru', '/NeXusOntology.removed.nt', '/NeXusOntology.added.nt']
+    assert stats['triples_removed'] == len(old - new)
+    removed, added = onto_patch.read(files[1]), onto_patch.read(files[2])
+    assert (removed, added) == onto_patch.diff(old, new)
+    again = io.StringIO()
+    onto_patch.write_ntriples(added, again)
+    with open(files[2], encoding='utf-8') as f:
+        assert f.read() == again.getvalue()  # restriction blank nodes are labelled by their content
+
+
+def test_sparql_update_gives_the_new_ontology(tmp_path, triples, checkout, settings):
+    rdflib = pytest.importorskip('rdflib')
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path / 'cache'), 'test')
+    model = nxdl_versions.load(nxdl_source.LocalSource(checkout).at('v2020.01'), parse_cache)
+    owl, = onto_rdf.write_ontology(str(tmp_path / 'previous'), ('owl',), *model[:3], settings)
+    old = onto_patch.read(owl)
+    update, = onto_patch.write_changeset(str(tmp_path / 'NeXusOntology'), old, triples['v2020.02'], formats=('sparql',))
+
+    graph = rdflib.Graph()
+    graph.parse(owl)
+    with open(update, encoding='utf-8') as f:
+        graph.update(f.read())
+    graph.serialize(str(tmp_path / 'applied.nt'), format='nt', encoding='utf-8')
+    assert onto_patch.read(str(tmp_path / 'applied.nt')) == triples['v2020.02']
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from nexus_ontology import onto_rdf
+
+
+def _write(tmp_path, model, settings, formats=('owl', 'ttl', 'nt')):
+    classDict, applicationDict, typesDict, tagsDict = model
+    return onto_rdf.write_ontology(os.path.join(str(tmp_path), 'NeXusOntology'), formats, classDict, applicationDict,
+                                   typesDict, settings)
+
+
+def _graph(path):
+    rdflib = pytest.importorskip('rdflib')
+    return rdflib.Graph().parse(path, format={'owl': 'xml', 'ttl': 'turtle', 'nt': 'nt'}[path.rsplit('.', 1)[1]])
+
+
+def _content(graph):
+    # triples without blank nodes, and the restrictions (blank nodes) by content; the
+    # RDF/XML file types its string literals, which are the same as plain literals in RDF 1.1
+    rdflib = pytest.importorskip('rdflib')
+    plain = lambda term: rdflib.Literal(str(term)) if getattr(term, 'datatype', None) == rdflib.XSD.string else term
+    ground = {tuple(map(plain, t)) for t in graph if not any(isinstance(term, rdflib.BNode) for term in t)}
+    restrictions = sorted((str(s), tuple(sorted((str(p), str(o)) for p, o in graph.predicate_objects(r))))
+                          for s, p, r in graph if isinstance(r, rdflib.BNode))
+    return ground, restrictions
+
+
+def test_formats_hold_the_same_triples(tmp_path, model, settings):
+    owl, ttl, nt = (_graph(path) for path in _write(tmp_path, model, settings))
+    assert len(owl) == len(ttl) == len(nt) > 0
+    assert _content(owl) == _content(ttl) == _content(nt)
+
+
+def test_output_is_deterministic(tmp_path, model, settings):
+    (tmp_path / 'first').mkdir()
+    (tmp_path / 'second').mkdir()
+    first = [open(path, 'rb').read() for path in _write(tmp_path / 'first', model, settings)]
+    second = [open(path, 'rb').read() for path in _write(tmp_path / 'second', model, settings)]
+    assert first == second
+
+
+def test_classes_fields_and_restrictions(tmp_path, model, settings):
+    rdflib = pytest.importorskip('rdflib')
+    OWL, RDF, RDFS = rdflib.OWL, rdflib.RDF, rdflib.RDFS
+    classDict, applicationDict, typesDict, tagsDict = model
+    graph = _graph(_write(tmp_path, model, settings, ('nt',))[0])
+    base, ns = rdflib.Namespace(settings['base_iri']), rdflib.Namespace(settings['onto_iri'] + '#')
+
+    for name in list(classDict) + list(applicationDict):
+        assert (base[name], RDF.type, OWL.Class) in graph
+    field = classDict['NXentry']['fields']['NXentry-added_field']
+    assert (base['NXentry-added_field'], RDF.type, OWL.ObjectProperty) in graph
+    assert (base['NXentry-added_field'], RDFS.range, ns['NX_LENGTH']) in graph
+    assert (base['NXentry-added_field'], RDFS.label, rdflib.Literal(field['label'])) in graph
+
+    # one restriction per distinct (property, class) pair, as counted by restriction_count
+    restrictions = set(graph.subjects(RDF.type, OWL.Restriction))
+    described = onto_rdf.describe(classDict, applicationDict, typesDict, settings)
+    assert len(restrictions) == onto_rdf.restriction_count(described)
+
+
+def test_test_individuals(tmp_path, model, settings):
+    rdflib = pytest.importorskip('rdflib')
+    ns = rdflib.Namespace(settings['onto_iri'] + '#')
+    graph = _graph(_write(tmp_path, model, settings, ('owl',))[0])
+    assert (ns['sample_temp_1'], ns['hasValue'], rdflib.Literal('10', datatype=rdflib.XSD.integer)) in graph
+    assert (ns['beam_energy_1'], ns['hasValue'], rdflib.Literal('12.4', datatype=rdflib.XSD.decimal)) in graph
+    assert (ns['dataset1'], rdflib.URIRef(settings['base_iri'] + 'NXsample-temperature'), ns['sample_temp_1']) in graph
+
+    graph = _graph(_write(tmp_path, model, dict(settings, test_individuals=False), ('owl',))[0])
+    assert (ns['sample_temp_1'], None, None) not in graph
+
+
+def test_literals_are_escaped(tmp_path, model, settings):
+    classDict, applicationDict, typesDict, tagsDict = model
+    settings = dict(settings, comment='quotes " and <tags> & \\ back\nslash')
+    for path in _write(tmp_path, model, settings):
+        comments = [str(o) for s, p, o in _graph(path) if str(p).endswith('#comment') and 'quotes' in str(o)]
+        assert comments == [settings['comment']]
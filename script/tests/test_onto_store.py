@@ -0,0 +1,75 @@
+import os
+import sqlite3
+
+import pytest
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_source
+from nexus_ontology import nxdl_versions
+from nexus_ontology import onto_rdf
+from nexus_ontology import onto_store
+
+
+def _store(path, model, settings, join_string='-'):
+    classDict, applicationDict, typesDict, tagsDict = model
+    return onto_store.write_store(str(path), classDict, applicationDict, typesDict, settings, join_string)
+
+
+def test_store_holds_the_classes_fields_and_restrictions(tmp_path, model, settings):
+    classDict, applicationDict, typesDict, tagsDict = model
+    with onto_store.load(_store(tmp_path / 'NeXusOntology.sqlite', model, settings)) as store:
+        assert store.version == settings['version']
+        assert sorted(row['name'] for row in store.classes('base_class')) == sorted(set(classDict) - {'NXobject'})
+        assert sorted(row['name'] for row in store.classes('application')) == sorted(applicationDict)
+        assert {row['name'] for row in store.classes('unit')} >= {'NX_TEMPERATURE', 'NX_ENERGY'}
+
+        field = store.field('NXsample temperature')
+        assert (field['name'], field['class_name'], field['field_name']) == ('NXsample-temperature', 'NXsample', 'temperature')
+        assert field['unit_iri'] == settings['onto_iri'] + '#NX_TEMPERATURE'
+        assert store.field(field['iri'])['iri'] == store.field('NXsample-temperature')['iri'] == field['iri']
+        assert [row['field_name'] for row in store.fields('NXsample')] == ['temperature']
+        assert store.get_class('NXentry')['extends'] == 'NXobject'
+
+        described = onto_rdf.describe(classDict, applicationDict, typesDict, settings)
+        assert len(store.restrictions()) == onto_rdf.restriction_count(described)
+        cited = store.restrictions('NXentry', value='NXsample')
+        assert all(row['class_iri'] == settings['base_iri'] + 'NXentry' for row in cited)
+
+
+def test_store_is_read_only(tmp_path, model, settings):
+    with onto_store.load(_store(tmp_path / 'NeXusOntology.sqlite', model, settings)) as store:
+        with pytest.raises(sqlite3.OperationalError):
+            store.db.execute("insert into meta values ('x', 'y')")
+
+
+def test_paths_with_uri_characters(tmp_path, model, settings):
+    path = tmp_path / 'a?b#c%20d'
+    path.mkdir()
+    with onto_store.load(_store(path / 'NeXusOntology.sqlite', model, settings)) as store:
+        assert store.field('NXsample-temperature') is not None
+
+
+def test_field_names_use_the_join_string(tmp_path, settings, checkout):
+    joined = nxdl_versions.load(nxdl_source.LocalSource(checkout), nxdl_cache.ParseCache(str(tmp_path / 'cache'), 'test'),
+                                join_string='__')
+    with onto_store.load(_store(tmp_path / 'NeXusOntology.sqlite', joined, settings, '__')) as store:
+        field = store.field('NXsample__temperature')
+        assert (field['class_name'], field['field_name']) == ('NXsample', 'temperature')
+
+
+def test_rewriting_replaces_the_store(tmp_path, model, settings):
+    path = _store(tmp_path / 'NeXusOntology.sqlite', model, settings)
+    _store(path, model, dict(settings, version='next'))
+    assert not os.path.exists(path + '.tmp')
+    with onto_store.load(path) as store:
+        assert store.version == 'next'
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = str(tmp_path / 'other.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('create table meta (key text primary key, value text)')
+    db.commit()
+    db.close()
+    with pytest.raises(ValueError, match='not a NeXus ontology store'):
+        onto_store.load(path)
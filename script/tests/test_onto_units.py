@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from nexus_ontology import onto_units
+
+
+@pytest.mark.parametrize('category, unit, scale', [
+    ('NX_LENGTH', 'mm', 1e-3),
+    ('NX_LENGTH', 'metre', 1),
+    ('NX_LENGTH', 'Å', 1e-10),
+    ('NX_LENGTH', 'um', 1e-6),
+    ('NX_ENERGY', 'keV', 1.602176634e-16),
+    ('NX_ENERGY', 'Ry', 13.605693122994 * 1.602176634e-19),
+    ('NX_MASS', 'u', 1.66053906660e-27),
+    ('NX_MASS_DENSITY', 'g/cm^3', 1e3),
+    ('NX_MASS_DENSITY', 'kg m⁻³', 1),
+    ('NX_FLUX', 'cm-2 s-1', 1e4),
+    ('NX_FLUX', '1/s/mm**2', 1e6),
+    ('NX_PER_LENGTH', 'nm^-1', 1e9),
+    ('NX_ANGLE', 'deg', math.pi / 180),
+    ('NX_SOLID_ANGLE', 'mrad^2', 1e-6),
+    ('NX_COUNT', 'counts', 1),
+    ('NX_DIMENSIONLESS', '%', 0.01),
+    ('NX_UNITLESS', '', 1),
+])
+def test_scales(category, unit, scale):
+    assert onto_units.UnitNormalizer().factor(category, unit) == (pytest.approx(scale), 0)
+
+
+@pytest.mark.parametrize('unit, kelvin', [('degC', 273.15), ('Celsius', 273.15), ('°C', 273.15), ('degF', 255.3722),
+                                          ('K', 0), ('mK', 0)])
+def test_offset_units(unit, kelvin):
+    assert onto_units.UnitNormalizer().convert('NX_TEMPERATURE', unit, [0.0])[0] == pytest.approx(kelvin)
+
+
+@pytest.mark.parametrize('category, unit, reason', [
+    ('NX_ENERGY', 'm', 'not compatible with NX_ENERGY'),
+    ('NX_ANGLE', '', 'not compatible with NX_ANGLE'),  # angles are not dimensionless
+    ('NX_LENGTH', 'inch', 'unknown unit'),
+    ('NX_LENGTH', 'millimetre', 'unknown unit'),
+    ('NX_TEMPERATURE', 'degC/s', 'only as a unit of its own'),
+    ('NX_PER_LENGTH', '1/', 'nothing after /'),
+    ('NX_ANY', 'm', 'NX_ANY has no canonical unit'),
+    ('NX_NOTHING', 'm', 'unknown unit category NX_NOTHING'),
+])
+def test_rejected_units(category, unit, reason):
+    units = onto_units.UnitNormalizer()
+    assert reason in units.check(category, unit)
+    with pytest.raises(onto_units.UnitError, match=reason):
+        units.factor(category, unit)
+
+
+def test_normalize_batches():
+    units = onto_units.UnitNormalizer()
+    converted, values, maxs = units.normalize('NX_ENERGY', numpy.array(['eV', 'keV', 'm', 'eV']), [1, 2, 3, None],
+                                              [2, None, 4, 5])
+    assert converted.tolist() == [True, True, False, True]
+    numpy.testing.assert_allclose(values / 1.602176634e-19, [1, 2000, math.nan, math.nan])
+    numpy.testing.assert_allclose(maxs / 1.602176634e-19, [2, math.nan, math.nan, 5])
+    # a category per row; each (category, unit) is looked up once
+    converted, values = units.normalize(['NX_TEMPERATURE', 'NX_LENGTH', 'NX_TEMPERATURE'], ['degC', 'mm', 'degC'],
+                                        [0, 1, 100])
+    numpy.testing.assert_allclose(values, [273.15, 1e-3, 373.15])
+    assert ('NX_TEMPERATURE', 'degC') in units.table
+
+
+def test_categories_of_a_version():
+    units = onto_units.UnitNormalizer({'NX_LENGTH': {}, 'NX_ANY': {}})
+    assert units.categories == {'NX_LENGTH': 'm'} and units.canonical('NX_LENGTH') == 'm'
+    with pytest.raises(onto_units.UnitError, match='unknown unit category NX_ENERGY'):
+        units.canonical('NX_ENERGY')
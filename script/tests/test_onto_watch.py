@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from nexus_ontology import nxdl_cache
+from nexus_ontology import nxdl_parse
+from nexus_ontology import onto_watch
+
+
+@pytest.fixture
+def definitions(tmp_path, corpus):
+    path = str(tmp_path / 'definitions')
+    shutil.copytree(corpus, path)
+    return path
+
+
+@pytest.fixture
+def watcher(tmp_path, definitions, settings):
+    parse_cache = nxdl_cache.ParseCache(str(tmp_path / 'cache'), nxdl_parse.parser_version)
+    watcher = onto_watch.Watcher(definitions, settings, parse_cache)
+    watcher.update()
+    return watcher
+
+
+def _edit(path, old, new):
+    with open(path) as f:
+        content = f.read()
+    assert old in content
+    with open(path + '.tmp', 'w') as f:
+        f.write(content.replace(old, new, 1))
+    os.replace(path + '.tmp', path)  # never seen half written by the watcher
+
+
+def test_only_changed_files_are_parsed(definitions, watcher):
+    build, misses = watcher.build, watcher.parse_cache.misses
+    assert build.files == len(watcher.records['base_classes']) + len(watcher.records['applications'])
+    assert watcher.update() == [] and watcher.build is build
+
+    entry = os.path.join(definitions, 'base_classes', 'NXentry.nxdl.xml')
+    _edit(entry, '</definition>', '    <field name="added_field" units="NX_LENGTH"/>\n</definition>')
+    assert watcher.update() == [entry]
+    assert watcher.parse_cache.misses == misses + 1
+    assert 'NXentry-added_field' in watcher.build.classDict['NXentry']['fields']
+    assert watcher.build.id != build.id and watcher.rebuilds == 2
+
+    sample = os.path.join(definitions, 'base_classes', 'NXsample.nxdl.xml')
+    with open(entry) as f, open(sample, 'w') as out:
+        out.write(f.read().replace('name="NXentry"', 'name="NXsample"'))
+    assert watcher.update() == [sample] and 'NXsample' in watcher.build.classDict
+    os.remove(sample)
+    assert watcher.update() == [sample] and 'NXsample' not in watcher.build.classDict
+
+
+def test_broken_files_keep_the_last_build(definitions, watcher):
+    build = watcher.build
+    entry = os.path.join(definitions, 'base_classes', 'NXentry.nxdl.xml')
+    _edit(entry, '</definition>', '</definition')
+    with pytest.raises(Exception):
+        watcher.update()
+    assert watcher.build is build
+    _edit(entry, '</definition', '</definition>')  # the same content as before: from the parse cache
+    misses = watcher.parse_cache.misses
+    watcher.update()
+    assert watcher.parse_cache.misses == misses and watcher.build.id == build.id
+
+    # a broken new file is not recorded, but its removal is a change
+    broken = os.path.join(definitions, 'base_classes', 'NXbroken.nxdl.xml')
+    with open(broken, 'w') as f:
+        f.write('<definition')
+    with pytest.raises(Exception):
+        watcher.update()
+    os.remove(broken)
+    assert watcher.update() == [broken] and watcher.build.id == build.id
+    assert watcher.update() == []
+
+    os.remove(os.path.join(definitions, 'nxdlTypes.xsd'))
+    with pytest.raises(FileNotFoundError, match='No nxdlTypes.xsd'):
+        watcher.update()
+
+
+@pytest.fixture
+def server(watcher):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), onto_watch.Handler)
+    server.watcher = watcher
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:%i' % server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+def _get(url, **headers):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_http(server, watcher):
+    status, headers, body = _get(server + '/')
+    assert status == 200 and json.loads(body)['build'] == watcher.build.id and json.loads(body)['error'] is None
+
+    status, headers, body = _get(server + '/NeXusOntology.nt')
+    assert status == 200 and headers['Content-Type'] == 'application/n-triples'
+    assert body == watcher.build.output('nt')
+    assert _get(server + '/NeXusOntology.nt', **{'If-None-Match': headers['ETag']})[0] == 304
+    assert _get(server + '/NeXusOntology.ttl', **{'If-None-Match': headers['ETag']})[0] == 200
+
+    entry = next(iter(watcher.build.index))
+    status, headers, body = _get(server + '/fields/' + urllib.request.quote(entry.label.upper()))
+    assert status == 200 and json.loads(body)['iri'] == entry.iri
+    status, headers, body = _get(server + '/fields?prefix=%s&limit=2' % entry.className)
+    assert status == 200 and len(json.loads(body)) == 2
+    assert _get(server + '/fields?limit=abc')[0] == 400
+    assert _get(server + '/fields?limit=-1')[0] == 400
+    assert _get(server + '/fields/NXnothing-nothing')[0] == 404
+    assert _get(server + '/NeXusOntology.xml')[0] == 404
+
+
+def test_failed_rebuilds_are_reported(definitions, server, watcher, capsys):
+    status, headers, body = _get(server + '/')
+    etag = headers['ETag']
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.watch, args=(0.01, stop), daemon=True)
+    thread.start()
+    try:
+        entry = os.path.join(definitions, 'base_classes', 'NXentry.nxdl.xml')
+        _edit(entry, '</definition>', '</definition')
+        deadline = time.time() + 10
+        while watcher.error is None and time.time() < deadline:
+            time.sleep(0.01)
+        status, headers, body = _get(server + '/', **{'If-None-Match': etag})
+        assert status == 200 and json.loads(body)['error']['message'].startswith('ParseError')
+        assert headers['X-Build-Error'] == watcher.error['message']
+        assert _get(server + '/NeXusOntology.nt')[1]['X-Build-Error']  # the last good build is served
+
+        _edit(entry, '</definition', '</definition>')
+        while watcher.error is not None and time.time() < deadline:
+            time.sleep(0.01)
+        assert 'X-Build-Error' not in _get(server + '/')[1]
+
+        # the error of a broken new file ends when it is removed
+        broken = os.path.join(definitions, 'base_classes', 'NXbroken.nxdl.xml')
+        with open(broken, 'w') as f:
+            f.write('<definition')
+        while watcher.error is None and time.time() < deadline:
+            time.sleep(0.01)
+        os.remove(broken)
+        while watcher.error is not None and time.time() < deadline:
+            time.sleep(0.01)
+        assert 'X-Build-Error' not in _get(server + '/')[1]
+    finally:
+        stop.set()
+        thread.join()
+    assert watcher.errors == 2 and capsys.readouterr().err.count('=== Not rebuilt') == 2